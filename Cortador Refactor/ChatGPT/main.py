@@ -2,7 +2,7 @@ import os
 import time
 import arcpy
 from geoprocesamiento import clip_layers
-from utilidades import get_unique_gdb_name, delete_unwanted_files
+from utilidades import get_unique_gdb_name, delete_unwanted_files, release_gdb_name
 from logging_utils import logging_print
 from config import CONFIG
 
@@ -33,20 +33,25 @@ def main() -> None:
         logging_print("Error: El shapefile de recorte no existe.", nivel="error")
         return
 
-    output_folder: str = os.path.dirname(gdb_input)
+    # Una GDB indicada sin carpeta está en la carpeta actual
+    output_folder: str = os.path.dirname(gdb_input) or "."
     gdb_output: str = get_unique_gdb_name(output_folder)
 
-    # Crear la GDB de salida
+    # La reserva del nombre se libera aunque el recorte falle o se interrumpa
     try:
-        arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
-        logging_print(f"Nueva GDB creada: {gdb_output}")
-    except arcpy.ExecuteError as e:
-        logging_print(f"Error creando la GDB de salida: {e}", nivel="error")
-        return
+        # Crear la GDB de salida
+        try:
+            arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
+            logging_print(f"Nueva GDB creada: {gdb_output}")
+        except arcpy.ExecuteError as e:
+            logging_print(f"Error creando la GDB de salida: {e}", nivel="error")
+            return
 
-    # Ejecutar el recorte de capas y eliminar archivos no deseados
-    clip_layers(gdb_input, clip_features, gdb_output)
-    delete_unwanted_files(gdb_output)
+        # Ejecutar el recorte de capas y eliminar archivos no deseados
+        clip_layers(gdb_input, clip_features, gdb_output)
+        delete_unwanted_files(gdb_output)
+    finally:
+        release_gdb_name(gdb_output)
 
     elapsed_time = time.time() - start_time
     tiempo_estandar = CONFIG.get("tiempo_estandar", 1800)
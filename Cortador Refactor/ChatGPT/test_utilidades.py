@@ -1,7 +1,7 @@
 import os
 import tempfile
 import unittest
-from utilidades import get_unique_gdb_name
+from utilidades import get_unique_gdb_name, release_gdb_name
 
 class TestUtilidades(unittest.TestCase):
     def test_get_unique_gdb_name(self):
@@ -11,5 +11,16 @@ class TestUtilidades(unittest.TestCase):
             esperado = os.path.join(temp_dir, "CartoBase_1.gdb")
             self.assertEqual(unique_name, esperado)
 
+    def test_get_unique_gdb_name_reserva(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            os.mkdir(os.path.join(temp_dir, "CartoBase_4.gdb"))
+            # Dos recortes simultáneos en la misma carpeta no reciben el mismo nombre
+            primero = get_unique_gdb_name(temp_dir)
+            segundo = get_unique_gdb_name(temp_dir)
+            self.assertEqual(primero, os.path.join(temp_dir, "CartoBase_5.gdb"))
+            self.assertEqual(segundo, os.path.join(temp_dir, "CartoBase_6.gdb"))
+            release_gdb_name(primero)
+            self.assertEqual(get_unique_gdb_name(temp_dir), primero)
+
 if __name__ == '__main__':
     unittest.main()
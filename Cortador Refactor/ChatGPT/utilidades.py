@@ -1,10 +1,18 @@
 import os
+import re
 import arcpy
 from logging_utils import logging_print
 
+# Archivo que aparta el nombre de la GDB de salida mientras dura el recorte: CartoBase_3.gdb.reserva
+RESERVATION_SUFFIX = ".reserva"
+
 def get_unique_gdb_name(base_folder: str) -> str:
     """
-    Genera un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc.
+    Genera y reserva un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc.
+
+    El número sale de una sola lectura de la carpeta (el mayor CartoBase_N más uno) y el nombre se
+    aparta creando de forma exclusiva su archivo de reserva, para que dos recortes simultáneos en la
+    misma carpeta no elijan el mismo nombre. La reserva se elimina con release_gdb_name.
     
     Args:
         base_folder (str): Carpeta base donde se creará la GDB.
@@ -12,14 +20,35 @@ def get_unique_gdb_name(base_folder: str) -> str:
     Returns:
         str: Ruta completa de la GDB única.
     """
-    counter = 1
+    pattern = re.compile(r"CartoBase_(\d+)\.gdb(?:\.reserva)?", re.IGNORECASE)
+    with os.scandir(base_folder) as entries:
+        matches = [pattern.fullmatch(entry.name) for entry in entries]
+    counter = max((int(match.group(1)) for match in matches if match), default=0) + 1
     while True:
-        gdb_name = f"CartoBase_{counter}.gdb"
-        gdb_path = os.path.join(base_folder, gdb_name)
-        if not arcpy.Exists(gdb_path):
+        gdb_path = os.path.join(base_folder, f"CartoBase_{counter}.gdb")
+        try:
+            os.close(os.open(gdb_path + RESERVATION_SUFFIX, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            counter += 1  # Otro recorte lo reservó después de leer la carpeta
+            continue
+        if not os.path.exists(gdb_path):
             return gdb_path
+        # Otro recorte terminó con este nombre y liberó su reserva después de leer la carpeta
+        os.remove(gdb_path + RESERVATION_SUFFIX)
         counter += 1
 
+def release_gdb_name(gdb_path: str) -> None:
+    """
+    Elimina la reserva del nombre de una GDB creada con get_unique_gdb_name.
+
+    Args:
+        gdb_path (str): Ruta de la GDB de salida.
+    """
+    try:
+        os.remove(gdb_path + RESERVATION_SUFFIX)
+    except FileNotFoundError:
+        pass
+
 def delete_unwanted_files(gdb_path: str) -> None:
     """
     Elimina archivos no deseados que se crean automáticamente en la GDB.
@@ -10,6 +10,7 @@
 
 import arcpy
 import os
+import re
 import time
 
 __author__ = "Jorge Vallejo @OnfeVS"
@@ -59,16 +60,40 @@ def is_empty(fc):
         print(f"Error verificando si la capa está vacía: {e}")
         return True
 
+# Archivo que aparta el nombre de la GDB de salida mientras dura el recorte: CartoBase_3.gdb.reserva
+RESERVATION_SUFFIX = ".reserva"
+
 def get_unique_gdb_name(base_folder):
-    """Genera un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc."""
-    counter = 1
+    """Genera y reserva un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc.
+
+    El número sale de una sola lectura de la carpeta (el mayor CartoBase_N más uno), sin probar los nombres
+    uno por uno, y el nombre se aparta creando de forma exclusiva su archivo de reserva, para que dos
+    recortes que empiezan a la vez en la misma carpeta no elijan el mismo nombre.
+    """
+    pattern = re.compile(r"CartoBase_(\d+)\.gdb(?:\.reserva)?", re.IGNORECASE)
+    with os.scandir(base_folder) as entries:
+        matches = [pattern.fullmatch(entry.name) for entry in entries]
+    counter = max((int(match.group(1)) for match in matches if match), default=0) + 1
     while True:
-        gdb_name = f"CartoBase_{counter}.gdb"
-        gdb_path = os.path.join(base_folder, gdb_name)
-        if not arcpy.Exists(gdb_path):
+        gdb_path = os.path.join(base_folder, f"CartoBase_{counter}.gdb")
+        try:
+            os.close(os.open(gdb_path + RESERVATION_SUFFIX, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            counter += 1  # Otro recorte lo reservó después de leer la carpeta
+            continue
+        if not os.path.exists(gdb_path):
             return gdb_path
+        # Otro recorte terminó con este nombre y liberó su reserva después de leer la carpeta
+        os.remove(gdb_path + RESERVATION_SUFFIX)
         counter += 1
 
+def release_gdb_name(gdb_path):
+    """Elimina la reserva del nombre de la GDB de salida al terminar el recorte"""
+    try:
+        os.remove(gdb_path + RESERVATION_SUFFIX)
+    except FileNotFoundError:
+        pass
+
 def delete_unwanted_files(gdb_path):
     """Elimina archivos no deseados que se crean automáticamente en la GDB"""
     try:
@@ -187,21 +212,24 @@ def main():
     # Solicitar rutas al usuario
     gdb_input = input("Ingrese la ruta de la GDB de entrada: ").strip()
     clip_features = input("Ingrese la ruta del shapefile para el recorte: ").strip()
-    output_folder = os.path.dirname(gdb_input)
+    # Una GDB indicada sin carpeta está en la carpeta actual
+    output_folder = os.path.dirname(gdb_input) or "."
 
-    # Crear un nombre único para la GDB de salida
+    # Crear un nombre único para la GDB de salida; su reserva se libera aunque el recorte falle o se interrumpa
     gdb_output = get_unique_gdb_name(output_folder)
-
-    # Crear la GDB de salida
-    arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
-    print(f"\nNueva GDB creada: {gdb_output}")
-
-    # Validar rutas de entrada
-    if all([arcpy.Exists(gdb_input), arcpy.Exists(clip_features)]):
-        clip_layers(gdb_input, clip_features, gdb_output)
-        delete_unwanted_files(gdb_output)
-    else:
-        print("Error: Verifique que las rutas de la GDB de entrada y el shapefile sean correctas.")
+    try:
+        # Crear la GDB de salida
+        arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
+        print(f"\nNueva GDB creada: {gdb_output}")
+
+        # Validar rutas de entrada
+        if all([arcpy.Exists(gdb_input), arcpy.Exists(clip_features)]):
+            clip_layers(gdb_input, clip_features, gdb_output)
+            delete_unwanted_files(gdb_output)
+        else:
+            print("Error: Verifique que las rutas de la GDB de entrada y el shapefile sean correctas.")
+    finally:
+        release_gdb_name(gdb_output)
 
     # Finalizar el cronómetro y calcular tiempo
     elapsed_time = time.time() - start_time
@@ -0,0 +1,144 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from generar_gdb import Parametros, agregar_argumentos, generar_gdb, parametros_desde
+
+RAIZ = Path(__file__).resolve().parents[3]
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from manejo_gdb import copiar_tablas, listar_capas, recortar_capas  # noqa: E402
+from motor_base import crear_motor  # noqa: E402
+from tuberia import recortar_capas_tuberia  # noqa: E402
+
+def cargar_modulo(ruta: Path):
+    """Importa un script suelto del repositorio (sus nombres de archivo no son paquetes)."""
+    spec = importlib.util.spec_from_file_location(ruta.stem, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def medir(funcion: Callable[[], None], repeticiones: int) -> Dict[str, float]:
+    """Ejecuta una función varias veces y resume sus tiempos en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # Los scripts imprimen una línea por capa
+            funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "mediana": statistics.median(tiempos), "max": max(tiempos)}
+
+def etapas_gdal(gdb: str, aoi: str, proyecto: Path, temporal: Path) -> Dict[str, Callable[[], None]]:
+    """Etapas del motor GDAL del refactor; cada repetición usa un motor nuevo, sin cachés."""
+    leame = cargar_modulo(RAIZ / "Leame" / "LeameAnlaV1Carpetas.py")
+    salidas = iter(range(1, 10_000))
+
+    def interseccion():
+        motor = crear_motor("gdal")
+        area = motor.preparar_area(aoi)
+        for capa in listar_capas(gdb, motor):
+            motor.tiene_interseccion(capa, area)
+
+    return {
+        "listar_capas": lambda: listar_capas(gdb, crear_motor("gdal")),
+        "interseccion": interseccion,
+        "recorte": lambda: recortar_capas(gdb, aoi, str(temporal / f"Recorte_{next(salidas)}.gdb"), crear_motor("gdal")),
+        "recorte_tuberia": lambda: recortar_capas_tuberia(gdb, aoi, str(temporal / f"Recorte_{next(salidas)}.gdb"),
+                                                          crear_motor("gdal")),
+        "tablas": lambda: copiar_tablas(gdb, str(temporal / f"Tablas_{next(salidas)}.gdb"), crear_motor("gdal")),
+        "leame_arbol": lambda: leame.generar_arbol_principal(str(proyecto)),
+    }
+
+def etapas_arcpy(gdb: str, aoi: str, proyecto: Path, temporal: Path) -> Dict[str, Callable[[], None]]:
+    """Etapas del script CortadorTB_2025.py y de los informes Leame, con arcpy."""
+    import arcpy
+    cortador = cargar_modulo(RAIZ / "CortadorTB_2025.py")
+    leame = cargar_modulo(RAIZ / "Leame" / "LeameAnlaV3Campos.py")
+    salidas = iter(range(1, 10_000))
+
+    def interseccion():
+        arcpy.env.workspace = gdb
+        capas, datasets, _ = cortador.load_catalog(gdb)
+        for fcs in datasets.values():
+            capas.extend(fcs)
+        for capa in capas:
+            cortador.has_intersection(capa, aoi)
+
+    def recorte():
+        nombre = f"Recorte_{next(salidas)}.gdb"
+        arcpy.CreateFileGDB_management(str(temporal), nombre)
+        cortador.clip_layers(gdb, aoi, str(temporal / nombre))
+
+    return {
+        "listar_capas": lambda: cortador.load_catalog(gdb),
+        "interseccion": interseccion,
+        "recorte": recorte,
+        "leame_arbol": lambda: leame.generar_arbol_principal(str(proyecto)),
+        "leame_campos": lambda: leame.listar_aclaraciones(str(proyecto / "GDB")),
+    }
+
+def comparar(anterior: dict, actual: dict) -> Dict[str, float]:
+    """Aceleración de cada etapa respecto a un resultado anterior (>1 es más rápido)."""
+    return {etapa: anterior["etapas"][etapa]["mediana"] / tiempos["mediana"]
+            for etapa, tiempos in actual["etapas"].items()
+            if etapa in anterior.get("etapas", {}) and tiempos["mediana"] > 0}
+
+def ejecutar(parametros: Parametros, motor: str, repeticiones: int) -> dict:
+    """Genera la GDB sintética dentro de un proyecto temporal y mide cada etapa."""
+    carpeta = Path(tempfile.mkdtemp(prefix="cortador_bench_"))
+    try:
+        proyecto = carpeta / "Proyecto"
+        inicio = time.perf_counter()
+        gdb, aoi = generar_gdb(str(proyecto / "GDB"), parametros)
+        generacion = time.perf_counter() - inicio
+        for subcarpeta in ("PDF", "MXD", "METADATOS"):
+            (proyecto / subcarpeta).mkdir()
+        temporal = carpeta / "salidas"
+        temporal.mkdir()
+
+        etapas = etapas_arcpy if motor == "arcpy" else etapas_gdal
+        return {
+            "motor": motor,
+            "parametros": parametros._asdict(),
+            "repeticiones": repeticiones,
+            "generacion_s": generacion,
+            "etapas": {nombre: medir(funcion, repeticiones)
+                       for nombre, funcion in etapas(gdb, aoi, proyecto, temporal).items()},
+            "plataforma": {"sistema": platform.platform(), "python": platform.python_version(),
+                           "procesador": platform.processor() or platform.machine()},
+        }
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Mide las etapas del recorte sobre una GDB sintética.")
+    parser.add_argument("--motor", choices=["gdal", "arcpy"], default="gdal")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados (por defecto, la consola).")
+    parser.add_argument("--comparar", metavar="JSON_ANTERIOR", help="Resultado anterior con el que comparar.")
+    agregar_argumentos(parser)
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(parametros_desde(args), args.motor, args.repeticiones)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            resultado["aceleracion"] = comparar(json.load(archivo), resultado)
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        Path(args.salida).write_text(texto, encoding="utf-8")
+    else:
+        print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import math
+from pathlib import Path
+from typing import NamedTuple, Tuple
+
+import numpy as np
+import pyogrio.raw
+import shapely
+
+DRIVER_GDB = "OpenFileGDB"
+DRIVER_SHP = "ESRI Shapefile"
+
+# MAGNA-SIRGAS / Colombia Bogotá zone, sistema habitual de la cartografía base
+CRS = "EPSG:3116"
+
+# Los datos se generan dentro de un cuadrado de este lado, en metros
+LADO_DATOS = 100_000.0
+
+TIPOS = ("Point", "LineString", "Polygon")
+
+class Parametros(NamedTuple):
+    """Tamaño y forma de una GDB sintética."""
+
+    datasets: int = 3
+    capas: int = 5  # Feature classes por dataset, además de las de la raíz
+    entidades: int = 1000
+    vertices: int = 20
+    complejidad_area: int = 64  # Vértices de cada parte del área de recorte
+    partes_area: int = 1
+    solapamiento: float = 0.3  # Fracción de la extensión de los datos cubierta por el área
+    tablas: int = 2
+    filas_tabla: int = 10_000
+    semilla: int = 42
+
+def _puntos(rng: np.random.Generator, n: int) -> np.ndarray:
+    return shapely.points(rng.uniform(0, LADO_DATOS, size=(n, 2)))
+
+def _lineas(rng: np.random.Generator, n: int, vertices: int) -> np.ndarray:
+    inicio = rng.uniform(0, LADO_DATOS, size=(n, 1, 2))
+    pasos = rng.normal(0, LADO_DATOS / 500, size=(n, max(vertices, 2) - 1, 2))
+    return shapely.linestrings(np.concatenate([inicio, inicio + np.cumsum(pasos, axis=1)], axis=1))
+
+def _poligonos(rng: np.random.Generator, n: int, vertices: int, radio: float) -> np.ndarray:
+    centros = rng.uniform(0, LADO_DATOS, size=(n, 1, 2))
+    return _estrellas(rng, centros, max(vertices, 3), radio)
+
+def _estrellas(rng: np.random.Generator, centros: np.ndarray, vertices: int, radio: float) -> np.ndarray:
+    """Polígonos estrellados alrededor de cada centro, con radios irregulares."""
+    angulos = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    radios = radio * rng.uniform(0.7, 1.0, size=(len(centros), vertices))
+    anillos = centros + np.stack([radios * np.cos(angulos), radios * np.sin(angulos)], axis=-1)
+    return shapely.make_valid(shapely.polygons(anillos))
+
+def _atributos(rng: np.random.Generator, n: int):
+    campos = ["ID", "NOMBRE", "VALOR"]
+    datos = [np.arange(1, n + 1, dtype=np.int64),
+             np.array([f"Elemento {i}" for i in range(1, n + 1)], dtype=object),
+             rng.uniform(0, 1000, size=n)]
+    return campos, datos
+
+def _escribir_capa(gdb: Path, nombre: str, dataset: str, tipo: str, geometrias: np.ndarray, rng) -> None:
+    campos, datos = _atributos(rng, len(geometrias))
+    pyogrio.raw.write(str(gdb), shapely.to_wkb(geometrias), datos, campos, layer=nombre, driver=DRIVER_GDB,
+                      geometry_type=tipo, crs=CRS, promote_to_multi=tipo != "Point",
+                      layer_options={"FEATURE_DATASET": dataset} if dataset else None)
+
+def area_recorte(parametros: Parametros, rng: np.random.Generator):
+    """Área de recorte que cubre la fracción `solapamiento` de la extensión de los datos."""
+    area_total = parametros.solapamiento * LADO_DATOS ** 2
+    radio = math.sqrt(area_total / parametros.partes_area / math.pi)
+    margen = min(radio, LADO_DATOS / 2)
+    centros = rng.uniform(margen, LADO_DATOS - margen, size=(parametros.partes_area, 1, 2))
+    return shapely.union_all(_estrellas(rng, centros, max(parametros.complejidad_area, 3), radio))
+
+def generar_gdb(carpeta: str, parametros: Parametros = Parametros()) -> Tuple[str, str]:
+    """Genera una GDB sintética y su shapefile de recorte.
+
+    Las capas alternan puntos, líneas y polígonos; cada dataset tiene
+    `capas` feature classes y la raíz otras tantas, más `tablas` tablas TB
+    con un campo ID_PREDIO.
+
+    Args:
+        carpeta: Carpeta donde crear Sintetica.gdb y area_recorte.shp.
+        parametros: Tamaño y forma de los datos.
+
+    Returns:
+        Tupla (ruta de la GDB, ruta del shapefile de recorte).
+    """
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    gdb = carpeta / "Sintetica.gdb"
+    rng = np.random.default_rng(parametros.semilla)
+    radio_poligono = LADO_DATOS / 200
+
+    for indice_dataset in range(parametros.datasets + 1):
+        dataset = f"Dataset{indice_dataset}" if indice_dataset else ""
+        for indice_capa in range(parametros.capas):
+            tipo = TIPOS[indice_capa % len(TIPOS)]
+            if tipo == "Point":
+                geometrias = _puntos(rng, parametros.entidades)
+            elif tipo == "LineString":
+                geometrias = _lineas(rng, parametros.entidades, parametros.vertices)
+            else:
+                geometrias = _poligonos(rng, parametros.entidades, parametros.vertices, radio_poligono)
+            nombre = f"{dataset or 'Raiz'}_{tipo}{indice_capa}"
+            _escribir_capa(gdb, nombre, dataset, tipo, geometrias, rng)
+
+    for indice_tabla in range(parametros.tablas):
+        n = parametros.filas_tabla
+        datos = [rng.integers(1, parametros.entidades + 1, size=n, dtype=np.int64),
+                 np.array([f"Registro {i}" for i in range(n)], dtype=object)]
+        pyogrio.raw.write(str(gdb), None, datos, ["ID_PREDIO", "DESCRIPCION"], layer=f"Tabla{indice_tabla}TB",
+                          driver=DRIVER_GDB, geometry_type=None)
+
+    aoi = carpeta / "area_recorte.shp"
+    pyogrio.raw.write(str(aoi), shapely.to_wkb(np.array([area_recorte(parametros, rng)])),
+                      [np.array([1], dtype=np.int64)], ["ID"], driver=DRIVER_SHP,
+                      geometry_type="MultiPolygon", crs=CRS, promote_to_multi=True)
+    return str(gdb), str(aoi)
+
+def agregar_argumentos(parser: argparse.ArgumentParser) -> None:
+    """Agrega a un parser una opción por cada campo de Parametros."""
+    for campo, valor in Parametros._field_defaults.items():
+        parser.add_argument(f"--{campo.replace('_', '-')}", type=type(valor), default=valor)
+
+def parametros_desde(args: argparse.Namespace) -> Parametros:
+    return Parametros(**{campo: getattr(args, campo) for campo in Parametros._fields})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una GDB sintética para medir el recorte.")
+    parser.add_argument("carpeta")
+    agregar_argumentos(parser)
+    args = parser.parse_args()
+    print(generar_gdb(args.carpeta, parametros_desde(args)))
@@ -0,0 +1,131 @@
+import math
+from typing import Dict, List, Sequence, Tuple
+from extensiones import Extension
+
+# Relación entre la extensión de una capa o entidad y el área de recorte
+DISJUNTA = "disjunta"
+SUPERPUESTA = "superpuesta"  # La extensión toca alguna parte: hay que revisar las entidades
+CONTENIDA = "contenida"
+
+# Máximo de uniones de partes guardadas por un área de recorte
+MAX_SUBCONJUNTOS = 256
+
+class IndiceEspacial:
+    """Árbol STR (Sort-Tile-Recursive) de solo lectura sobre una lista de extensiones."""
+
+    def __init__(self, extensiones: Sequence[Extension], capacidad: int = 8):
+        self.extensiones = list(extensiones)
+        self._raiz = None
+        # Cada entrada es (extensión, hijo); un hijo es un índice de extensiones o un nodo (extensión, hijos)
+        entradas = [(ext, i) for i, ext in enumerate(self.extensiones) if not ext.es_vacia()]
+        if not entradas:
+            return
+        while True:
+            nodos = [(Extension.envolvente(ext for ext, _ in grupo), [hijo for _, hijo in grupo])
+                     for grupo in _agrupar_str(entradas, capacidad)]
+            if len(nodos) == 1:
+                self._raiz = nodos[0]
+                return
+            entradas = [(nodo[0], nodo) for nodo in nodos]
+
+    def consultar(self, extension: Extension) -> List[int]:
+        """Devuelve, en orden, los índices de las extensiones que tocan la extensión dada."""
+        if self._raiz is None or extension.es_vacia():
+            return []
+        resultado = []
+        pila = [self._raiz]
+        while pila:
+            ext_nodo, hijos = pila.pop()
+            if not ext_nodo.intersecta(extension):
+                continue
+            for hijo in hijos:
+                if isinstance(hijo, int):
+                    if self.extensiones[hijo].intersecta(extension):
+                        resultado.append(hijo)
+                else:
+                    pila.append(hijo)
+        return sorted(resultado)
+
+def _agrupar_str(entradas: list, capacidad: int) -> List[list]:
+    """Agrupa entradas en nodos de hasta `capacidad` elementos ordenando por franjas en x y luego en y."""
+    num_nodos = math.ceil(len(entradas) / capacidad)
+    por_franja = capacidad * math.ceil(math.sqrt(num_nodos))
+    ordenadas = sorted(entradas, key=lambda e: e[0].centro()[0])
+    grupos = []
+    for inicio in range(0, len(ordenadas), por_franja):
+        franja = sorted(ordenadas[inicio:inicio + por_franja], key=lambda e: e[0].centro()[1])
+        grupos.extend(franja[i:i + capacidad] for i in range(0, len(franja), capacidad))
+    return grupos
+
+class AreaRecorte:
+    """Área de recorte preparada una sola vez por ejecución y compartida por todas las capas.
+
+    Guarda la geometría disuelta, un índice STR sobre sus partes y una caché
+    de predicados por extensión, para no releer ni reindexar el shapefile en
+    cada capa. Cada motor la especializa con las operaciones geométricas de
+    su propia librería (_unir y _contiene).
+    """
+
+    def __init__(self, ruta: str, partes: Sequence, extensiones: Sequence[Extension],
+                 referencia=None, geometria=None):
+        """
+        Args:
+            ruta: Ruta del shapefile de recorte.
+            partes: Polígonos que forman el área de recorte disuelta.
+            extensiones: Extensión de cada parte, en el mismo orden.
+            referencia: Referencia espacial de las geometrías, en el formato del motor.
+            geometria: Unión de todas las partes, si el motor ya la tiene calculada.
+        """
+        self.ruta = ruta
+        self.referencia = referencia
+        self.partes = list(partes)
+        self.indice = IndiceEspacial(extensiones)
+        self.extension = Extension.envolvente(extensiones)
+        if geometria is None and self.partes:
+            geometria = self._unir(self.partes)
+        self.geometria = geometria
+        self._relaciones: Dict[Extension, str] = {}
+        self._subconjuntos: Dict[Tuple[int, ...], object] = {}
+
+    def geometria_para(self, extension: Extension):
+        """Devuelve la unión de las partes que tocan una extensión, o None si ninguna la toca.
+
+        Recortar contra esa unión en lugar del área completa evita comparar
+        cada entidad con partes lejanas. Las uniones se guardan por
+        combinación de partes, que suele repetirse entre entidades vecinas.
+        """
+        candidatas = tuple(self.indice.consultar(extension))
+        if not candidatas:
+            return None
+        if len(candidatas) == len(self.partes):
+            return self.geometria
+        if candidatas not in self._subconjuntos:
+            if len(self._subconjuntos) >= MAX_SUBCONJUNTOS:
+                del self._subconjuntos[next(iter(self._subconjuntos))]
+            self._subconjuntos[candidatas] = self._unir([self.partes[i] for i in candidatas])
+        return self._subconjuntos[candidatas]
+
+    def relacion(self, extension: Extension) -> str:
+        """Clasifica una extensión frente al área de recorte.
+
+        Returns:
+            DISJUNTA, CONTENIDA o SUPERPUESTA.
+        """
+        if extension not in self._relaciones:
+            geometria = self.geometria_para(extension)
+            if geometria is None:
+                relacion = DISJUNTA
+            elif self._contiene(geometria, extension):
+                relacion = CONTENIDA
+            else:
+                relacion = SUPERPUESTA
+            self._relaciones[extension] = relacion
+        return self._relaciones[extension]
+
+    def _unir(self, partes: Sequence):
+        """Une varias partes en una sola geometría preparada para predicados."""
+        raise NotImplementedError
+
+    def _contiene(self, geometria, extension: Extension) -> bool:
+        """Indica si la geometría contiene por completo el rectángulo de la extensión."""
+        raise NotImplementedError
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+from catalogo import Catalogo
+from configuracion import Configuracion
+from motor_base import MotorGeoprocesamiento
+
+# Versión del formato de la caché; las entradas de otra versión se descartan
+VERSION = 1
+
+# Tablas de sistema cuyo cambio indica capas o tablas agregadas, eliminadas o renombradas
+TABLAS_ESTRUCTURA = ("GDB_SystemCatalog", "GDB_Items")
+
+# Tamaño máximo por defecto de la carpeta de la caché
+MAX_BYTES = 50 * 1024 * 1024
+
+def huellas_gdb(gdb: str) -> Dict[str, List[int]]:
+    """Tamaño y fecha de modificación de cada archivo interno de una GDB.
+
+    Los .lock se ignoran: los crea cualquier lectura y no indican cambios.
+    """
+    with os.scandir(gdb) as entradas:
+        return {entrada.name: [entrada.stat().st_size, entrada.stat().st_mtime_ns]
+                for entrada in entradas if entrada.is_file() and not entrada.name.endswith(".lock")}
+
+def _tabla_de_archivo(nombre_archivo: str) -> str:
+    """Archivo aXXXXXXXX al que pertenece un archivo interno (.gdbtable, .gdbtablx, .spx, .atx)."""
+    return nombre_archivo.split(".")[0]
+
+class CacheCatalogo:
+    """Caché en disco de los catálogos de las GDB, un archivo JSON por GDB.
+
+    Cada entrada guarda el catálogo junto con el tamaño y la fecha de los
+    archivos internos de la GDB. Si ninguno cambió, el catálogo se carga
+    sin abrir la GDB; si solo cambiaron algunas tablas y el motor sabe qué
+    archivo corresponde a cada una, solo esas se vuelven a describir. Al
+    superar el tamaño máximo se eliminan las entradas usadas hace más tiempo.
+    En modo solo lectura se aprovechan las entradas existentes sin escribir nada.
+    """
+
+    def __init__(self, carpeta: str, max_bytes: int = MAX_BYTES, solo_lectura: bool = False):
+        self.carpeta = Path(carpeta)
+        self.max_bytes = max_bytes
+        self.solo_lectura = solo_lectura
+        if not solo_lectura:
+            self.carpeta.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def desde_configuracion(cls, config: Configuracion, solo_lectura: bool = False) -> Optional["CacheCatalogo"]:
+        """Crea la caché configurada en config.ini, o devuelve None si está desactivada."""
+        carpeta = config.obtener_cache_catalogo()
+        if carpeta is None:
+            return None
+        return cls(str(carpeta), config.obtener_cache_catalogo_mb() * 1024 * 1024, solo_lectura)
+
+    def _ruta(self, gdb: str) -> Path:
+        clave = hashlib.sha1(os.path.abspath(gdb).encode("utf-8")).hexdigest()
+        return self.carpeta / f"{clave}.json"
+
+    def _leer(self, gdb: str) -> Optional[dict]:
+        try:
+            with open(self._ruta(gdb), encoding="utf-8") as archivo:
+                entrada = json.load(archivo)
+        except (OSError, ValueError):
+            return None
+        return entrada if entrada.get("version") == VERSION else None
+
+    def obtener(self, gdb: str, motor: MotorGeoprocesamiento) -> Catalogo:
+        """Devuelve el catálogo de una GDB, describiendo solo lo que cambió desde la última vez.
+
+        Args:
+            gdb: Ruta de la GDB.
+            motor: Motor con el que se describe la GDB si la caché no sirve.
+
+        Returns:
+            Catálogo actualizado de la GDB.
+        """
+        huellas = huellas_gdb(gdb)
+        entrada = self._leer(gdb)
+        catalogo = None
+        archivos = {}
+        if entrada is not None and entrada["motor"] == motor.nombre:
+            if entrada["huellas"] == huellas:
+                if not self.solo_lectura:
+                    os.utime(self._ruta(gdb))  # Marca la entrada como usada para el desalojo
+                logging.info(f"Catálogo de {gdb} cargado de la caché.")
+                return Catalogo.desde_dict(entrada["catalogo"])
+            archivos = entrada["archivos"]
+            catalogo = self._actualizar(gdb, motor, entrada, huellas)
+        if catalogo is None:
+            catalogo = motor.catalogar(gdb)
+            archivos = {nombre: _tabla_de_archivo(os.path.basename(ruta))
+                        for nombre, ruta in motor.archivos_tablas(gdb).items()}
+        if not self.solo_lectura:
+            self._guardar(gdb, motor, huellas, archivos, catalogo)
+        return catalogo
+
+    def _actualizar(self, gdb: str, motor: MotorGeoprocesamiento, entrada: dict,
+                    huellas: Dict[str, List[int]]) -> Optional[Catalogo]:
+        """Vuelve a describir solo las tablas cuyos archivos cambiaron.
+
+        Returns:
+            El catálogo actualizado, o None si hay que recorrer toda la GDB
+            porque cambió su estructura o no se sabe a qué tabla pertenece cada archivo.
+        """
+        archivos = entrada["archivos"]
+        if not archivos:
+            return None
+        anteriores = entrada["huellas"]
+        cambiados = {_tabla_de_archivo(nombre) for nombre in set(huellas) | set(anteriores)
+                     if huellas.get(nombre) != anteriores.get(nombre)}
+        if any(archivos.get(tabla) in cambiados for tabla in TABLAS_ESTRUCTURA):
+            return None
+        catalogo = Catalogo.desde_dict(entrada["catalogo"])
+        modificados = [e for e in catalogo.elementos.values() if archivos.get(e.nombre) in cambiados]
+        for elemento in motor.describir(gdb, modificados):
+            catalogo.elementos[elemento.nombre] = elemento
+        logging.info(f"Catálogo de {gdb} actualizado desde la caché: {len(modificados)} tablas modificadas.")
+        return catalogo
+
+    def _guardar(self, gdb: str, motor: MotorGeoprocesamiento, huellas: Dict[str, List[int]],
+                 archivos: Dict[str, str], catalogo: Catalogo) -> None:
+        """Escribe la entrada de forma atómica y desaloja las más antiguas si la caché creció demasiado."""
+        datos = {
+            "version": VERSION,
+            "gdb": os.path.abspath(gdb),
+            "motor": motor.nombre,
+            "huellas": huellas,
+            "archivos": archivos,
+            "catalogo": catalogo.como_dict(),
+        }
+        ruta = self._ruta(gdb)
+        temporal = ruta.with_name(ruta.name + ".tmp")
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo, ensure_ascii=False)
+        os.replace(temporal, ruta)
+        self._desalojar(conservar=ruta)
+
+    def _desalojar(self, conservar: Path) -> None:
+        """Elimina las entradas usadas hace más tiempo hasta quedar bajo el tamaño máximo."""
+        entradas = sorted((p for p in self.carpeta.glob("*.json") if p != conservar),
+                          key=lambda p: p.stat().st_mtime_ns)
+        total = conservar.stat().st_size + sum(p.stat().st_size for p in entradas)
+        for entrada in entradas:
+            if total <= self.max_bytes:
+                break
+            total -= entrada.stat().st_size
+            entrada.unlink()
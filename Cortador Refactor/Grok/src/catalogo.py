@@ -0,0 +1,68 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from extensiones import Extension
+
+# Tipos de elemento de una GDB
+DATASET = "dataset"
+CAPA = "capa"
+TABLA = "tabla"
+
+class ElementoCatalogo(NamedTuple):
+    """Descripción de un dataset, capa o tabla de una GDB.
+
+    Los datos que un motor no obtiene al recorrer la GDB quedan en None.
+    """
+
+    nombre: str
+    dataset: str
+    tipo: str
+    referencia: Optional[str] = None  # Nombre del sistema de coordenadas
+    extension: Optional[Extension] = None
+    tipo_geometria: Optional[str] = None
+    registros: Optional[int] = None
+    campos: Tuple[str, ...] = ()
+
+class Catalogo:
+    """Contenido de una GDB leído en una sola pasada.
+
+    Se consulta en lugar de listar el workspace cada vez: las capas, tablas
+    y su descripción quedan en memoria desde que el motor recorre la GDB.
+    """
+
+    def __init__(self, gdb: str, elementos: Iterable[ElementoCatalogo]):
+        self.gdb = gdb
+        self.elementos: Dict[str, ElementoCatalogo] = {}
+        for elemento in elementos:
+            self.elementos[elemento.nombre] = elemento
+
+    def _nombres(self, tipo: str, dataset: Optional[str] = None) -> List[str]:
+        return [e.nombre for e in self.elementos.values()
+                if e.tipo == tipo and (dataset is None or e.dataset == dataset)]
+
+    def datasets(self) -> List[str]:
+        return self._nombres(DATASET)
+
+    def capas(self, dataset: str = "") -> List[str]:
+        """Capas de la raíz o de un dataset, en el orden en que las entregó el motor."""
+        return self._nombres(CAPA, dataset)
+
+    def tablas(self) -> List[str]:
+        """Tablas de la raíz de la GDB."""
+        return self._nombres(TABLA, "")
+
+    def elemento(self, nombre: str) -> Optional[ElementoCatalogo]:
+        """Descripción de un elemento por su nombre, único dentro de una GDB."""
+        return self.elementos.get(nombre)
+
+    def como_dict(self) -> dict:
+        """Catálogo serializable en JSON, p. ej. para los informes Leame."""
+        return {"gdb": self.gdb, "elementos": [
+            {**e._asdict(), "extension": list(e.extension) if e.extension else None, "campos": list(e.campos)}
+            for e in self.elementos.values()]}
+
+    @classmethod
+    def desde_dict(cls, datos: dict) -> "Catalogo":
+        """Reconstruye un catálogo guardado con como_dict."""
+        return cls(datos["gdb"], [
+            ElementoCatalogo(**{**e, "extension": Extension(*e["extension"]) if e["extension"] else None,
+                                "campos": tuple(e["campos"])})
+            for e in datos["elementos"]])
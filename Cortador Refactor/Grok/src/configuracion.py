@@ -1,7 +1,8 @@
 import configparser
 import logging
+import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
 class Configuracion:
     """Clase para manejar la configuración del script desde un archivo externo."""
@@ -11,6 +12,7 @@ class Configuracion:
         if config_path is None:
             base_dir = Path(__file__).resolve().parent.parent  # Sube un nivel desde src/ a project/
             config_path = base_dir / "config" / "config.ini"
+        config_path = Path(config_path)
         
         self.config = configparser.ConfigParser()
         
@@ -33,10 +35,31 @@ class Configuracion:
         self.config['Settings'] = {
             'log_level': 'INFO',
             'estimated_manual_time': '1800',
-            'gdb_prefix': 'CartoBase'
+            'gdb_prefix': 'CartoBase',
+            'num_procesos': '1',
+            'hilos_tuberia': '2',
+            'preparacion_memoria': 'no',
+            'preparacion_memoria_mb': '1024',
+            'motor': 'arcpy',
+            'metricas': 'true',
+            'progreso_s': '10',
+            'optimizar_salida': 'false',
+            'copia_comprimida': 'false',
+            'cache_catalogo': '~/.cortador/catalogos',
+            'cache_catalogo_mb': '50',
+            'claves_tablas': ''
         }
         self.setup_logging()
 
+    def sobrescribir(self, opciones: Dict[str, Any]) -> None:
+        """Reemplaza valores de [Settings] (p. ej. las opciones de un trabajo por lotes) antes de leerlos."""
+        for clave, valor in opciones.items():
+            if isinstance(valor, bool):
+                valor = "true" if valor else "false"
+            elif isinstance(valor, (list, tuple)):
+                valor = ",".join(str(v) for v in valor)
+            self.config["Settings"][clave] = "" if valor is None else str(valor)
+
     def setup_logging(self) -> None:
         """Configura el logging según el nivel especificado en el config."""
         nivel = self.config["Settings"].get("log_level", "INFO")
@@ -60,3 +83,97 @@ class Configuracion:
         except ValueError as e:
             logging.warning(f"Valor inválido para estimated_manual_time: {e}. Usando 1800 como predeterminado.")
             return 1800  # Valor por defecto si la conversión falla
+
+    def obtener_num_procesos(self) -> int:
+        """Obtiene el número de procesos para el recorte paralelo (0 = todos los núcleos)."""
+        try:
+            num_procesos = self.config["Settings"].getint("num_procesos", 1)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para num_procesos: {e}. Usando recorte serial.")
+            return 1
+        if num_procesos <= 0:
+            return os.cpu_count() or 1
+        return num_procesos
+
+    def obtener_hilos_tuberia(self) -> int:
+        """Obtiene los hilos de recorte de la tubería lectura/recorte/escritura (0 = recorte serial)."""
+        try:
+            return max(self.config["Settings"].getint("hilos_tuberia", 2), 0)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para hilos_tuberia: {e}. Usando recorte serial.")
+            return 0
+
+    def obtener_preparacion_memoria(self) -> str:
+        """Obtiene cuándo se vuelcan las capas recortadas en memoria: "final", "dataset" o "" si no se usa."""
+        volcado = self.config["Settings"].get("preparacion_memoria", "no").strip().lower()
+        if volcado in ("", "no"):
+            return ""
+        if volcado not in ("final", "dataset"):
+            logging.warning(f"Valor inválido para preparacion_memoria: {volcado}. Se escribe directo en disco.")
+            return ""
+        return volcado
+
+    def obtener_preparacion_memoria_mb(self) -> int:
+        """Obtiene la memoria máxima en MB para las capas recortadas antes de volcarlas."""
+        try:
+            return self.config["Settings"].getint("preparacion_memoria_mb", 1024)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para preparacion_memoria_mb: {e}. Usando 1024 MB.")
+            return 1024
+
+    def obtener_claves_tablas(self) -> Tuple[str, ...]:
+        """Obtiene los campos que unen capas y tablas TB para el recorte relacional; vacío copia las tablas completas."""
+        campos = self.config["Settings"].get("claves_tablas", "")
+        return tuple(campo.strip() for campo in campos.split(",") if campo.strip())
+
+    def obtener_motor(self) -> str:
+        """Obtiene el motor de geoprocesamiento: "arcpy" o "gdal" (GDAL + Shapely)."""
+        return self.config["Settings"].get("motor", "arcpy").strip().lower()
+
+    def obtener_metricas(self) -> bool:
+        """Indica si se registran las métricas por capa junto a la GDB de salida."""
+        try:
+            return self.config["Settings"].getboolean("metricas", True)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para metricas: {e}. Se registran por defecto.")
+            return True
+
+    def obtener_progreso_s(self) -> Optional[float]:
+        """Obtiene los segundos entre mensajes de avance con tiempo restante; None si están desactivados."""
+        valor = self.config["Settings"].get("progreso_s", "10").strip()
+        if not valor:
+            return None
+        try:
+            return max(float(valor), 0.0)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para progreso_s: {e}. Usando 10 segundos.")
+            return 10.0
+
+    def obtener_optimizar_salida(self) -> bool:
+        """Indica si se reconstruyen los índices espaciales y se compacta la GDB de salida al terminar."""
+        try:
+            return self.config["Settings"].getboolean("optimizar_salida", False)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para optimizar_salida: {e}. No se optimiza la salida.")
+            return False
+
+    def obtener_copia_comprimida(self) -> bool:
+        """Indica si al optimizar la salida se crea además una copia comprimida de solo lectura."""
+        try:
+            return self.config["Settings"].getboolean("copia_comprimida", False)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para copia_comprimida: {e}. No se crea la copia comprimida.")
+            return False
+
+    def obtener_cache_catalogo(self) -> Optional[Path]:
+        """Obtiene la carpeta de la caché de catálogos de GDB; None si está desactivada."""
+        carpeta = self.config["Settings"].get("cache_catalogo", "").strip()
+        return Path(carpeta).expanduser() if carpeta else None
+
+    def obtener_cache_catalogo_mb(self) -> int:
+        """Obtiene el tamaño máximo en MB de la caché de catálogos."""
+        try:
+            return self.config["Settings"].getint("cache_catalogo_mb", 50)
+        except ValueError as e:
+            logging.warning(f"Valor inválido para cache_catalogo_mb: {e}. Usando 50 MB.")
+            return 50
@@ -0,0 +1,242 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional
+from configuracion import Configuracion
+from main import crear_salida, preparar_motor, recortar_en_salida
+from motor_base import MotorGeoprocesamiento
+from validaciones import validar_entradas
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Estado de cada trabajo en el resumen
+TERMINADO = "terminado"
+FALLIDO = "fallido"
+
+# Memoria que se aparta para cada trabajo al decidir cuántos corren a la vez
+MEMORIA_POR_TRABAJO_MB = 2048
+
+# Cambios a config.ini para los trabajos por lotes: los núcleos ya se reparten entre trabajos,
+# así que cada uno recorta en un solo proceso salvo que sus opciones indiquen otra cosa
+OPCIONES_LOTE = {"num_procesos": 1}
+
+class Trabajo(NamedTuple):
+    """Recorte de una GDB con un área, sin preguntas interactivas."""
+
+    nombre: str
+    gdb_entrada: str
+    clip_features: str
+    carpeta_salida: str
+    opciones: Dict[str, Any]  # Valores de [Settings] de config.ini que cambian para este trabajo
+
+def cargar_trabajos(ruta: Path) -> List[Trabajo]:
+    """Lee un archivo de trabajos en JSON o YAML.
+
+    El archivo es una lista de trabajos o un objeto con "trabajos" y unas
+    "opciones" comunes. Cada trabajo indica gdb_entrada y area, y puede
+    indicar nombre, carpeta_salida (por defecto la de la GDB de entrada) y
+    opciones propias, que prevalecen sobre las comunes.
+
+    Raises:
+        ValueError: Si el archivo no tiene el formato esperado, o es YAML y PyYAML no está instalado.
+    """
+    ruta = Path(ruta)
+    texto = ruta.read_text(encoding="utf-8")
+    if ruta.suffix.lower() in (".yaml", ".yml"):
+        if yaml is None:
+            raise ValueError(f"Para leer {ruta} se requiere PyYAML; use un archivo .json.")
+        datos = yaml.safe_load(texto)
+    else:
+        datos = json.loads(texto)
+
+    comunes: Dict[str, Any] = {}
+    if isinstance(datos, dict):
+        comunes = datos.get("opciones") or {}
+        datos = datos.get("trabajos")
+    if not isinstance(datos, list):
+        raise ValueError(f"{ruta} debe contener una lista de trabajos.")
+
+    return [trabajo_desde_dict(entrada, i, comunes) for i, entrada in enumerate(datos, 1)]
+
+def trabajo_desde_dict(entrada: Any, numero: int, comunes: Optional[Dict[str, Any]] = None) -> Trabajo:
+    """Crea un trabajo a partir de una entrada del archivo de trabajos o de una petición al servicio.
+
+    Args:
+        entrada: Diccionario con gdb_entrada, area y, opcionalmente, nombre, carpeta_salida y opciones.
+        numero: Número del trabajo, para el nombre por defecto y los mensajes de error.
+        comunes: Opciones comunes sobre las que prevalecen las del trabajo.
+
+    Raises:
+        ValueError: Si la entrada no indica gdb_entrada y area.
+    """
+    if not isinstance(entrada, dict) or not entrada.get("gdb_entrada") or not entrada.get("area"):
+        raise ValueError(f"El trabajo {numero} debe indicar gdb_entrada y area.")
+    gdb_entrada = str(entrada["gdb_entrada"])
+    return Trabajo(
+        nombre=str(entrada.get("nombre") or f"trabajo_{numero}"),
+        gdb_entrada=gdb_entrada,
+        clip_features=str(entrada["area"]),
+        carpeta_salida=str(entrada.get("carpeta_salida") or Path(gdb_entrada).parent),
+        opciones={**(comunes or {}), **(entrada.get("opciones") or {})},
+    )
+
+def memoria_disponible() -> Optional[int]:
+    """Bytes de memoria física libre, o None si el sistema no permite consultarla."""
+    if os.name == "nt":
+        import ctypes
+
+        class _EstadoMemoria(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        estado = _EstadoMemoria()
+        estado.dwLength = ctypes.sizeof(_EstadoMemoria)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(estado)):
+            return estado.ullAvailPhys
+        return None
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def procesos_lote(num_trabajos: int, memoria_por_trabajo_mb: int = MEMORIA_POR_TRABAJO_MB) -> int:
+    """Trabajos que pueden correr a la vez según los núcleos y la memoria libre."""
+    procesos = os.cpu_count() or 1
+    libre = memoria_disponible()
+    if libre is not None and memoria_por_trabajo_mb > 0:
+        procesos = min(procesos, libre // (memoria_por_trabajo_mb * 1024 * 1024))
+    return max(1, min(procesos, num_trabajos))
+
+def ejecutar_trabajo(trabajo: Trabajo, ruta_config: Optional[str] = None,
+                     motor: Optional[MotorGeoprocesamiento] = None) -> Dict[str, Any]:
+    """Recorta un trabajo con config.ini como base y sus opciones encima.
+
+    Args:
+        trabajo: Trabajo a recortar.
+        ruta_config: config.ini con los valores por defecto; por defecto el del proyecto.
+        motor: Motor ya cargado que se reutiliza entre trabajos (servicio.py); por defecto se
+            crea uno con la configuración del trabajo, y entonces la opción motor sí se respeta.
+
+    Returns:
+        Resultado del trabajo para el resumen: estado, GDB de salida, segundos y error si falló.
+    """
+    inicio = time.perf_counter()
+    resultado: Dict[str, Any] = {"nombre": trabajo.nombre, "gdb_entrada": trabajo.gdb_entrada,
+                                 "area": trabajo.clip_features, "estado": FALLIDO, "gdb_salida": None,
+                                 "segundos": None, "error": None}
+    try:
+        config = Configuracion(Path(ruta_config)) if ruta_config else Configuracion()
+        config.sobrescribir({**OPCIONES_LOTE, **trabajo.opciones})
+        if motor is None:
+            motor = preparar_motor(config)
+        else:
+            motor.campos_clave_tablas = config.obtener_claves_tablas()
+        valido, mensaje = validar_entradas(trabajo.gdb_entrada, trabajo.clip_features, motor)
+        if not valido:
+            raise ValueError(mensaje)
+        carpeta_salida = Path(trabajo.carpeta_salida)
+        if not carpeta_salida.is_dir():
+            raise ValueError(f"La carpeta de salida no existe: {carpeta_salida}")
+        gdb_salida, manifiesto = crear_salida(trabajo.gdb_entrada, trabajo.clip_features, carpeta_salida,
+                                              config, motor)
+        resultado["gdb_salida"] = gdb_salida
+        logging.info(f"Trabajo {trabajo.nombre}: recortando {trabajo.gdb_entrada} en {gdb_salida}")
+        recortar_en_salida(trabajo.gdb_entrada, trabajo.clip_features, gdb_salida, config, motor, manifiesto)
+        resultado["estado"] = TERMINADO
+    except Exception as e:
+        logging.error(f"Trabajo {trabajo.nombre} fallido: {e}")
+        resultado["error"] = str(e)
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+def ejecutar_lote(trabajos: List[Trabajo], procesos: Optional[int] = None, ruta_config: Optional[str] = None,
+                  memoria_por_trabajo_mb: int = MEMORIA_POR_TRABAJO_MB) -> List[Dict[str, Any]]:
+    """Ejecuta los trabajos repartidos en un pool de procesos, uno por trabajo a la vez.
+
+    Un trabajo que falla no detiene a los demás; su error queda en el resultado.
+
+    Args:
+        trabajos: Trabajos a ejecutar.
+        procesos: Trabajos simultáneos; por defecto según los núcleos y la memoria libre. 1 los ejecuta en serie.
+        ruta_config: config.ini con los valores por defecto; por defecto el del proyecto.
+        memoria_por_trabajo_mb: Memoria que se aparta por trabajo al calcular los procesos.
+
+    Returns:
+        Resultado de cada trabajo, en el orden del archivo.
+    """
+    procesos = procesos or procesos_lote(len(trabajos), memoria_por_trabajo_mb)
+    logging.info(f"Ejecutando {len(trabajos)} trabajos con {procesos} procesos...")
+    if procesos == 1:
+        return [ejecutar_trabajo(trabajo, ruta_config) for trabajo in trabajos]
+
+    resultados = []
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = [pool.submit(ejecutar_trabajo, trabajo, ruta_config) for trabajo in trabajos]
+        for trabajo, futuro in zip(trabajos, futuros):
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # El proceso del trabajo terminó de forma anormal (p. ej. sin memoria)
+                logging.error(f"Trabajo {trabajo.nombre} fallido: {e}")
+                resultado = {"nombre": trabajo.nombre, "gdb_entrada": trabajo.gdb_entrada,
+                             "area": trabajo.clip_features, "estado": FALLIDO, "gdb_salida": None,
+                             "segundos": None, "error": str(e)}
+            resultados.append(resultado)
+    return resultados
+
+def escribir_resumen(resultados: List[Dict[str, Any]], ruta: Path, segundos: float) -> Dict[str, Any]:
+    """Guarda el resumen del lote en JSON y lo muestra en el log."""
+    resumen = {
+        "trabajos": resultados,
+        "terminados": sum(1 for r in resultados if r["estado"] == TERMINADO),
+        "fallidos": sum(1 for r in resultados if r["estado"] != TERMINADO),
+        "total_s": round(segundos, 3),
+    }
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(resumen, archivo, ensure_ascii=False, indent=2)
+    for r in resultados:
+        detalle = r["gdb_salida"] if r["estado"] == TERMINADO else r["error"]
+        segundos_trabajo = f"{r['segundos']:.2f} s" if r["segundos"] is not None else "-"
+        logging.info(f"  {r['estado']:<10} {segundos_trabajo:>10}  {r['nombre']}: {detalle}")
+    logging.info(f"Lote: {resumen['terminados']} trabajos terminados y {resumen['fallidos']} fallidos "
+                 f"en {segundos:.2f} segundos. Resumen en {ruta}")
+    return resumen
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ejecuta un archivo de trabajos sin preguntas interactivas; devuelve 1 si algún trabajo falló."""
+    parser = argparse.ArgumentParser(description="Ejecuta en lote los recortes de un archivo de trabajos JSON o YAML.")
+    parser.add_argument("trabajos", help="Archivo .json o .yaml con la lista de trabajos.")
+    parser.add_argument("--procesos", type=int, help="Trabajos simultáneos (por defecto según núcleos y memoria).")
+    parser.add_argument("--memoria-trabajo-mb", type=int, default=MEMORIA_POR_TRABAJO_MB,
+                        help="Memoria que se aparta por trabajo al calcular los trabajos simultáneos.")
+    parser.add_argument("--config", help="config.ini con los valores por defecto de los trabajos.")
+    parser.add_argument("--resumen", help="Archivo JSON del resumen (por defecto <trabajos>.resumen.json).")
+    args = parser.parse_args(argv)
+
+    Configuracion(Path(args.config)) if args.config else Configuracion()  # Configura el logging
+    ruta = Path(args.trabajos)
+    try:
+        trabajos = cargar_trabajos(ruta)
+    except (OSError, ValueError) as e:
+        logging.error(f"No se puede leer el archivo de trabajos {ruta}: {e}")
+        return 1
+
+    inicio = time.time()
+    resultados = ejecutar_lote(trabajos, args.procesos, args.config, args.memoria_trabajo_mb)
+    resumen = escribir_resumen(resultados, Path(args.resumen) if args.resumen else ruta.with_suffix(".resumen.json"),
+                               time.time() - inicio)
+    return 1 if resumen["fallidos"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
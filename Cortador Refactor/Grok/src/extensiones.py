@@ -0,0 +1,76 @@
+import math
+from typing import Iterable, List, NamedTuple, Tuple
+
+class Extension(NamedTuple):
+    """Rectángulo envolvente de una capa o geometría."""
+
+    xmin: float
+    ymin: float
+    xmax: float
+    ymax: float
+
+    @classmethod
+    def desde_arcpy(cls, extent) -> "Extension":
+        """Convierte un arcpy.Extent en una Extension."""
+        return cls(extent.XMin, extent.YMin, extent.XMax, extent.YMax)
+
+    @classmethod
+    def envolvente(cls, extensiones: Iterable["Extension"]) -> "Extension":
+        """Devuelve la extensión que cubre a todas las extensiones no vacías."""
+        validas = [e for e in extensiones if not e.es_vacia()]
+        if not validas:
+            return cls(float("nan"), float("nan"), float("nan"), float("nan"))
+        return cls(min(e.xmin for e in validas), min(e.ymin for e in validas),
+                   max(e.xmax for e in validas), max(e.ymax for e in validas))
+
+    def centro(self) -> Tuple[float, float]:
+        """Devuelve el punto central de la extensión."""
+        return (self.xmin + self.xmax) / 2, (self.ymin + self.ymax) / 2
+
+    def es_vacia(self) -> bool:
+        """Indica si la extensión no tiene coordenadas válidas (p. ej. capa sin registros)."""
+        if any(v is None or math.isnan(v) for v in self):
+            return True
+        return self.xmin > self.xmax or self.ymin > self.ymax
+
+    def intersecta(self, otra: "Extension") -> bool:
+        """Indica si dos extensiones se tocan o se superponen.
+
+        Una extensión vacía nunca intersecta, por lo que las capas sin
+        registros se descartan sin consultar la geometría.
+        """
+        if self.es_vacia() or otra.es_vacia():
+            return False
+        return (self.xmin <= otra.xmax and otra.xmin <= self.xmax and
+                self.ymin <= otra.ymax and otra.ymin <= self.ymax)
+
+    def contiene(self, otra: "Extension") -> bool:
+        """Indica si otra extensión queda completamente dentro de esta."""
+        if self.es_vacia() or otra.es_vacia():
+            return False
+        return (self.xmin <= otra.xmin and otra.xmax <= self.xmax and
+                self.ymin <= otra.ymin and otra.ymax <= self.ymax)
+
+    def esquinas(self) -> List[Tuple[float, float]]:
+        """Devuelve las cuatro esquinas en orden horario desde la inferior izquierda."""
+        return [(self.xmin, self.ymin), (self.xmin, self.ymax),
+                (self.xmax, self.ymax), (self.xmax, self.ymin)]
+
+    def superficie(self) -> float:
+        """Área del rectángulo; cero si la extensión está vacía."""
+        if self.es_vacia():
+            return 0.0
+        return (self.xmax - self.xmin) * (self.ymax - self.ymin)
+
+    def interseccion(self, otra: "Extension") -> "Extension":
+        """Devuelve el rectángulo común a dos extensiones, vacío si no se tocan."""
+        if not self.intersecta(otra):
+            return Extension(float("nan"), float("nan"), float("nan"), float("nan"))
+        return Extension(max(self.xmin, otra.xmin), max(self.ymin, otra.ymin),
+                         min(self.xmax, otra.xmax), min(self.ymax, otra.ymax))
+
+    def expandir(self, fraccion: float) -> "Extension":
+        """Devuelve la extensión agrandada en una fracción de su ancho y alto."""
+        dx = (self.xmax - self.xmin) * fraccion
+        dy = (self.ymax - self.ymin) * fraccion
+        return Extension(self.xmin - dx, self.ymin - dy, self.xmax + dx, self.ymax + dy)
@@ -0,0 +1,117 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+from manejo_gdb import listar_capas
+from metricas import tamano_directorio
+from motor_base import Capa, MotorGeoprocesamiento, crear_motor
+
+# Sufijo de la copia comprimida: CartoBase_1.gdb -> CartoBase_1_comprimida.gdb
+SUFIJO_COMPRIMIDA = "_comprimida"
+
+# Máximo de procesos que reindexan a la vez: todos escriben en la misma GDB y cada uno carga su motor
+MAX_PROCESOS_INDICES = 4
+
+# Motor de cada proceso trabajador, asignado en _inicializar_trabajador
+_motor: Optional[MotorGeoprocesamiento] = None
+
+class ResultadoFinalizacion(NamedTuple):
+    """Tamaños y duración de la optimización de una GDB de salida."""
+
+    bytes_iniciales: int
+    bytes_finales: int
+    segundos: float
+    gdb_comprimida: Optional[str] = None
+    bytes_comprimida: Optional[int] = None
+
+def ruta_comprimida(gdb_salida: str) -> str:
+    """Ruta de la copia comprimida de una GDB de salida."""
+    gdb = Path(gdb_salida)
+    return str(gdb.with_name(gdb.stem + SUFIJO_COMPRIMIDA + gdb.suffix))
+
+def _inicializar_trabajador(nombre_motor: str) -> None:
+    global _motor
+    _motor = crear_motor(nombre_motor)
+
+def _optimizar_en_trabajador(capa: Capa) -> Capa:
+    _motor.optimizar_indice(capa)
+    return capa
+
+def finalizar_gdb(gdb_salida: str, motor: MotorGeoprocesamiento, num_procesos: int = 1,
+                  compactar: bool = True, comprimida: bool = False) -> Optional[ResultadoFinalizacion]:
+    """Deja la GDB de salida lista para entregar: índices espaciales, compactación y copia comprimida.
+
+    El recorte crea y elimina capas y escribe índices espaciales pensados
+    para la capa completa. Aquí cada capa recibe un índice ajustado a sus
+    entidades recortadas, en paralelo si el motor lo admite, y luego se
+    compacta la GDB. La copia comprimida es de solo lectura, para visores.
+
+    Args:
+        gdb_salida: Ruta de la GDB de salida.
+        motor: Motor de geoprocesamiento; cada trabajador crea uno del mismo tipo.
+        num_procesos: Procesos para reconstruir los índices, hasta MAX_PROCESOS_INDICES; 1 los reconstruye en serie.
+        compactar: Si se compacta la GDB después de reconstruir los índices.
+        comprimida: Si se crea además la copia comprimida junto a la GDB de salida.
+
+    Returns:
+        Tamaños y duración de la optimización, o None si no hay GDB de salida.
+    """
+    if not motor.existe(gdb_salida):
+        logging.info(f"Sin GDB de salida que optimizar: {gdb_salida}")
+        return None
+    inicio = time.perf_counter()
+    bytes_iniciales = tamano_directorio(gdb_salida)
+    # El catálogo de la salida se lee directo: no vale la pena guardarlo en la caché
+    capas = listar_capas(gdb_salida, motor, motor.catalogar(gdb_salida))
+    logging.info(f"Optimizando {len(capas)} capas de {gdb_salida}...")
+
+    num_procesos = min(num_procesos, MAX_PROCESOS_INDICES, len(capas))
+    if num_procesos > 1 and motor.admite_indices_paralelos:
+        with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_trabajador,
+                                 initargs=(motor.nombre,)) as pool:
+            futuros = {capa: pool.submit(_optimizar_en_trabajador, capa) for capa in capas}
+            for capa, futuro in futuros.items():
+                try:
+                    futuro.result()
+                except Exception as e:
+                    logging.error(f"Error reconstruyendo el índice espacial de {capa.ruta}: {e}")
+    else:
+        for capa in capas:
+            try:
+                motor.optimizar_indice(capa)
+            except Exception as e:
+                logging.error(f"Error reconstruyendo el índice espacial de {capa.ruta}: {e}")
+
+    if compactar:
+        try:
+            motor.compactar_gdb(gdb_salida)
+        except Exception as e:
+            logging.error(f"Error compactando {gdb_salida}: {e}")
+    bytes_finales = tamano_directorio(gdb_salida)
+
+    gdb_comprimida = bytes_comprimida = None
+    if comprimida:
+        destino = ruta_comprimida(gdb_salida)
+        try:
+            if motor.crear_copia_comprimida(gdb_salida, destino):
+                gdb_comprimida, bytes_comprimida = destino, tamano_directorio(destino)
+            else:
+                logging.warning(f"El motor {motor.nombre} no admite crear la copia comprimida.")
+        except Exception as e:
+            logging.error(f"Error creando la copia comprimida {destino}: {e}")
+
+    resultado = ResultadoFinalizacion(bytes_iniciales, bytes_finales, time.perf_counter() - inicio,
+                                      gdb_comprimida, bytes_comprimida)
+    mostrar_resultado(resultado)
+    return resultado
+
+def mostrar_resultado(resultado: ResultadoFinalizacion) -> None:
+    """Muestra en el log el espacio recuperado y el tiempo de la optimización."""
+    mb = 1024 * 1024
+    ahorro = resultado.bytes_iniciales - resultado.bytes_finales
+    logging.info(f"GDB optimizada en {resultado.segundos:.2f} s: {resultado.bytes_iniciales / mb:.1f} MB -> "
+                 f"{resultado.bytes_finales / mb:.1f} MB ({ahorro / mb:.1f} MB recuperados)")
+    if resultado.gdb_comprimida is not None:
+        logging.info(f"Copia comprimida de solo lectura: {resultado.gdb_comprimida} "
+                     f"({resultado.bytes_comprimida / mb:.1f} MB)")
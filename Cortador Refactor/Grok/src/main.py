@@ -1,45 +1,186 @@
+import argparse
 import logging
 import time
 from pathlib import Path
-import arcpy
+from typing import List, Optional, Tuple
+from cache_catalogo import CacheCatalogo
 from configuracion import Configuracion
+from finalizacion import finalizar_gdb
 from manejo_gdb import recortar_capas
-from utilidades import generar_nombre_gdb_unico, eliminar_archivos_temp
+from manifiesto import Manifiesto
+from metricas import Metricas, ruta_metricas
+from motor_base import MotorGeoprocesamiento, crear_motor
+from plan_recorte import mostrar_plan, planificar_recorte
+from planificador import Planificador
+from preparacion import recortar_capas_en_memoria
+from progreso import Progreso
+from recorte_paralelo import recortar_capas_paralelo
+from tuberia import recortar_capas_tuberia
+from utilidades import generar_nombre_gdb_unico, liberar_nombre_gdb
 from validaciones import validar_entradas
 
 __author__ = "Jorge Vallejo @OnfeVS"
 __version__ = "1.0.0"
 
-def main() -> None:
+def parsear_argumentos(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Lee las opciones de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Recorta una GDB con el área de un shapefile.")
+    modo = parser.add_mutually_exclusive_group()
+    modo.add_argument("--reanudar", "--resume", metavar="GDB_SALIDA",
+                      help="Continúa un recorte interrumpido en la GDB de salida indicada, "
+                           "omitiendo las capas que su manifiesto registra como terminadas.")
+    modo.add_argument("--plan", action="store_true",
+                      help="Muestra qué capas se recortarían, copiarían u omitirían, con las entidades, "
+                           "el tamaño y el tiempo estimados, sin escribir nada en disco.")
+    parser.add_argument("--anterior", "--previous", metavar="GDB_ANTERIOR",
+                        help="GDB de un recorte anterior con la misma área: las capas que no cambiaron "
+                             "desde entonces se copian de ella en lugar de recortarse de nuevo.")
+    return parser.parse_args(argv)
+
+def ejecutar_recorte(gdb_entrada: str, clip_features: str, gdb_salida: str, motor: MotorGeoprocesamiento,
+                     num_procesos: int, manifiesto: Optional[Manifiesto] = None,
+                     anterior: Optional[Manifiesto] = None, metricas: Optional[Metricas] = None,
+                     hilos_tuberia: int = 0, planificador: Optional[Planificador] = None,
+                     preparacion_memoria: str = "", preparacion_memoria_mb: int = 1024,
+                     progreso: Optional[Progreso] = None) -> None:
+    """Recorta la GDB de entrada en serie, en memoria, en tubería o en paralelo y limpia la GDB de salida.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        clip_features: Ruta del shapefile de recorte.
+        gdb_salida: Ruta de la GDB de salida, ya creada.
+        motor: Motor de geoprocesamiento.
+        num_procesos: Número de procesos; 1 recorta en serie.
+        manifiesto: Manifiesto donde registrar las capas terminadas.
+        anterior: Manifiesto de un recorte anterior del que reutilizar las capas sin cambios.
+        metricas: Registro de tiempos y volúmenes por capa.
+        hilos_tuberia: Hilos de recorte de la tubería cuando se recorta en un solo proceso; 0 recorta en serie.
+        planificador: Orden de las capas por costo para el recorte paralelo o en tubería.
+        preparacion_memoria: Volcado de las capas recortadas en memoria ("final" o "dataset"); "" escribe directo.
+        preparacion_memoria_mb: Memoria máxima para las capas recortadas antes de escribir directo.
+        progreso: Avance con el tiempo restante estimado.
+    """
+    if num_procesos > 1:
+        recortar_capas_paralelo(gdb_entrada, clip_features, gdb_salida, motor, num_procesos,
+                                manifiesto, anterior, metricas, planificador, progreso)
+    elif preparacion_memoria:
+        recortar_capas_en_memoria(gdb_entrada, clip_features, gdb_salida, motor,
+                                  preparacion_memoria_mb * 1024 * 1024, preparacion_memoria,
+                                  manifiesto, anterior, metricas, progreso)
+    elif hilos_tuberia > 0:
+        recortar_capas_tuberia(gdb_entrada, clip_features, gdb_salida, motor, hilos_tuberia,
+                               manifiesto, anterior, metricas, planificador=planificador, progreso=progreso)
+    else:
+        recortar_capas(gdb_entrada, clip_features, gdb_salida, motor, manifiesto, anterior, metricas, progreso)
+    motor.eliminar_archivos_temp(gdb_salida)
+
+def preparar_motor(config: Configuracion, solo_lectura: bool = False) -> MotorGeoprocesamiento:
+    """Crea el motor configurado con su caché de catálogos y los campos que unen capas y tablas TB."""
+    motor = crear_motor(config.obtener_motor())
+    motor.cache_catalogo = CacheCatalogo.desde_configuracion(config, solo_lectura=solo_lectura)
+    motor.campos_clave_tablas = config.obtener_claves_tablas()
+    return motor
+
+def crear_salida(gdb_entrada: str, clip_features: str, carpeta_salida: Path, config: Configuracion,
+                 motor: MotorGeoprocesamiento) -> Tuple[str, Manifiesto]:
+    """Reserva un nombre único y crea la GDB de salida con su manifiesto.
+
+    Returns:
+        Tupla (ruta de la GDB de salida, manifiesto).
+
+    Raises:
+        Exception: Si no se puede crear la GDB; la reserva del nombre se libera.
+    """
+    reservada = generar_nombre_gdb_unico(carpeta_salida, config.obtener_prefijo_gdb())
+    try:
+        gdb_salida = motor.crear_gdb(str(carpeta_salida), Path(reservada).name)
+        return gdb_salida, Manifiesto.crear(gdb_salida, gdb_entrada, clip_features)
+    except Exception:
+        liberar_nombre_gdb(reservada)
+        raise
+
+def recortar_en_salida(gdb_entrada: str, clip_features: str, gdb_salida: str, config: Configuracion,
+                       motor: MotorGeoprocesamiento, manifiesto: Manifiesto,
+                       anterior: Optional[Manifiesto] = None) -> None:
+    """Recorta en una GDB de salida ya creada con las opciones de la configuración.
+
+    Registra las métricas y el avance si están activados, libera la reserva
+    del nombre al terminar y optimiza la salida si se pidió.
+    """
+    # Las métricas de los recortes anteriores en la misma carpeta afinan el orden de las capas
+    planificador = Planificador.desde_carpeta(Path(gdb_salida).parent)
+    metricas = Metricas(ruta_metricas(gdb_salida)) if config.obtener_metricas() else None
+    intervalo_progreso = config.obtener_progreso_s()
+    progreso = Progreso(intervalo_progreso, planificador=planificador) if intervalo_progreso is not None else None
+    try:
+        ejecutar_recorte(gdb_entrada, clip_features, gdb_salida, motor, config.obtener_num_procesos(),
+                         manifiesto, anterior, metricas, config.obtener_hilos_tuberia(), planificador,
+                         config.obtener_preparacion_memoria(), config.obtener_preparacion_memoria_mb(),
+                         progreso)
+    finally:
+        if metricas is not None:
+            metricas.cerrar()
+        # El nombre queda apartado mientras dura el recorte; al reanudar no hay reserva y no se hace nada
+        liberar_nombre_gdb(gdb_salida)
+    if config.obtener_optimizar_salida():
+        finalizar_gdb(gdb_salida, motor, config.obtener_num_procesos(), comprimida=config.obtener_copia_comprimida())
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Función principal para ejecutar el script de recorte de GDB."""
+    args = parsear_argumentos(argv)
     config = Configuracion()
     logging.info(f"Script iniciado | Versión: {__version__} | Autor: {__author__}")
 
     inicio = time.time()
+    motor = preparar_motor(config, solo_lectura=args.plan)
 
-    gdb_entrada = input("Ingrese la ruta de la GDB de entrada: ").strip()
-    clip_features = input("Ingrese la ruta del shapefile para el recorte: ").strip()
+    anterior = None
+    if args.anterior:
+        try:
+            anterior = Manifiesto.cargar(args.anterior)
+        except (OSError, ValueError) as e:
+            logging.error(f"No se puede usar el recorte anterior {args.anterior}: {e}")
+            return
 
-    valido, mensaje = validar_entradas(gdb_entrada, clip_features)
-    if not valido:
-        logging.error(mensaje)
-        return
+    if args.reanudar:
+        gdb_salida = args.reanudar
+        try:
+            manifiesto = Manifiesto.cargar(gdb_salida)
+        except (OSError, ValueError) as e:
+            logging.error(f"No se puede reanudar {gdb_salida}: {e}")
+            return
+        gdb_entrada, clip_features = manifiesto.gdb_entrada, manifiesto.clip_features
+        valido, mensaje = validar_entradas(gdb_entrada, clip_features, motor)
+        if not valido:
+            logging.error(mensaje)
+            return
+        logging.info(f"Reanudando recorte en {gdb_salida}: {len(manifiesto.capas)} capas ya terminadas")
+    else:
+        gdb_entrada = input("Ingrese la ruta de la GDB de entrada: ").strip()
+        clip_features = input("Ingrese la ruta del shapefile para el recorte: ").strip()
 
-    carpeta_salida = Path(gdb_entrada).parent
-    if not carpeta_salida.is_dir():
-        logging.error(f"La carpeta de salida no existe: {carpeta_salida}")
-        return
-    
-    gdb_salida = generar_nombre_gdb_unico(carpeta_salida, config.obtener_prefijo_gdb())
-    try:
-        arcpy.CreateFileGDB_management(str(carpeta_salida), Path(gdb_salida).name)
-    except arcpy.ExecuteError as e:
-        logging.error(f"Error al crear la GDB: {e}")
-        return
-
-    arcpy.env.overwriteOutput = True
-    recortar_capas(gdb_entrada, clip_features, gdb_salida)
-    eliminar_archivos_temp(gdb_salida)
+        valido, mensaje = validar_entradas(gdb_entrada, clip_features, motor)
+        if not valido:
+            logging.error(mensaje)
+            return
+
+        carpeta_salida = Path(gdb_entrada).parent
+        if args.plan:
+            plan = planificar_recorte(gdb_entrada, clip_features, motor, Planificador.desde_carpeta(carpeta_salida))
+            mostrar_plan(plan, config.obtener_num_procesos())
+            logging.info(f"Plan calculado en {time.time() - inicio:.2f} segundos; no se escribió nada.")
+            return
+        if not carpeta_salida.is_dir():
+            logging.error(f"La carpeta de salida no existe: {carpeta_salida}")
+            return
+
+        try:
+            gdb_salida, manifiesto = crear_salida(gdb_entrada, clip_features, carpeta_salida, config, motor)
+        except Exception as e:
+            logging.error(f"Error al crear la GDB: {e}")
+            return
+
+    recortar_en_salida(gdb_entrada, clip_features, gdb_salida, config, motor, manifiesto, anterior)
 
     tiempo_total = time.time() - inicio
     tiempo_manual = config.obtener_tiempo_manual()
@@ -1,81 +1,279 @@
-import arcpy
 import logging
-from pathlib import Path
-from typing import List
-
-def obtener_datasets(gdb: str) -> List[str]:
-    """Obtiene todos los feature datasets recursivamente."""
-    arcpy.env.workspace = gdb
-    datasets = []
-    try:
-        datasets.extend(arcpy.ListDatasets("", "Feature"))
-        for ds in datasets[:]:  # Copia para evitar modificación durante iteración
-            datasets.extend(arcpy.ListDatasets(f"{ds}/*", "Feature"))
-    except arcpy.ExecuteError as e:
-        logging.error(f"Error al listar datasets: {e}")
-    return datasets
-
-def tiene_interseccion(fc: str, clip_features: str) -> bool:
-    """Verifica si una capa tiene intersección con el área de recorte."""
-    try:
-        result = arcpy.SelectLayerByLocation_management(fc, "INTERSECT", clip_features)
-        return int(arcpy.GetCount_management(result)[0]) > 0
-    except arcpy.ExecuteError:
-        return False  # Silenciamos logging aquí para evitar overhead en bucles
-
-def esta_vacia(fc: str) -> bool:
-    """Verifica si una capa está vacía."""
-    try:
-        return int(arcpy.GetCount_management(fc)[0]) == 0
-    except arcpy.ExecuteError:
-        return True  # Silenciamos logging para optimizar
-
-def recortar_capas(gdb_entrada: str, clip_features: str, gdb_salida: str) -> None:
-    """Procesa y recorta capas y datasets con un shapefile."""
-    arcpy.env.workspace = gdb_entrada
-    logging.info("Iniciando recorte de capas...")
-
-    # Procesar capas raíz
-    for fc in arcpy.ListFeatureClasses():
-        if tiene_interseccion(fc, clip_features):
-            salida = f"{gdb_salida}/{Path(fc).name}"
-            arcpy.Clip_analysis(fc, clip_features, salida)
-            if esta_vacia(salida):
-                arcpy.Delete_management(salida)
-            # Logging solo al final en main.py
-
-    # Procesar datasets
-    datasets = obtener_datasets(gdb_entrada)
-    if not datasets:
-        logging.info("No se encontraron datasets.")
-        return
-
-    for fds in datasets:
-        desc = arcpy.Describe(fds)
-        salida_fds = f"{gdb_salida}/{fds}"
-        tiene_datos = False
-
-        for fc in arcpy.ListFeatureClasses("", "", fds):
-            if tiene_interseccion(fc, clip_features):
-                if not tiene_datos:
-                    arcpy.CreateFeatureDataset_management(gdb_salida, fds, desc.spatialReference)
-                    tiene_datos = True
-                salida = f"{salida_fds}/{Path(fc).name}"
-                arcpy.Clip_analysis(fc, clip_features, salida)
-                if esta_vacia(salida):
-                    arcpy.Delete_management(salida)
-        # Logging solo al final
-
-    # Procesar tablas
-    for table in arcpy.ListTables():
-        if table.endswith("TB") and not esta_vacia(table):
-            arcpy.Copy_management(table, f"{gdb_salida}/{table}")
-    logging.info("Recorte de capas finalizado.")
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from area_recorte import AreaRecorte
+from cache_catalogo import huellas_gdb
+from catalogo import Catalogo
+from manifiesto import Manifiesto
+from metricas import MedidorSalida, Metricas, MetricasCapa
+from motor_base import COPIADA, ERROR, RECORTADA, SIN_INTERSECCION, Capa, MotorGeoprocesamiento
+from progreso import Progreso
+
+def leer_catalogo(gdb: str, motor: MotorGeoprocesamiento) -> Catalogo:
+    """Cataloga una GDB, pasando por los catálogos en memoria y la caché persistente del motor si tiene.
+
+    Un catálogo en memoria se reutiliza mientras no cambie el tamaño ni la
+    fecha de ningún archivo de la GDB, lo que cuesta un listado de la carpeta.
+    """
+    memoria = motor.catalogos_en_memoria
+    huellas = None
+    if memoria is not None:
+        try:
+            huellas = huellas_gdb(gdb)
+        except OSError:
+            pass  # La GDB no es una carpeta en disco: no se guarda en memoria
+        guardado = memoria.get(gdb)
+        if huellas is not None and guardado is not None and guardado[0] == huellas:
+            return guardado[1]
+    if motor.cache_catalogo is not None:
+        catalogo = motor.cache_catalogo.obtener(gdb, motor)
+    else:
+        catalogo = motor.catalogar(gdb)
+    if huellas is not None:
+        memoria[gdb] = (huellas, catalogo)
+    return catalogo
+
+def listar_capas(gdb_entrada: str, motor: MotorGeoprocesamiento,
+                 catalogo: Optional[Catalogo] = None) -> List[Capa]:
+    """Lista las capas a recortar en el orden en que las procesa el recorte serial.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        motor: Motor de geoprocesamiento.
+        catalogo: Catálogo ya leído de la GDB; si no se indica, el motor la recorre.
+
+    Returns:
+        Capas raíz seguidas de las capas de cada feature dataset.
+    """
+    catalogo = catalogo or leer_catalogo(gdb_entrada, motor)
+    capas = [Capa(gdb_entrada, "", fc) for fc in catalogo.capas()]
+    for fds in catalogo.datasets():
+        capas.extend(Capa(gdb_entrada, fds, fc) for fc in catalogo.capas(fds))
+    return capas
+
+def procesar_capa(capa: Capa, area: AreaRecorte, destino: Capa, motor: MotorGeoprocesamiento,
+                  medicion: Optional[MetricasCapa] = None) -> str:
+    """Verifica la intersección de una capa y la recorta o copia si corresponde.
+
+    Las capas contenidas por completo en el área de recorte se copian sin
+    recorte geométrico.
+
+    Args:
+        medicion: Si se indica, acumula el tiempo de cada etapa y el conteo del motor.
+
+    Returns:
+        SIN_INTERSECCION, VACIA, RECORTADA o COPIADA según el resultado.
+    """
+    medicion = medicion or MetricasCapa(capa)
+    motor.ultimo_conteo = None
+    with medicion.medir("interseccion"):
+        contenida = motor.esta_contenida(capa, area)
+        intersecta = contenida or motor.tiene_interseccion(capa, area)
+    if contenida:
+        with medicion.medir("copia"):
+            motor.copiar_capa(capa, destino)
+        estado = COPIADA
+    elif intersecta:
+        with medicion.medir("recorte"):
+            estado = motor.recortar_capa(capa, area, destino)
+    else:
+        estado = SIN_INTERSECCION
+    medicion.estado = estado
+    medicion.conteo = motor.ultimo_conteo
+    return estado
+
+def _campo(campos: Sequence[str], buscado: str) -> Optional[str]:
+    """Nombre de un campo tal como aparece en la capa o tabla; en una GDB no distinguen mayúsculas."""
+    return next((campo for campo in campos if campo.upper() == buscado.upper()), None)
+
+def claves_recortadas(gdb_entrada: str, gdb_salida: str, motor: MotorGeoprocesamiento, catalogo: Catalogo,
+                      campos_clave: Sequence[str]) -> Dict[str, Set[Any]]:
+    """Reúne los valores de los campos clave de las capas que quedaron en la GDB de salida.
+
+    Se leen las capas ya recortadas, que solo tienen las entidades dentro
+    del área, y no las de entrada.
+
+    Returns:
+        Valores por campo clave, en mayúsculas.
+    """
+    claves: Dict[str, Set[Any]] = {campo.upper(): set() for campo in campos_clave}
+    if not motor.existe(gdb_salida):
+        return claves
+    for dataset in [""] + motor.obtener_datasets(gdb_salida):
+        for nombre in motor.listar_capas(gdb_salida, dataset):
+            elemento = catalogo.elemento(nombre)
+            for clave in claves:
+                campo = _campo(elemento.campos, clave) if elemento is not None else None
+                if campo is not None:
+                    claves[clave] |= motor.leer_valores(Capa(gdb_salida, dataset, nombre), campo)
+    return claves
+
+def copiar_tablas(gdb_entrada: str, gdb_salida: str, motor: MotorGeoprocesamiento,
+                  catalogo: Optional[Catalogo] = None) -> None:
+    """Copia las tablas raíz terminadas en TB que tengan registros.
 
-def procesar_capa(fc: str, clip_features: str, gdb_salida: str) -> None:
-    """Procesa una capa individual (no usado en esta versión optimizada)."""
-    pass  # Eliminado para evitar redundancia con recortar_capas
+    Si el catálogo trae el número de registros no se vuelve a contar cada
+    tabla. Si el motor tiene campos_clave_tablas, de las tablas con alguno
+    de esos campos solo se copian las filas cuyo valor aparece en las
+    entidades recortadas (recorte relacional); las demás se copian completas.
+    """
+    catalogo = catalogo or leer_catalogo(gdb_entrada, motor)
+    claves = None
+    for table in catalogo.tablas():
+        tabla = Capa(gdb_entrada, "", table)
+        if not table.endswith("TB"):
+            continue
+        elemento = catalogo.elemento(table)
+        registros = elemento.registros
+        vacia = registros == 0 if registros is not None else motor.esta_vacia(tabla)
+        if vacia:
+            continue
+        campo = next((c for c in (_campo(elemento.campos, clave) for clave in motor.campos_clave_tablas) if c), None)
+        if campo is None:
+            motor.copiar_tabla(tabla, tabla.en(gdb_salida))
+            continue
+        if claves is None:
+            claves = claves_recortadas(gdb_entrada, gdb_salida, motor, catalogo, motor.campos_clave_tablas)
+        filas = motor.copiar_tabla_filtrada(tabla, tabla.en(gdb_salida), campo, claves[campo.upper()])
+        logging.info(f"Tabla {table}: {filas} filas relacionadas con las entidades recortadas.")
 
-def procesar_dataset(fds: str, clip_features: str, gdb_salida: str, gdb_entrada: str) -> None:
-    """Procesa un feature dataset (no usado en esta versión optimizada)."""
-    pass  # Eliminado para evitar redundancia con recortar_capas
+def datasets_existentes(gdb_salida: str, motor: MotorGeoprocesamiento) -> Set[str]:
+    """Datasets ya creados en la GDB de salida, para no recrearlos al reanudar un recorte."""
+    if not motor.existe(gdb_salida):
+        return set()
+    return set(motor.obtener_datasets(gdb_salida))
+
+def crear_dataset_si_falta(capa: Capa, gdb_salida: str, motor: MotorGeoprocesamiento,
+                           datasets_creados: Set[str]) -> None:
+    """Crea en la salida el dataset de la capa la primera vez que una de sus capas produce resultado."""
+    if capa.dataset and capa.dataset not in datasets_creados:
+        motor.crear_dataset(capa, gdb_salida)
+        datasets_creados.add(capa.dataset)
+
+def reutilizar_capa(capa: Capa, anterior: Manifiesto, gdb_salida: str, motor: MotorGeoprocesamiento,
+                    datasets_creados: Set[str]) -> str:
+    """Lleva a la nueva salida el resultado de una capa que no cambió desde el recorte anterior.
+
+    Copiar la capa ya recortada evita repetir los predicados y el recorte.
+
+    Returns:
+        Estado que tuvo la capa en el recorte anterior.
+    """
+    estado = anterior.estado(capa)
+    if estado in (RECORTADA, COPIADA):
+        crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+        motor.copiar_capa(capa.en(anterior.gdb_salida), capa.en(gdb_salida))
+    logging.info(f"Capa sin cambios, se reutiliza del recorte anterior: {capa.ruta}")
+    return estado
+
+def capas_pendientes(capas: List[Capa], gdb_salida: str, motor: MotorGeoprocesamiento,
+                     manifiesto: Optional[Manifiesto], anterior: Optional[Manifiesto],
+                     datasets_creados: Set[str]) -> Tuple[List[Capa], Dict[Capa, dict]]:
+    """Descarta las capas que no hace falta recortar antes de repartir el resto entre procesos o hilos.
+
+    Se omiten las capas ya terminadas según el manifiesto y se copian
+    desde el recorte anterior las que no cambiaron.
+
+    Returns:
+        Tupla (capas por recortar, firma de cada capa si hay manifiesto o recorte anterior).
+    """
+    firmas = {}
+    if manifiesto is not None or anterior is not None:
+        firmas = {capa: motor.firma(capa) for capa in capas}
+    if manifiesto is not None:
+        pendientes = [capa for capa in capas if not manifiesto.completada(capa, firmas[capa])]
+        logging.info(f"{len(capas) - len(pendientes)} capas ya terminadas, se omiten.")
+        capas = pendientes
+    if anterior is not None:
+        pendientes = []
+        for capa in capas:
+            if not anterior.completada(capa, firmas[capa]):
+                pendientes.append(capa)
+                continue
+            estado = reutilizar_capa(capa, anterior, gdb_salida, motor, datasets_creados)
+            if manifiesto is not None:
+                manifiesto.registrar(capa, estado, firmas[capa])
+        capas = pendientes
+    return capas, firmas
+
+def recortar_capas(gdb_entrada: str, clip_features: str, gdb_salida: str,
+                   motor: MotorGeoprocesamiento, manifiesto: Optional[Manifiesto] = None,
+                   anterior: Optional[Manifiesto] = None, metricas: Optional[Metricas] = None,
+                   progreso: Optional[Progreso] = None) -> None:
+    """Procesa y recorta capas y datasets con un shapefile.
+
+    El área de recorte se lee, disuelve e indexa una sola vez y se comparte
+    entre todas las capas. Si se indica un manifiesto, cada capa terminada
+    se registra en él y se omiten las que ya estaban terminadas con la
+    misma entrada y área de recorte.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        clip_features: Ruta del shapefile de recorte.
+        gdb_salida: Ruta de la GDB de salida.
+        motor: Motor de geoprocesamiento.
+        manifiesto: Manifiesto de esta ejecución.
+        anterior: Manifiesto de un recorte anterior; las capas cuya firma no
+            cambió se copian desde su GDB de salida en lugar de recortarse.
+        metricas: Registro donde escribir los tiempos y volúmenes de cada capa.
+        progreso: Avance con el tiempo restante estimado, actualizado al terminar cada capa.
+    """
+    logging.info(f"Iniciando recorte de capas con el motor {motor.nombre}...")
+    area = motor.preparar_area(clip_features)
+    catalogo = leer_catalogo(gdb_entrada, motor)
+
+    datasets_creados = datasets_existentes(gdb_salida, motor)
+    capas = listar_capas(gdb_entrada, motor, catalogo)
+    if progreso is not None:
+        progreso.iniciar(capas, catalogo)
+    medir_bytes = metricas is not None or progreso is not None
+    medidor = MedidorSalida(gdb_salida) if medir_bytes else None
+    for capa in capas:
+        medicion = MetricasCapa(capa)
+        firma = None
+        if manifiesto is not None or anterior is not None:
+            with medicion.medir("firma"):
+                firma = motor.firma(capa)
+        if manifiesto is not None and manifiesto.completada(capa, firma):
+            logging.info(f"Capa ya terminada, se omite: {capa.ruta}")
+            if progreso is not None:
+                progreso.omitir(capa)
+            continue
+
+        motor.ultimo_conteo = None
+        try:
+            if anterior is not None and anterior.completada(capa, firma):
+                with medicion.medir("copia"):
+                    estado = reutilizar_capa(capa, anterior, gdb_salida, motor, datasets_creados)
+            else:
+                with medicion.medir("interseccion"):
+                    contenida = motor.esta_contenida(capa, area)
+                    intersecta = contenida or motor.tiene_interseccion(capa, area)
+                if intersecta:
+                    crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+                    if contenida:
+                        with medicion.medir("copia"):
+                            motor.copiar_capa(capa, capa.en(gdb_salida))
+                        estado = COPIADA
+                    else:
+                        with medicion.medir("recorte"):
+                            estado = motor.recortar_capa(capa, area, capa.en(gdb_salida))
+                else:
+                    estado = SIN_INTERSECCION
+        except Exception as e:
+            # La capa queda fuera del manifiesto para que --reanudar la vuelva a intentar
+            logging.error(f"Error recortando {capa.ruta}: {e}")
+            estado = ERROR
+
+        if manifiesto is not None and estado != ERROR:
+            manifiesto.registrar(capa, estado, firma)
+        if medir_bytes:
+            medicion.estado = estado
+            medicion.conteo = motor.ultimo_conteo
+            medicion.bytes_escritos = medidor.medir()
+        if metricas is not None:
+            metricas.registrar(medicion)
+        if progreso is not None:
+            progreso.registrar(medicion)
+
+    copiar_tablas(gdb_entrada, gdb_salida, motor, catalogo)
+    logging.info("Recorte de capas finalizado.")
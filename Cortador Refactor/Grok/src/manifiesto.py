@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+from motor_base import Capa
+
+# Versión del formato del manifiesto; un manifiesto de otra versión no se reanuda
+VERSION = 1
+SUFIJO = ".manifiesto.json"
+
+def ruta_manifiesto(gdb_salida: str) -> Path:
+    """Ruta del manifiesto de una GDB de salida: CartoBase_1.gdb -> CartoBase_1.manifiesto.json."""
+    gdb = Path(gdb_salida)
+    return gdb.with_name(gdb.stem + SUFIJO)
+
+def huella(datos) -> str:
+    """Resume en un hash cualquier estructura serializable en JSON."""
+    texto = json.dumps(datos, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+def huella_archivos(ruta: str) -> str:
+    """Huella de un shapefile a partir del nombre, tamaño y fecha de sus archivos (.shp, .dbf, .prj...).
+
+    Si la ruta es una carpeta (p. ej. una GDB) se usan los archivos que contiene.
+    """
+    ruta = Path(ruta)
+    if ruta.is_dir():
+        archivos = sorted(p for p in ruta.iterdir() if p.is_file())
+    else:
+        archivos = sorted(p for p in ruta.parent.glob(f"{ruta.stem}.*") if p.is_file())
+    return huella([(p.name, p.stat().st_size, p.stat().st_mtime_ns) for p in archivos])
+
+def clave_capa(capa: Capa) -> str:
+    """Identifica una capa dentro de la GDB, sin depender de la ruta de la GDB."""
+    return f"{capa.dataset}/{capa.nombre}" if capa.dataset else capa.nombre
+
+class Manifiesto:
+    """Registro de las capas terminadas en un recorte, guardado junto a la GDB de salida.
+
+    Cada capa terminada queda con su estado y una huella de la capa de
+    entrada y del área de recorte; al reanudar se omiten las capas cuya
+    huella no cambió.
+    """
+
+    def __init__(self, ruta: Path, gdb_entrada: str, clip_features: str,
+                 capas: Optional[Dict[str, dict]] = None):
+        self.ruta = Path(ruta)
+        self.gdb_entrada = gdb_entrada
+        self.clip_features = clip_features
+        self.capas: Dict[str, dict] = capas or {}
+        # La huella del área se toma al abrir el manifiesto: si el shapefile cambió, nada se reutiliza
+        self.huella_area = huella_archivos(clip_features)
+
+    @classmethod
+    def crear(cls, gdb_salida: str, gdb_entrada: str, clip_features: str) -> "Manifiesto":
+        """Crea y guarda un manifiesto vacío para una GDB de salida nueva."""
+        manifiesto = cls(ruta_manifiesto(gdb_salida), gdb_entrada, clip_features)
+        manifiesto.guardar()
+        return manifiesto
+
+    @classmethod
+    def cargar(cls, gdb_salida: str) -> "Manifiesto":
+        """Carga el manifiesto de una GDB de salida.
+
+        Raises:
+            FileNotFoundError: Si la GDB no tiene manifiesto.
+            ValueError: Si el manifiesto es de otra versión.
+        """
+        ruta = ruta_manifiesto(gdb_salida)
+        with open(ruta, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+        if datos.get("version") != VERSION:
+            raise ValueError(f"Versión de manifiesto no soportada en {ruta}: {datos.get('version')}")
+        return cls(ruta, datos["gdb_entrada"], datos["clip_features"], datos.get("capas"))
+
+    @property
+    def gdb_salida(self) -> str:
+        """Ruta de la GDB de salida a la que pertenece el manifiesto."""
+        return str(self.ruta.with_name(self.ruta.name[:-len(SUFIJO)] + ".gdb"))
+
+    def _huella_capa(self, firma: dict) -> str:
+        return huella([firma, self.huella_area])
+
+    def completada(self, capa: Capa, firma: dict) -> bool:
+        """Indica si la capa ya se terminó con la misma entrada y la misma área de recorte."""
+        registro = self.capas.get(clave_capa(capa))
+        return registro is not None and registro["huella"] == self._huella_capa(firma)
+
+    def estado(self, capa: Capa) -> Optional[str]:
+        """Estado con el que terminó la capa, o None si no está registrada."""
+        registro = self.capas.get(clave_capa(capa))
+        return registro["estado"] if registro else None
+
+    def registrar(self, capa: Capa, estado: str, firma: dict) -> None:
+        """Marca una capa como terminada y guarda el manifiesto en disco."""
+        self.capas[clave_capa(capa)] = {"estado": estado, "huella": self._huella_capa(firma)}
+        self.guardar()
+
+    def guardar(self) -> None:
+        """Escribe el manifiesto de forma atómica para que un corte no lo deje a medias."""
+        datos = {
+            "version": VERSION,
+            "gdb_entrada": self.gdb_entrada,
+            "clip_features": self.clip_features,
+            "huella_area": self.huella_area,
+            "capas": self.capas,
+        }
+        temporal = self.ruta.with_name(self.ruta.name + ".tmp")
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(datos, archivo, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.ruta)
@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from manifiesto import clave_capa
+from motor_base import Capa, Conteo
+
+SUFIJO = ".metricas.jsonl"
+
+# Capas más lentas que se muestran en el resumen de la ejecución
+CAPAS_LENTAS = 10
+
+# Una tabla de File GDB se guarda como a<identificador hexadecimal>.gdbtable y sus archivos compañeros
+PATRON_TABLA = re.compile(r"^a([0-9a-f]{8})\.gdbtable$", re.IGNORECASE)
+EXTENSIONES_TABLA = (".gdbtable", ".gdbtablx", ".gdbindexes", ".spx", ".freelist")
+
+# Identificadores seguidos sin archivos tras los que se deja de buscar tablas nuevas (capas vacías borradas)
+HUECOS_TABLAS = 8
+
+def ruta_metricas(gdb_salida: str) -> Path:
+    """Ruta del archivo de métricas de una GDB de salida: CartoBase_1.gdb -> CartoBase_1.metricas.jsonl."""
+    gdb = Path(gdb_salida)
+    return gdb.with_name(gdb.stem + SUFIJO)
+
+def tamano_directorio(ruta: str) -> int:
+    """Suma el tamaño de los archivos de una GDB; scandir trae el tamaño sin una llamada extra por archivo en Windows."""
+    try:
+        with os.scandir(ruta) as entradas:
+            return sum(entrada.stat().st_size for entrada in entradas if entrada.is_file())
+    except OSError:
+        return 0
+
+class MedidorSalida:
+    """Bytes escritos por cada capa en una GDB de salida sin volver a recorrer la carpeta.
+
+    Las tablas de una File GDB reciben identificadores crecientes, así que tras
+    una lectura inicial de la carpeta cada medición solo consulta los archivos
+    de las tablas creadas desde la anterior. Medir después de cada capa cuesta
+    lo mismo con diez capas escritas que con mil.
+    """
+
+    def __init__(self, gdb: str):
+        """
+        Args:
+            gdb: Ruta de la GDB de salida.
+        """
+        self.gdb = gdb
+        self.ultima_tabla = 0
+        try:
+            with os.scandir(gdb) as entradas:
+                for entrada in entradas:
+                    coincidencia = PATRON_TABLA.match(entrada.name)
+                    if coincidencia:
+                        self.ultima_tabla = max(self.ultima_tabla, int(coincidencia.group(1), 16))
+        except OSError:
+            pass
+
+    def medir(self) -> int:
+        """Suma el tamaño de las tablas creadas desde la medición anterior.
+
+        Returns:
+            Bytes de las tablas nuevas; 0 si la GDB no está en disco.
+        """
+        total = 0
+        tabla, huecos = self.ultima_tabla + 1, 0
+        while huecos < HUECOS_TABLAS:
+            tamano = self._tamano_tabla(tabla)
+            if tamano is None:
+                huecos += 1
+            else:
+                total += tamano
+                self.ultima_tabla, huecos = tabla, 0
+            tabla += 1
+        return total
+
+    def _tamano_tabla(self, tabla: int) -> Optional[int]:
+        base = os.path.join(self.gdb, f"a{tabla:08x}")
+        tamanos = []
+        for extension in EXTENSIONES_TABLA:
+            try:
+                tamanos.append(os.stat(base + extension).st_size)
+            except OSError:
+                pass
+        return sum(tamanos) if tamanos else None
+
+class MetricasCapa:
+    """Tiempos y volúmenes de una capa, acumulados por etapa."""
+
+    def __init__(self, capa: Capa):
+        self.capa = capa
+        self.estado: Optional[str] = None
+        self.tiempos: Dict[str, float] = {}
+        self.conteo: Optional[Conteo] = None
+        self.bytes_escritos = 0
+
+    @contextmanager
+    def medir(self, etapa: str) -> Iterator[None]:
+        """Suma a la etapa el tiempo del bloque."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tiempos[etapa] = self.tiempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+    @property
+    def total(self) -> float:
+        return sum(self.tiempos.values())
+
+    def como_dict(self) -> dict:
+        conteo = self.conteo or Conteo(None, None, None, None)
+        return {
+            "capa": self.capa.ruta,
+            "clave": clave_capa(self.capa),
+            "estado": self.estado,
+            "tiempos_s": {etapa: round(segundos, 6) for etapa, segundos in self.tiempos.items()},
+            "total_s": round(self.total, 6),
+            **conteo._asdict(),
+            "bytes_escritos": self.bytes_escritos,
+        }
+
+class Metricas:
+    """Registro de métricas por capa en formato JSON Lines.
+
+    Cada capa se escribe como una línea al terminar y al cerrar se agrega
+    una línea final con el resumen de la ejecución. Solo se mide con
+    perf_counter y se escribe una línea por capa, por lo que puede quedar
+    activo en producción.
+    """
+
+    def __init__(self, ruta: Optional[Path] = None):
+        """
+        Args:
+            ruta: Archivo JSON Lines de salida; sin ruta las métricas solo se resumen en el log.
+        """
+        self.ruta = Path(ruta) if ruta else None
+        self._archivo = open(self.ruta, "a", encoding="utf-8") if self.ruta else None
+        self.capas: List[dict] = []
+
+    def registrar(self, metricas_capa: MetricasCapa) -> None:
+        registro = metricas_capa.como_dict()
+        self.capas.append(registro)
+        if self._archivo:
+            self._archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._archivo.flush()
+
+    def resumen(self, capas_lentas: int = CAPAS_LENTAS) -> dict:
+        """Totales de la ejecución y las capas que más tiempo tomaron."""
+        etapas: Dict[str, float] = {}
+        for registro in self.capas:
+            for etapa, segundos in registro["tiempos_s"].items():
+                etapas[etapa] = etapas.get(etapa, 0.0) + segundos
+        total = sum(etapas.values())
+        filas = sum(registro["filas_salida"] or 0 for registro in self.capas)
+        lentas = sorted(self.capas, key=lambda registro: registro["total_s"], reverse=True)[:capas_lentas]
+        return {
+            "capas": len(self.capas),
+            "total_s": round(total, 6),
+            "tiempos_s": {etapa: round(segundos, 6) for etapa, segundos in etapas.items()},
+            "filas_escritas": filas,
+            "filas_por_segundo": round(filas / total, 1) if total else None,
+            "bytes_escritos": sum(registro["bytes_escritos"] for registro in self.capas),
+            "capas_lentas": [{"capa": r["capa"], "total_s": r["total_s"], "estado": r["estado"]} for r in lentas],
+        }
+
+    def cerrar(self) -> dict:
+        """Escribe el resumen, lo muestra en el log y cierra el archivo."""
+        resumen = self.resumen()
+        if self._archivo:
+            self._archivo.write(json.dumps({"resumen": resumen}, ensure_ascii=False) + "\n")
+            self._archivo.close()
+            self._archivo = None
+        logging.info(f"{resumen['capas']} capas en {resumen['total_s']:.2f} s, "
+                     f"{resumen['filas_escritas']} entidades escritas")
+        for lenta in resumen["capas_lentas"]:
+            logging.info(f"  {lenta['total_s']:.2f} s  {lenta['capa']} ({lenta['estado']})")
+        return resumen
@@ -0,0 +1,412 @@
+import arcpy
+import logging
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+from area_recorte import CONTENIDA, DISJUNTA, AreaRecorte
+from catalogo import CAPA, DATASET, TABLA, Catalogo, ElementoCatalogo
+from extensiones import Extension
+from motor_base import RECORTADA, SIN_INTERSECCION, VACIA, Capa, Conteo, MotorGeoprocesamiento
+
+# Divisiones por lado al densificar el área de recorte antes de reproyectarla
+DENSIFICACION_PROYECCION = 50
+
+# Dimensión que debe devolver Geometry.intersect según el tipo de geometría de la capa; los demás
+# tipos (p. ej. MultiPatch) se recortan con la herramienta Clip
+DIMENSIONES_INTERSECCION = {"Point": 1, "Multipoint": 1, "Polyline": 2, "Polygon": 4}
+
+# Tipo de elemento del catálogo según el dataType de Describe
+TIPOS_CATALOGO = {"FeatureDataset": DATASET, "FeatureClass": CAPA, "Table": TABLA}
+
+class AreaRecorteArcpy(AreaRecorte):
+    """Área de recorte con geometrías de arcpy."""
+
+    def _unir(self, partes: Sequence):
+        geometria = partes[0]
+        for parte in partes[1:]:
+            geometria = geometria.union(parte)
+        return geometria
+
+    def _contiene(self, geometria, extension: Extension) -> bool:
+        return geometria.contains(poligono_extension(extension, self.referencia))
+
+def poligono_extension(extension: Extension, referencia):
+    """Construye el rectángulo de una extensión como arcpy.Polygon."""
+    puntos = arcpy.Array([arcpy.Point(x, y) for x, y in extension.esquinas()])
+    return arcpy.Polygon(puntos, referencia)
+
+def crear_area(ruta: str, geometria, referencia) -> AreaRecorteArcpy:
+    """Separa una geometría disuelta en partes indexables y arma su área de recorte."""
+    if geometria is None:
+        return AreaRecorteArcpy(ruta, [], [], referencia)
+    # Cada parte conserva sus anillos interiores, separados por puntos nulos en getPart
+    partes = [arcpy.Polygon(geometria.getPart(i), referencia) for i in range(geometria.partCount)]
+    extensiones = [Extension.desde_arcpy(parte.extent) for parte in partes]
+    return AreaRecorteArcpy(ruta, partes, extensiones, referencia, geometria)
+
+def recortar_forma(forma, area: AreaRecorte, dimension: int):
+    """Recorta una geometría contra las partes del área que la tocan; None si queda fuera."""
+    if forma is None:
+        return None
+    geometria = area.geometria_para(Extension.desde_arcpy(forma.extent))
+    if geometria is None or geometria.disjoint(forma):
+        return None
+    if geometria.contains(forma):
+        return forma
+    recortada = forma.intersect(geometria, dimension)
+    return recortada if recortada.pointCount > 0 else None
+
+class MotorArcpy(MotorGeoprocesamiento):
+    """Motor de geoprocesamiento basado en arcpy (ArcGIS Pro)."""
+
+    nombre = "arcpy"
+    admite_indices_paralelos = True
+
+    def __init__(self):
+        arcpy.env.overwriteOutput = True
+        self._areas_proyectadas: Dict[Tuple[str, str], AreaRecorteArcpy] = {}
+        self._descripciones: Dict[Tuple[str, str], object] = {}
+        # spatial_filter de SearchCursor existe desde ArcGIS Pro 3.2; pasa a False en versiones anteriores
+        self._admite_filtro_espacial = True
+
+    def existe(self, ruta: str) -> bool:
+        return arcpy.Exists(ruta)
+
+    def crear_gdb(self, carpeta: str, nombre: str) -> str:
+        arcpy.CreateFileGDB_management(carpeta, nombre)
+        return f"{carpeta}/{nombre}"
+
+    def obtener_datasets(self, gdb: str) -> List[str]:
+        arcpy.env.workspace = gdb
+        datasets = []
+        try:
+            datasets.extend(arcpy.ListDatasets("", "Feature") or [])
+            for ds in datasets[:]:  # Copia para evitar modificación durante iteración
+                datasets.extend(arcpy.ListDatasets(f"{ds}/*", "Feature") or [])
+        except arcpy.ExecuteError as e:
+            logging.error(f"Error al listar datasets: {e}")
+        return datasets
+
+    def listar_capas(self, gdb: str, dataset: str = "") -> List[str]:
+        arcpy.env.workspace = gdb
+        return arcpy.ListFeatureClasses("", "", dataset) or []
+
+    def listar_tablas(self, gdb: str) -> List[str]:
+        arcpy.env.workspace = gdb
+        return arcpy.ListTables() or []
+
+    def catalogar(self, gdb: str) -> Catalogo:
+        """Describe la GDB una sola vez a través de sus hijos, sin cambiar el workspace por dataset.
+
+        Las descripciones se guardan para que los predicados y el recorte de
+        cada capa no vuelvan a llamar a Describe.
+        """
+        elementos = []
+        pendientes = [(arcpy.Describe(gdb), "")]
+        while pendientes:
+            padre, dataset = pendientes.pop(0)
+            for hijo in padre.children:
+                tipo = TIPOS_CATALOGO.get(hijo.dataType)
+                if tipo is None:
+                    continue
+                self._descripciones[(gdb, hijo.name)] = hijo
+                if tipo == DATASET:
+                    elementos.append(ElementoCatalogo(hijo.name, "", DATASET, hijo.spatialReference.name,
+                                                      Extension.desde_arcpy(hijo.extent)))
+                    pendientes.append((hijo, hijo.name))
+                else:
+                    elementos.append(self._describir_elemento(hijo, dataset, tipo))
+        return Catalogo(gdb, elementos)
+
+    def describir(self, gdb: str, elementos: List[ElementoCatalogo]) -> List[ElementoCatalogo]:
+        descritos = []
+        for elemento in elementos:
+            if elemento.tipo == DATASET:
+                descritos.append(elemento)
+                continue
+            desc = arcpy.Describe(Capa(gdb, elemento.dataset, elemento.nombre).ruta)
+            self._descripciones[(gdb, elemento.nombre)] = desc
+            descritos.append(self._describir_elemento(desc, elemento.dataset, elemento.tipo))
+        return descritos
+
+    def _describir_elemento(self, desc, dataset: str, tipo: str) -> ElementoCatalogo:
+        registros = int(arcpy.GetCount_management(desc.catalogPath)[0])
+        campos = tuple(campo.name for campo in desc.fields)
+        if tipo == TABLA:
+            return ElementoCatalogo(desc.name, dataset, TABLA, registros=registros, campos=campos)
+        return ElementoCatalogo(desc.name, dataset, CAPA, desc.spatialReference.name,
+                                Extension.desde_arcpy(desc.extent), desc.shapeType, registros, campos)
+
+    def _describir(self, capa: Capa):
+        """Descripción de una capa, tomada del catálogo si su GDB ya se recorrió."""
+        return self._descripciones.get((capa.gdb, capa.nombre)) or arcpy.Describe(capa.ruta)
+
+    def esta_vacia(self, capa: Capa) -> bool:
+        try:
+            return int(arcpy.GetCount_management(capa.ruta)[0]) == 0
+        except arcpy.ExecuteError:
+            return True  # Silenciamos logging para optimizar
+
+    def firma(self, capa: Capa) -> dict:
+        desc = self._describir(capa)
+        # Basta la primera fila en orden descendente para conocer el OID máximo
+        orden = (None, f"ORDER BY {desc.OIDFieldName} DESC")
+        with arcpy.da.SearchCursor(capa.ruta, ["OID@"], sql_clause=orden) as cursor:
+            oid_maximo = next(iter(cursor), (None,))[0]
+        return {"registros": int(arcpy.GetCount_management(capa.ruta)[0]),
+                "oid_maximo": oid_maximo,
+                "extension": list(Extension.desde_arcpy(desc.extent))}
+
+    def preparar_area(self, clip_features: str) -> AreaRecorteArcpy:
+        """Disuelve el shapefile de recorte y separa sus partes para indexarlas."""
+        referencia = arcpy.Describe(clip_features).spatialReference
+        geometria = None
+        with arcpy.da.SearchCursor(clip_features, ["SHAPE@"]) as cursor:
+            for (forma,) in cursor:
+                if forma is not None:
+                    geometria = forma if geometria is None else geometria.union(forma)
+        return crear_area(clip_features, geometria, referencia)
+
+    def preparar_areas_por_campo(self, clip_features: str, campo: str) -> Dict[str, AreaRecorteArcpy]:
+        referencia = arcpy.Describe(clip_features).spatialReference
+        geometrias = {}
+        with arcpy.da.SearchCursor(clip_features, ["SHAPE@", campo]) as cursor:
+            for forma, valor in cursor:
+                if forma is None:
+                    continue
+                valor = str(valor)
+                geometrias[valor] = forma if valor not in geometrias else geometrias[valor].union(forma)
+        return {valor: crear_area(f"{clip_features}[{campo}={valor}]", geometria, referencia)
+                for valor, geometria in geometrias.items()}
+
+    def _area_en(self, area: AreaRecorte, referencia) -> AreaRecorte:
+        """Obtiene el área de recorte en la referencia espacial de una capa.
+
+        Si la referencia es distinta a la del shapefile, la geometría se
+        densifica y reproyecta una sola vez por sistema de coordenadas y se
+        vuelve a indexar; así ni los predicados ni el recorte reproyectan
+        entidades capa por capa.
+        """
+        if area.geometria is None or referencia is None or referencia.name == area.referencia.name:
+            return area
+        clave = (area.ruta, referencia.name)
+        if clave not in self._areas_proyectadas:
+            lado = max(area.extension.xmax - area.extension.xmin, area.extension.ymax - area.extension.ymin)
+            geometria = area.geometria.densify("DISTANCE", lado / DENSIFICACION_PROYECCION).projectAs(referencia)
+            self._areas_proyectadas[clave] = crear_area(area.ruta, geometria, referencia)
+            logging.info(f"Área de recorte {area.ruta} proyectada a {referencia.name}")
+        return self._areas_proyectadas[clave]
+
+    def _area_y_extension(self, capa: Capa, area: AreaRecorte) -> Tuple[AreaRecorte, Extension]:
+        """Área de recorte en el sistema de la capa y extensión de la capa en ese mismo sistema."""
+        desc = self._describir(capa)
+        return self._area_en(area, desc.spatialReference), Extension.desde_arcpy(desc.extent)
+
+    def tiene_interseccion(self, capa: Capa, area: AreaRecorte) -> bool:
+        """Verifica si una capa tiene intersección con el área de recorte.
+
+        La selección espacial solo se ejecuta si la extensión de la capa se
+        superpone con alguna parte del área, y únicamente contra esas partes.
+        """
+        try:
+            area, extension = self._area_y_extension(capa, area)
+            relacion = area.relacion(extension)
+            if relacion == DISJUNTA:
+                return False
+            if relacion == CONTENIDA:
+                return True
+            result = arcpy.SelectLayerByLocation_management(capa.ruta, "INTERSECT", area.geometria_para(extension))
+            return int(arcpy.GetCount_management(result)[0]) > 0
+        except arcpy.ExecuteError:
+            return False  # Silenciamos logging aquí para evitar overhead en bucles
+
+    def esta_contenida(self, capa: Capa, area: AreaRecorte) -> bool:
+        try:
+            area, extension = self._area_y_extension(capa, area)
+            return area.relacion(extension) == CONTENIDA
+        except arcpy.ExecuteError:
+            return False
+
+    def crear_dataset(self, origen: Capa, gdb_salida: str) -> None:
+        desc = arcpy.Describe(f"{origen.gdb}/{origen.dataset}")
+        arcpy.CreateFeatureDataset_management(gdb_salida, origen.dataset, desc.spatialReference)
+
+    def recortar_capa(self, capa: Capa, area: AreaRecorte, destino: Capa) -> str:
+        estado = self.recortar_capa_multiple(capa, {"": area}, {"": destino})[""]
+        return VACIA if estado == SIN_INTERSECCION else estado
+
+    def recortar_capa_multiple(self, capa: Capa, areas: Dict[str, AreaRecorte],
+                               destinos: Dict[str, Capa]) -> Dict[str, str]:
+        """Recorta una capa contra una o varias áreas en una sola pasada con cursores.
+
+        Cada entidad se lee una vez, en el sistema de la capa, y se recorta
+        contra todas las áreas que la tocan, ya proyectadas a ese sistema.
+        La capa de salida de cada área se crea con la primera
+        entidad que sobrevive, por lo que un recorte vacío no escribe,
+        cuenta ni elimina nada.
+        """
+        estados = {}
+        candidatas = {}
+        desc = self._describir(capa)
+        extension = Extension.desde_arcpy(desc.extent)
+        for nombre, area in areas.items():
+            area = self._area_en(area, desc.spatialReference)
+            if area.geometria_para(extension) is None:
+                estados[nombre] = SIN_INTERSECCION
+            else:
+                candidatas[nombre] = area
+        if not candidatas:
+            return estados
+
+        dimension = DIMENSIONES_INTERSECCION.get(desc.shapeType)
+        if dimension is None:
+            estados.update(self._recortar_con_herramienta(capa, candidatas, destinos, desc))
+            return estados
+        campos = ["SHAPE@"] + [campo.name for campo in desc.fields if campo.editable and campo.type != "Geometry"]
+        # El cursor solo entrega las entidades que tocan el área (o el rectángulo que abarca todas las
+        # áreas); sin filtro se leería la capa completa para descartar casi todo en Python
+        if len(candidatas) == 1:
+            filtro = next(iter(candidatas.values())).geometria_para(extension)
+        else:
+            filtro = poligono_extension(Extension.envolvente(area.extension for area in candidatas.values()),
+                                        desc.spatialReference)
+        salidas = {}
+        filas_entrada = filas_salida = vertices_entrada = vertices_salida = 0
+        try:
+            with self._cursor_filtrado(capa.ruta, campos, filtro) as cursor:
+                for fila in cursor:
+                    filas_entrada += 1
+                    vertices_entrada += fila[0].pointCount if fila[0] is not None else 0
+                    for nombre, area in candidatas.items():
+                        forma = recortar_forma(fila[0], area, dimension)
+                        if forma is None:
+                            continue
+                        if nombre not in salidas:
+                            self._crear_capa(desc, destinos[nombre])
+                            salidas[nombre] = arcpy.da.InsertCursor(destinos[nombre].ruta, campos)
+                        salidas[nombre].insertRow((forma,) + tuple(fila[1:]))
+                        filas_salida += 1
+                        vertices_salida += forma.pointCount
+            self.ultimo_conteo = Conteo(filas_entrada, filas_salida, vertices_entrada, vertices_salida)
+            for nombre in candidatas:
+                estados[nombre] = RECORTADA if nombre in salidas else VACIA
+            return estados
+        finally:
+            salidas.clear()  # Libera los cursores de inserción y sus bloqueos
+
+    def _cursor_filtrado(self, ruta: str, campos: List[str], filtro):
+        """Cursor de lectura limitado a las entidades que tocan el filtro.
+
+        En ArcGIS Pro anterior a 3.2 SearchCursor no acepta spatial_filter y
+        lanza TypeError: se avisa una vez y desde entonces se leen las capas
+        completas, y recortar_forma descarta las entidades de fuera.
+        """
+        if self._admite_filtro_espacial:
+            try:
+                return arcpy.da.SearchCursor(ruta, campos, spatial_filter=filtro)
+            except TypeError:
+                self._admite_filtro_espacial = False
+                logging.warning("Esta versión de ArcGIS Pro no admite spatial_filter (requiere 3.2); "
+                                "se leen las capas completas.")
+        return arcpy.da.SearchCursor(ruta, campos)
+
+    def _recortar_con_herramienta(self, capa: Capa, areas: Dict[str, AreaRecorte], destinos: Dict[str, Capa],
+                                  desc) -> Dict[str, str]:
+        """Recorta con la herramienta Clip los tipos de geometría que Geometry.intersect no admite.
+
+        Clip siempre escribe la salida, así que las vacías se cuentan y se eliminan.
+        """
+        estados = {}
+        extension = Extension.desde_arcpy(desc.extent)
+        filas_salida = 0
+        for nombre, area in areas.items():
+            destino = destinos[nombre]
+            self._crear_dataset_si_falta(desc, destino)
+            arcpy.Clip_analysis(capa.ruta, area.geometria_para(extension), destino.ruta)
+            filas = int(arcpy.GetCount_management(destino.ruta)[0])
+            if filas:
+                estados[nombre] = RECORTADA
+                filas_salida += filas
+            else:
+                arcpy.Delete_management(destino.ruta)
+                estados[nombre] = VACIA
+        self.ultimo_conteo = Conteo(None, filas_salida, None, None)
+        return estados
+
+    def _crear_dataset_si_falta(self, desc, destino: Capa) -> str:
+        """Crea el dataset de destino si aún no existe y devuelve la ubicación de la capa."""
+        ubicacion = f"{destino.gdb}/{destino.dataset}" if destino.dataset else destino.gdb
+        if destino.dataset and not arcpy.Exists(ubicacion):
+            arcpy.CreateFeatureDataset_management(destino.gdb, destino.dataset, desc.spatialReference)
+        return ubicacion
+
+    def _crear_capa(self, desc, destino: Capa) -> None:
+        """Crea una feature class vacía con el esquema de la capa descrita, y su dataset si aún no existe."""
+        ubicacion = self._crear_dataset_si_falta(desc, destino)
+        arcpy.CreateFeatureclass_management(
+            ubicacion, destino.nombre, desc.shapeType, desc.catalogPath,
+            "ENABLED" if desc.hasM else "DISABLED", "ENABLED" if desc.hasZ else "DISABLED",
+            desc.spatialReference)
+
+    def copiar_capa(self, capa: Capa, destino: Capa) -> None:
+        arcpy.CopyFeatures_management(capa.ruta, destino.ruta)
+        filas = int(arcpy.GetCount_management(destino.ruta)[0])
+        self.ultimo_conteo = Conteo(filas, filas, None, None)
+
+    def copiar_tabla(self, tabla: Capa, destino: Capa) -> None:
+        arcpy.Copy_management(tabla.ruta, destino.ruta)
+
+    def leer_valores(self, capa: Capa, campo: str) -> Set[Any]:
+        with arcpy.da.SearchCursor(capa.ruta, [campo]) as cursor:
+            return {valor for (valor,) in cursor if valor is not None}
+
+    def copiar_tabla_filtrada(self, tabla: Capa, destino: Capa, campo: str, valores: Iterable[Any]) -> int:
+        valores = set(valores)
+        campos = [c.name for c in arcpy.ListFields(tabla.ruta) if c.editable]
+        # La clave puede no ser editable (OBJECTID, GlobalID): se lee al final de la fila y no se inserta
+        lectura = campos if campo in campos else campos + [campo]
+        posicion = lectura.index(campo)
+        filas = 0
+        salida = None
+        try:
+            with arcpy.da.SearchCursor(tabla.ruta, lectura) as cursor:
+                for fila in cursor:
+                    if fila[posicion] not in valores:
+                        continue
+                    if salida is None:
+                        arcpy.CreateTable_management(destino.gdb, destino.nombre, tabla.ruta)
+                        salida = arcpy.da.InsertCursor(destino.ruta, campos)
+                    salida.insertRow(fila[:len(campos)])
+                    filas += 1
+        finally:
+            del salida  # Libera el cursor de inserción y su bloqueo
+        return filas
+
+    def crear_gdb_memoria(self) -> str:
+        """Usa el espacio de trabajo memory de ArcGIS Pro."""
+        return "memory"
+
+    def vaciar_gdb_memoria(self, gdb: str) -> None:
+        arcpy.Delete_management(gdb)
+
+    def eliminar_archivos_temp(self, gdb: str) -> None:
+        templates = ["GDB_EditingTemplates", "GDB_EditingTemplateRelationships"]
+        for template in templates:
+            ruta = f"{gdb}/{template}"
+            if arcpy.Exists(ruta):
+                arcpy.Delete_management(ruta)
+                logging.info(f"Archivo temporal eliminado: {ruta}")
+
+    def optimizar_indice(self, capa: Capa) -> None:
+        """Calcula la grilla del índice espacial con las entidades recortadas y lo vuelve a crear."""
+        resultado = arcpy.CalculateDefaultGridIndex_management(capa.ruta)
+        grillas = [float(resultado.getOutput(i)) for i in range(3)]
+        if arcpy.Describe(capa.ruta).hasSpatialIndex:
+            arcpy.RemoveSpatialIndex_management(capa.ruta)
+        arcpy.AddSpatialIndex_management(capa.ruta, *grillas)
+
+    def compactar_gdb(self, gdb: str) -> None:
+        arcpy.Compact_management(gdb)
+
+    def crear_copia_comprimida(self, gdb: str, destino: str) -> bool:
+        arcpy.Copy_management(gdb, destino)
+        arcpy.CompressFileGeodatabaseData_management(destino)
+        return True
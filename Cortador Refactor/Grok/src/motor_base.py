@@ -0,0 +1,287 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from area_recorte import AreaRecorte
+from catalogo import CAPA, DATASET, TABLA, Catalogo, ElementoCatalogo
+
+# Estados posibles al procesar una capa
+SIN_INTERSECCION = "sin_interseccion"
+VACIA = "vacia"
+RECORTADA = "recortada"
+COPIADA = "copiada"
+ERROR = "error"
+
+class Capa(NamedTuple):
+    """Referencia a una capa o tabla dentro de una GDB."""
+
+    gdb: str
+    dataset: str
+    nombre: str
+
+    @property
+    def ruta(self) -> str:
+        """Ruta completa de la capa, dentro de su dataset si lo tiene."""
+        if self.dataset:
+            return f"{self.gdb}/{self.dataset}/{self.nombre}"
+        return f"{self.gdb}/{self.nombre}"
+
+    def en(self, gdb: str) -> "Capa":
+        """Devuelve la misma capa ubicada en otra GDB."""
+        return self._replace(gdb=gdb)
+
+class Conteo(NamedTuple):
+    """Entidades y vértices leídos y escritos por el último recorte o copia de un motor.
+
+    Los vértices son None cuando la librería no los ofrece sin un costo extra.
+    """
+
+    filas_entrada: int = 0
+    filas_salida: int = 0
+    vertices_entrada: Optional[int] = 0
+    vertices_salida: Optional[int] = 0
+
+class Lote(NamedTuple):
+    """Entidades de una capa que pasan de una etapa a otra de la tubería de recorte.
+
+    El contenido de meta, geometrias, datos y area depende de cada motor.
+    """
+
+    meta: Any
+    geometrias: Any
+    datos: Any
+    area: Any  # Geometría con la que se recorta el lote
+    conteo: Conteo
+
+class MotorGeoprocesamiento(ABC):
+    """Operaciones de geoprocesamiento que necesita el recorte de una GDB.
+
+    Cada implementación encapsula una librería (arcpy, GDAL/Shapely) para que
+    manejo_gdb pueda recortar sin depender de ninguna en particular.
+    """
+
+    nombre = ""
+
+    # Lo actualizan recortar_capa, recortar_capa_multiple y copiar_capa para las métricas
+    ultimo_conteo: Optional[Conteo] = None
+
+    # CacheCatalogo persistente que usa manejo_gdb.leer_catalogo, si se configuró una
+    cache_catalogo = None
+
+    # Catálogos ya leídos, por GDB, con la huella de sus archivos; solo si el motor sigue cargado
+    # entre trabajos (servicio.py), y leer_catalogo los prefiere a la caché persistente
+    catalogos_en_memoria: Optional[Dict[str, Tuple[Dict[str, List[int]], Catalogo]]] = None
+
+    # Indica si el motor separa leer_capa, recortar_lote y escribir_lote para tuberia.py
+    admite_tuberia = False
+
+    # Campos que unen las capas con las tablas TB; si hay, copiar_tablas solo copia las filas relacionadas
+    campos_clave_tablas: Tuple[str, ...] = ()
+
+    # Indica si varias capas de una misma GDB pueden reindexarse a la vez desde procesos distintos
+    admite_indices_paralelos = False
+
+    @abstractmethod
+    def existe(self, ruta: str) -> bool:
+        """Indica si existe una GDB, shapefile o capa."""
+
+    @abstractmethod
+    def crear_gdb(self, carpeta: str, nombre: str) -> str:
+        """Crea una GDB vacía y devuelve su ruta."""
+
+    @abstractmethod
+    def obtener_datasets(self, gdb: str) -> List[str]:
+        """Obtiene todos los feature datasets de la GDB."""
+
+    @abstractmethod
+    def listar_capas(self, gdb: str, dataset: str = "") -> List[str]:
+        """Lista las feature classes de la raíz o de un dataset."""
+
+    @abstractmethod
+    def listar_tablas(self, gdb: str) -> List[str]:
+        """Lista las tablas de la raíz de la GDB."""
+
+    def catalogar(self, gdb: str) -> Catalogo:
+        """Recorre la GDB una sola vez y describe sus datasets, capas y tablas.
+
+        La implementación base solo arma el catálogo con los nombres; los
+        motores la sobrescriben para traer en la misma pasada la referencia
+        espacial, la extensión, el tipo de geometría, los registros y los campos.
+        """
+        datasets = self.obtener_datasets(gdb)
+        elementos = [ElementoCatalogo(nombre, "", CAPA) for nombre in self.listar_capas(gdb)]
+        for fds in datasets:
+            elementos.append(ElementoCatalogo(fds, "", DATASET))
+            elementos.extend(ElementoCatalogo(nombre, fds, CAPA) for nombre in self.listar_capas(gdb, fds))
+        elementos.extend(ElementoCatalogo(nombre, "", TABLA) for nombre in self.listar_tablas(gdb))
+        return Catalogo(gdb, elementos)
+
+    def describir(self, gdb: str, elementos: List[ElementoCatalogo]) -> List[ElementoCatalogo]:
+        """Vuelve a describir algunos elementos de un catálogo, p. ej. las tablas que cambiaron.
+
+        La implementación base cataloga de nuevo toda la GDB y conserva esos elementos.
+        """
+        catalogo = self.catalogar(gdb)
+        return [catalogo.elemento(e.nombre) for e in elementos if catalogo.elemento(e.nombre) is not None]
+
+    def archivos_tablas(self, gdb: str) -> Dict[str, str]:
+        """Archivo .gdbtable de cada capa y tabla de la GDB, incluidas las de sistema.
+
+        La implementación base no los conoce y devuelve un diccionario vacío.
+        """
+        return {}
+
+    @abstractmethod
+    def esta_vacia(self, capa: Capa) -> bool:
+        """Verifica si una capa o tabla no tiene registros."""
+
+    @abstractmethod
+    def firma(self, capa: Capa) -> dict:
+        """Resume el estado de una capa de entrada para detectar si cambió entre dos recortes.
+
+        Incluye al menos el número de registros y la extensión; cada motor
+        agrega los indicadores baratos que su librería ofrezca (OID máximo,
+        fecha de modificación).
+        """
+
+    @abstractmethod
+    def preparar_area(self, clip_features: str) -> AreaRecorte:
+        """Lee, disuelve e indexa el shapefile de recorte una sola vez por ejecución."""
+
+    @abstractmethod
+    def preparar_areas_por_campo(self, clip_features: str, campo: str) -> Dict[str, AreaRecorte]:
+        """Prepara un área de recorte por cada valor distinto de un campo del shapefile."""
+
+    @abstractmethod
+    def tiene_interseccion(self, capa: Capa, area: AreaRecorte) -> bool:
+        """Verifica si alguna entidad de la capa toca el área de recorte."""
+
+    @abstractmethod
+    def esta_contenida(self, capa: Capa, area: AreaRecorte) -> bool:
+        """Verifica si la extensión de la capa queda completamente dentro del área de recorte."""
+
+    @abstractmethod
+    def crear_dataset(self, origen: Capa, gdb_salida: str) -> None:
+        """Crea en la GDB de salida el dataset de la capa de origen, con su referencia espacial."""
+
+    @abstractmethod
+    def recortar_capa(self, capa: Capa, area: AreaRecorte, destino: Capa) -> str:
+        """Recorta una capa; no deja salida si el resultado queda vacío.
+
+        Returns:
+            VACIA o RECORTADA según el resultado.
+        """
+
+    def recortar_capa_multiple(self, capa: Capa, areas: Dict[str, AreaRecorte],
+                               destinos: Dict[str, Capa]) -> Dict[str, str]:
+        """Recorta una capa contra varias áreas, cada una hacia su propio destino.
+
+        La implementación base recorta área por área; los motores la
+        sobrescriben para leer la capa una sola vez y repartir sus entidades.
+
+        Args:
+            capa: Capa de entrada.
+            areas: Áreas de recorte por nombre.
+            destinos: Capa de salida de cada área, con los mismos nombres.
+
+        Returns:
+            Estado de cada área: SIN_INTERSECCION, VACIA o RECORTADA.
+        """
+        return {nombre: self.recortar_capa(capa, area, destinos[nombre]) for nombre, area in areas.items()}
+
+    def leer_capa(self, capa: Capa, area: AreaRecorte) -> Optional[Lote]:
+        """Lee las entidades de la capa que pueden tocar el área, sin recortarlas.
+
+        Las tres etapas (leer, recortar, escribir) deben poder ejecutarse en
+        hilos distintos a la vez sobre capas diferentes.
+
+        Returns:
+            Lote leído, o None si la extensión de la capa no toca el área.
+        """
+        raise NotImplementedError(f"El motor {self.nombre} no admite el recorte en tubería.")
+
+    def recortar_lote(self, lote: Lote) -> Optional[Lote]:
+        """Recorta un lote leído, sin tocar disco.
+
+        Returns:
+            Lote con las entidades recortadas, o None si ninguna entidad toca el área.
+        """
+        raise NotImplementedError(f"El motor {self.nombre} no admite el recorte en tubería.")
+
+    def escribir_lote(self, lote: Lote, destino: Capa) -> str:
+        """Escribe un lote recortado; no deja salida si quedó vacío.
+
+        Returns:
+            VACIA o RECORTADA según el resultado.
+        """
+        raise NotImplementedError(f"El motor {self.nombre} no admite el recorte en tubería.")
+
+    @abstractmethod
+    def copiar_capa(self, capa: Capa, destino: Capa) -> None:
+        """Copia una capa sin cambios."""
+
+    @abstractmethod
+    def copiar_tabla(self, tabla: Capa, destino: Capa) -> None:
+        """Copia una tabla sin cambios."""
+
+    def crear_gdb_memoria(self) -> Optional[str]:
+        """Devuelve un espacio de trabajo en memoria donde preparar capas antes de escribirlas en disco.
+
+        Las capas se ubican en su raíz, sin dataset, y se leen con copiar_capa.
+
+        Returns:
+            Ruta del espacio de trabajo, o None si el motor no lo admite.
+        """
+        return None
+
+    def vaciar_gdb_memoria(self, gdb: str) -> None:
+        """Libera las capas preparadas en el espacio de trabajo en memoria."""
+
+    def leer_valores(self, capa: Capa, campo: str) -> Set[Any]:
+        """Lee los valores distintos de un campo de una capa o tabla, sin nulos."""
+        raise NotImplementedError(f"El motor {self.nombre} no admite el recorte relacional de tablas.")
+
+    def copiar_tabla_filtrada(self, tabla: Capa, destino: Capa, campo: str, valores: Iterable[Any]) -> int:
+        """Copia solo las filas de una tabla cuyo campo tiene uno de los valores dados.
+
+        La tabla se lee una sola vez y no se crea salida si ninguna fila pasa el filtro.
+
+        Returns:
+            Número de filas copiadas.
+        """
+        raise NotImplementedError(f"El motor {self.nombre} no admite el recorte relacional de tablas.")
+
+    def eliminar_archivos_temp(self, gdb: str) -> None:
+        """Elimina archivos auxiliares que la librería crea en la GDB de salida."""
+
+    def optimizar_indice(self, capa: Capa) -> None:
+        """Reconstruye el índice espacial de una capa ajustado a las entidades que quedaron tras el recorte."""
+
+    def compactar_gdb(self, gdb: str) -> None:
+        """Compacta la GDB, recuperando el espacio que dejaron las capas creadas y eliminadas."""
+
+    def crear_copia_comprimida(self, gdb: str, destino: str) -> bool:
+        """Crea una copia de solo lectura y comprimida de la GDB.
+
+        Returns:
+            True si se creó la copia, False si el motor no lo admite.
+        """
+        return False
+
+def crear_motor(nombre: str) -> MotorGeoprocesamiento:
+    """Crea el motor de geoprocesamiento indicado en la configuración.
+
+    Los motores se importan aquí para que usar uno no exija instalar las
+    dependencias del otro.
+
+    Args:
+        nombre: "arcpy" o "gdal".
+
+    Returns:
+        Instancia del motor.
+    """
+    if nombre == "arcpy":
+        from motor_arcpy import MotorArcpy
+        return MotorArcpy()
+    if nombre == "gdal":
+        from motor_gdal import MotorGDAL
+        return MotorGDAL()
+    raise ValueError(f"Motor de geoprocesamiento desconocido: {nombre}")
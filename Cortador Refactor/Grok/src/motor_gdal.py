@@ -0,0 +1,438 @@
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from area_recorte import CONTENIDA, SUPERPUESTA, AreaRecorte
+from catalogo import CAPA, DATASET, TABLA, Catalogo, ElementoCatalogo
+from extensiones import Extension
+from motor_base import RECORTADA, SIN_INTERSECCION, VACIA, Capa, Conteo, Lote, MotorGeoprocesamiento
+
+try:
+    import numpy as np
+    import pyogrio
+    import pyogrio.raw
+    import shapely
+    from pyogrio.errors import DataLayerError, DataSourceError
+except ImportError:
+    np = pyogrio = shapely = None
+    DataLayerError = DataSourceError = Exception
+
+try:
+    from pyproj import CRS, Transformer
+except ImportError:
+    CRS = Transformer = None
+
+try:
+    from osgeo import gdal
+except ImportError:
+    gdal = None
+
+DRIVER = "OpenFileGDB"
+
+# Espacio de trabajo en memoria: las capas escritas en él se guardan como arreglos sin pasar por GDAL
+GDB_MEMORIA = "memoria://"
+
+# Tipos de elemento registrados en la tabla de sistema GDB_Items
+TIPO_DATASET = "{74737149-DCB5-4257-8904-B9724E32A530}"
+TIPO_CAPA = "{70737809-852C-4A03-9E22-2CECEA5B9BFA}"
+TIPO_TABLA = "{CD06BC3B-789D-4C51-AAFA-A467912B8965}"
+TIPOS_CATALOGO = {TIPO_DATASET: DATASET, TIPO_CAPA: CAPA, TIPO_TABLA: TABLA}
+
+# Divisiones por lado al densificar el área de recorte antes de reproyectarla
+DENSIFICACION_PROYECCION = 200
+
+# Dimensión de las geometrías que debe conservar el recorte según el tipo de la capa
+DIMENSIONES = {"Point": 0, "MultiPoint": 0, "LineString": 1, "MultiLineString": 1,
+               "Polygon": 2, "MultiPolygon": 2}
+
+class AreaRecorteGDAL(AreaRecorte):
+    """Área de recorte con geometrías de Shapely, preparadas para predicados repetidos."""
+
+    def _unir(self, partes: Sequence):
+        geometria = shapely.union_all(partes)
+        shapely.prepare(geometria)
+        return geometria
+
+    def _contiene(self, geometria, extension: Extension) -> bool:
+        return bool(shapely.contains(geometria, shapely.box(*extension)))
+
+def _crear_area(ruta: str, geometria, crs: str) -> AreaRecorteGDAL:
+    """Separa una geometría disuelta en partes indexables y arma su área de recorte."""
+    partes = shapely.get_parts(geometria)
+    extensiones = [Extension(*limites) for limites in shapely.bounds(partes)]
+    shapely.prepare(geometria)
+    return AreaRecorteGDAL(ruta, partes, extensiones, crs, geometria)
+
+class MotorGDAL(MotorGeoprocesamiento):
+    """Motor de código abierto basado en GDAL y Shapely 2.
+
+    Lee y escribe File GDB con el driver OpenFileGDB de GDAL (vía pyogrio) y
+    recorta todas las geometrías de una capa en una sola llamada vectorizada,
+    sin licencia de ArcGIS y en cualquier sistema operativo.
+    """
+
+    nombre = "gdal"
+    admite_tuberia = True
+
+    def __init__(self):
+        if pyogrio is None:
+            raise ImportError("El motor gdal requiere pyogrio, shapely>=2 y numpy.")
+        self._areas_proyectadas: Dict[Tuple[str, str], AreaRecorteGDAL] = {}
+        self._tablas_gdb: Dict[str, Dict[str, str]] = {}
+        self._infos: Dict[Tuple[str, str], dict] = {}
+        self._memoria: Dict[str, tuple] = {}
+
+    def existe(self, ruta: str) -> bool:
+        return os.path.exists(ruta)
+
+    def crear_gdb(self, carpeta: str, nombre: str) -> str:
+        """Devuelve la ruta de la GDB de salida.
+
+        El driver OpenFileGDB crea la GDB al escribir la primera capa, por lo
+        que una salida sin capas no deja una GDB vacía en disco.
+        """
+        return os.path.join(carpeta, nombre)
+
+    def _leer_items(self, gdb: str) -> List[Tuple[str, str, str]]:
+        """Lee (nombre, dataset, tipo) de cada elemento registrado en GDB_Items."""
+        meta, _, _, datos = pyogrio.raw.read(gdb, layer="GDB_Items", columns=["Name", "Path", "Type"],
+                                             read_geometry=False, LIST_ALL_TABLES="YES")
+        columnas = dict(zip(meta["fields"], datos))
+        items = []
+        for nombre, ruta, tipo in zip(columnas["Name"], columnas["Path"], columnas["Type"]):
+            partes = (ruta or "").strip("\\").split("\\")
+            dataset = partes[0] if len(partes) == 2 else ""
+            items.append((nombre, dataset, (tipo or "").upper()))
+        return items
+
+    def obtener_datasets(self, gdb: str) -> List[str]:
+        try:
+            return [nombre for nombre, _, tipo in self._leer_items(gdb) if tipo == TIPO_DATASET]
+        except DataSourceError as e:
+            logging.error(f"Error al listar datasets: {e}")
+            return []
+
+    def listar_capas(self, gdb: str, dataset: str = "") -> List[str]:
+        return [nombre for nombre, fds, tipo in self._leer_items(gdb)
+                if tipo == TIPO_CAPA and fds == dataset]
+
+    def listar_tablas(self, gdb: str) -> List[str]:
+        return [nombre for nombre, fds, tipo in self._leer_items(gdb)
+                if tipo == TIPO_TABLA and not fds]
+
+    def catalogar(self, gdb: str) -> Catalogo:
+        """Lee GDB_Items una sola vez y describe cada capa y tabla con read_info.
+
+        La información de cada capa se guarda para que los predicados y la
+        firma no vuelvan a abrirla.
+        """
+        elementos = []
+        for nombre, dataset, tipo in self._leer_items(gdb):
+            tipo = TIPOS_CATALOGO.get(tipo)
+            if tipo is None:
+                continue
+            if tipo == DATASET:
+                elementos.append(ElementoCatalogo(nombre, "", DATASET))
+            else:
+                elementos.append(self._describir_elemento(gdb, nombre, dataset, tipo))
+        return Catalogo(gdb, elementos)
+
+    def describir(self, gdb: str, elementos: List[ElementoCatalogo]) -> List[ElementoCatalogo]:
+        return [self._describir_elemento(gdb, e.nombre, e.dataset, e.tipo) if e.tipo != DATASET else e
+                for e in elementos]
+
+    def _describir_elemento(self, gdb: str, nombre: str, dataset: str, tipo: str) -> ElementoCatalogo:
+        info = pyogrio.read_info(gdb, layer=nombre, force_total_bounds=tipo == CAPA)
+        self._infos[(gdb, nombre)] = info
+        return ElementoCatalogo(nombre, dataset, tipo, info["crs"], self._extension(info) if tipo == CAPA else None,
+                                info["geometry_type"], info["features"], tuple(info["fields"]))
+
+    def _info(self, capa: Capa) -> dict:
+        """Información de una capa, tomada del catálogo si su GDB ya se recorrió."""
+        info = self._infos.get((capa.gdb, capa.nombre))
+        if info is None:
+            info = pyogrio.read_info(capa.gdb, layer=capa.nombre, force_total_bounds=True)
+        return info
+
+    def _extension(self, info: dict) -> Extension:
+        limites = info.get("total_bounds")
+        if limites is None:
+            return Extension(float("nan"), float("nan"), float("nan"), float("nan"))
+        return Extension(*limites)
+
+    def esta_vacia(self, capa: Capa) -> bool:
+        try:
+            return self._info(capa)["features"] == 0
+        except DataLayerError:
+            return True
+
+    def firma(self, capa: Capa) -> dict:
+        info = self._info(capa)
+        archivo = self.archivos_tablas(capa.gdb).get(capa.nombre)
+        modificado = os.stat(archivo).st_mtime_ns if archivo and os.path.exists(archivo) else None
+        return {"registros": info["features"], "extension": list(self._extension(info)),
+                "modificado": modificado}
+
+    def archivos_tablas(self, gdb: str) -> Dict[str, str]:
+        """Asocia cada tabla de la GDB con su archivo aXXXXXXXX.gdbtable.
+
+        La fila N de GDB_SystemCatalog corresponde al archivo con N en
+        hexadecimal, cuya fecha de modificación cambia al editar la capa.
+        """
+        if gdb not in self._tablas_gdb:
+            _, fids, _, datos = pyogrio.raw.read(gdb, layer="GDB_SystemCatalog", columns=["Name"],
+                                                 read_geometry=False, return_fids=True, LIST_ALL_TABLES="YES")
+            self._tablas_gdb[gdb] = {nombre: os.path.join(gdb, f"a{int(fid):08x}.gdbtable")
+                                     for fid, nombre in zip(fids, datos[0])}
+        return self._tablas_gdb[gdb]
+
+    def preparar_area(self, clip_features: str) -> AreaRecorteGDAL:
+        """Lee y disuelve el shapefile de recorte, separando sus partes para indexarlas."""
+        meta, _, wkb, _ = pyogrio.raw.read(clip_features, columns=[])
+        return _crear_area(clip_features, shapely.union_all(shapely.from_wkb(wkb)), meta["crs"])
+
+    def preparar_areas_por_campo(self, clip_features: str, campo: str) -> Dict[str, AreaRecorteGDAL]:
+        meta, _, wkb, datos = pyogrio.raw.read(clip_features, columns=[campo])
+        geometrias = shapely.from_wkb(wkb)
+        valores = np.array([str(valor) for valor in datos[0]])
+        return {valor: _crear_area(f"{clip_features}[{campo}={valor}]",
+                                   shapely.union_all(geometrias[valores == valor]), meta["crs"])
+                for valor in dict.fromkeys(valores)}
+
+    def _area_en(self, area: AreaRecorteGDAL, crs: str) -> AreaRecorteGDAL:
+        """Obtiene el área de recorte en el CRS de una capa.
+
+        Si el CRS es distinto al del shapefile, la geometría se densifica y
+        reproyecta con pyproj una sola vez por CRS y se vuelve a indexar.
+        """
+        if not crs or not area.referencia or area.geometria is None:
+            return area
+        clave = (area.ruta, crs)
+        if clave not in self._areas_proyectadas:
+            if _mismo_crs(area.referencia, crs):
+                self._areas_proyectadas[clave] = area
+            else:
+                geometria = _proyectar(area.geometria, area.referencia, crs)
+                self._areas_proyectadas[clave] = _crear_area(area.ruta, geometria, crs)
+        return self._areas_proyectadas[clave]
+
+    def tiene_interseccion(self, capa: Capa, area: AreaRecorte) -> bool:
+        info = self._info(capa)
+        area = self._area_en(area, info["crs"])
+        extension = self._extension(info)
+        relacion = area.relacion(extension)
+        if relacion != SUPERPUESTA:
+            return relacion == CONTENIDA
+        geometria = area.geometria_para(extension)
+        _, _, wkb, _ = pyogrio.raw.read(capa.gdb, layer=capa.nombre, columns=[],
+                                        bbox=tuple(shapely.bounds(geometria)))
+        return bool(shapely.intersects(shapely.from_wkb(wkb), geometria).any())
+
+    def esta_contenida(self, capa: Capa, area: AreaRecorte) -> bool:
+        info = self._info(capa)
+        return self._area_en(area, info["crs"]).relacion(self._extension(info)) == CONTENIDA
+
+    def crear_dataset(self, origen: Capa, gdb_salida: str) -> None:
+        """No hace nada: el dataset se crea al escribir su primera capa (opción FEATURE_DATASET)."""
+
+    def recortar_capa(self, capa: Capa, area: AreaRecorte, destino: Capa) -> str:
+        estado = self.recortar_capa_multiple(capa, {"": area}, {"": destino})[""]
+        return VACIA if estado == SIN_INTERSECCION else estado
+
+    def recortar_capa_multiple(self, capa: Capa, areas: Dict[str, AreaRecorte],
+                               destinos: Dict[str, Capa]) -> Dict[str, str]:
+        """Recorta una capa contra una o varias áreas leyéndola una sola vez.
+
+        Se leen las entidades dentro de la envolvente de las áreas que tocan
+        la capa y cada área las recorta en una llamada vectorizada.
+        """
+        info = self._info(capa)
+        extension = self._extension(info)
+        estados = {}
+        geometrias_area = {}
+        for nombre, area in areas.items():
+            # Solo las partes del área que tocan la capa participan en el recorte
+            geometria = self._area_en(area, info["crs"]).geometria_para(extension)
+            if geometria is None:
+                estados[nombre] = SIN_INTERSECCION
+            else:
+                geometrias_area[nombre] = geometria
+        if not geometrias_area:
+            return estados
+
+        envolvente = Extension.envolvente(Extension(*shapely.bounds(g)) for g in geometrias_area.values())
+        meta, _, wkb, datos = pyogrio.raw.read(capa.gdb, layer=capa.nombre, bbox=tuple(envolvente))
+        geometrias = shapely.from_wkb(wkb)
+        filas_salida = vertices_salida = 0
+        for nombre, geometria in geometrias_area.items():
+            recorte = _recortar_geometrias(meta, geometrias, datos, geometria)
+            if recorte is None or not len(recorte[0]):
+                estados[nombre] = VACIA
+                continue
+            self._escribir(destinos[nombre], meta, *recorte)
+            estados[nombre] = RECORTADA
+            filas_salida += len(recorte[0])
+            vertices_salida += int(shapely.get_num_coordinates(recorte[0]).sum())
+        self.ultimo_conteo = Conteo(len(geometrias), filas_salida,
+                                    int(shapely.get_num_coordinates(geometrias).sum()), vertices_salida)
+        return estados
+
+    def leer_capa(self, capa: Capa, area: AreaRecorte) -> Optional[Lote]:
+        info = self._info(capa)
+        geometria = self._area_en(area, info["crs"]).geometria_para(self._extension(info))
+        if geometria is None:
+            return None
+        meta, _, wkb, datos = pyogrio.raw.read(capa.gdb, layer=capa.nombre, bbox=tuple(shapely.bounds(geometria)))
+        geometrias = shapely.from_wkb(wkb)
+        conteo = Conteo(len(geometrias), 0, int(shapely.get_num_coordinates(geometrias).sum()), 0)
+        return Lote(meta, geometrias, datos, geometria, conteo)
+
+    def recortar_lote(self, lote: Lote) -> Optional[Lote]:
+        recorte = _recortar_geometrias(lote.meta, lote.geometrias, lote.datos, lote.area)
+        if recorte is None:
+            return None
+        recortadas, datos = recorte
+        conteo = lote.conteo._replace(filas_salida=len(recortadas),
+                                      vertices_salida=int(shapely.get_num_coordinates(recortadas).sum()))
+        return lote._replace(geometrias=recortadas, datos=datos, conteo=conteo)
+
+    def escribir_lote(self, lote: Lote, destino: Capa) -> str:
+        if not len(lote.geometrias):
+            return VACIA
+        self._escribir(destino, lote.meta, lote.geometrias, lote.datos)
+        return RECORTADA
+
+    def copiar_capa(self, capa: Capa, destino: Capa) -> None:
+        if capa.gdb == GDB_MEMORIA:
+            meta, geometrias, datos = self._memoria[capa.nombre]
+        else:
+            meta, _, wkb, datos = pyogrio.raw.read(capa.gdb, layer=capa.nombre)
+            geometrias = shapely.from_wkb(wkb)
+        self._escribir(destino, meta, geometrias, datos)
+        vertices = int(shapely.get_num_coordinates(geometrias).sum())
+        self.ultimo_conteo = Conteo(len(geometrias), len(geometrias), vertices, vertices)
+
+    def copiar_tabla(self, tabla: Capa, destino: Capa) -> None:
+        meta, _, _, datos = pyogrio.raw.read(tabla.gdb, layer=tabla.nombre, read_geometry=False)
+        self._escribir(destino, meta, None, datos)
+
+    def leer_valores(self, capa: Capa, campo: str) -> Set[Any]:
+        if capa.gdb == GDB_MEMORIA:
+            meta, _, datos = self._memoria[capa.nombre]
+            columna = datos[list(meta["fields"]).index(campo)]
+        else:
+            _, _, _, (columna,) = pyogrio.raw.read(capa.gdb, layer=capa.nombre, columns=[campo], read_geometry=False)
+        return {valor for valor in columna.tolist() if valor is not None}
+
+    def copiar_tabla_filtrada(self, tabla: Capa, destino: Capa, campo: str, valores: Iterable[Any]) -> int:
+        meta, _, _, datos = pyogrio.raw.read(tabla.gdb, layer=tabla.nombre, read_geometry=False)
+        mascara = np.isin(datos[list(meta["fields"]).index(campo)], list(valores))
+        filas = int(mascara.sum())
+        if filas:
+            self._escribir(destino, meta, None, [columna[mascara] for columna in datos])
+        return filas
+
+    def _ejecutar_sql(self, gdb: str, sentencia: str) -> None:
+        """Ejecuta una sentencia de mantenimiento del driver OpenFileGDB; pyogrio no las expone."""
+        if gdal is None:
+            logging.warning(f"Sin los enlaces de GDAL para Python (osgeo) no se puede ejecutar {sentencia} en {gdb}.")
+            return
+        datos = gdal.OpenEx(gdb, gdal.OF_VECTOR | gdal.OF_UPDATE)
+        try:
+            datos.ExecuteSQL(sentencia)
+        finally:
+            datos = None  # Cierra la GDB y escribe los cambios
+
+    def optimizar_indice(self, capa: Capa) -> None:
+        """Ajusta la extensión registrada de la capa a sus entidades recortadas.
+
+        GDAL no permite elegir la grilla del índice espacial; la calcula al
+        escribir la capa, que en el recorte ya contiene solo las entidades recortadas.
+        """
+        self._ejecutar_sql(capa.gdb, f'RECOMPUTE EXTENT ON "{capa.nombre}"')
+
+    def compactar_gdb(self, gdb: str) -> None:
+        self._ejecutar_sql(gdb, "REPACK")
+
+    def crear_gdb_memoria(self) -> str:
+        return GDB_MEMORIA
+
+    def vaciar_gdb_memoria(self, gdb: str) -> None:
+        self._memoria.clear()
+
+    def _escribir(self, destino: Capa, meta: dict, geometrias, datos) -> None:
+        """Escribe una capa o tabla en la GDB de destino, dentro de su dataset si lo tiene."""
+        if destino.gdb == GDB_MEMORIA:
+            self._memoria[destino.nombre] = (meta, geometrias, datos)
+            return
+        opciones = {"FEATURE_DATASET": destino.dataset} if destino.dataset else None
+        pyogrio.raw.write(
+            destino.gdb,
+            shapely.to_wkb(geometrias) if geometrias is not None else None,
+            datos,
+            meta["fields"],
+            layer=destino.nombre,
+            driver=DRIVER,
+            geometry_type=meta["geometry_type"],
+            crs=meta["crs"],
+            encoding=meta.get("encoding"),
+            promote_to_multi=geometrias is not None and _dimension(meta["geometry_type"]) > 0,
+            layer_options=opciones,
+        )
+
+def _recortar_geometrias(meta: dict, geometrias, datos, geometria):
+    """Recorta entidades ya leídas con una geometría, conservando la dimensión de la capa.
+
+    Returns:
+        Tupla (geometrías recortadas, atributos de esas entidades), vacías si
+        el recorte solo dejó bordes de otra dimensión, o None si ninguna
+        entidad toca la geometría.
+    """
+    mascara = shapely.intersects(geometrias, geometria)
+    if not mascara.any():
+        return None
+
+    dimension = _dimension(meta["geometry_type"])
+    recortadas = _conservar_dimension(shapely.intersection(geometrias[mascara], geometria), dimension)
+    mantener = (shapely.get_dimensions(recortadas) == dimension) & ~shapely.is_empty(recortadas)
+    return recortadas[mantener], [d[mascara][mantener] for d in datos]
+
+def _dimension(tipo_geometria: str) -> int:
+    """Dimensión de un tipo de geometría de pyogrio, sin importar Z o M (p. ej. "MultiPolygon Z")."""
+    return DIMENSIONES.get(tipo_geometria.split(" ")[0], 2)
+
+def _mismo_crs(crs_a: str, crs_b: str) -> bool:
+    """Compara dos CRS; sin pyproj solo se reconocen las definiciones idénticas."""
+    if crs_a == crs_b:
+        return True
+    if CRS is None:
+        return False
+    return CRS.from_user_input(crs_a).equals(CRS.from_user_input(crs_b))
+
+def _proyectar(geometria, crs_origen: str, crs_destino: str):
+    """Reproyecta una geometría densificada para que sus bordes sigan la curvatura."""
+    if Transformer is None:
+        raise ImportError("Recortar capas en otro sistema de coordenadas requiere pyproj.")
+    xmin, ymin, xmax, ymax = shapely.bounds(geometria)
+    geometria = shapely.segmentize(geometria, max(xmax - xmin, ymax - ymin) / DENSIFICACION_PROYECCION)
+    transformador = Transformer.from_crs(crs_origen, crs_destino, always_xy=True)
+    return shapely.transform(geometria, lambda xy: np.column_stack(transformador.transform(xy[:, 0], xy[:, 1])))
+
+def _conservar_dimension(geometrias, dimension: int):
+    """Reduce las colecciones resultantes del recorte a sus partes de la dimensión de la capa.
+
+    Al recortar, un polígono que solo comparte un borde con el área de recorte
+    produce líneas o puntos sueltos que no caben en la capa de salida.
+    """
+    colecciones = shapely.get_type_id(geometrias) == 7  # GeometryCollection
+    if not colecciones.any():
+        return geometrias
+    resultado = geometrias.copy()
+    posiciones = np.flatnonzero(colecciones)
+    resultado[posiciones] = None
+    partes, indices = shapely.get_parts(geometrias[colecciones], return_index=True)
+    validas = shapely.get_dimensions(partes) == dimension
+    if validas.any():
+        constructor = {0: shapely.multipoints, 1: shapely.multilinestrings, 2: shapely.multipolygons}[dimension]
+        grupos, consecutivos = np.unique(indices[validas], return_inverse=True)
+        resultado[posiciones[grupos]] = constructor(partes[validas], indices=consecutivos)
+    return resultado
@@ -0,0 +1,80 @@
+import heapq
+import logging
+from typing import List, NamedTuple, Optional
+from manejo_gdb import leer_catalogo, listar_capas
+from motor_base import COPIADA, RECORTADA, SIN_INTERSECCION, Capa, MotorGeoprocesamiento
+from planificador import REGISTROS_DESCONOCIDOS, Planificador, fraccion_solapada
+
+class PlanCapa(NamedTuple):
+    """Resultado previsto para una capa, sin haberla recortado."""
+
+    capa: Capa
+    estado: str  # COPIADA si está contenida, RECORTADA si intersecta o SIN_INTERSECCION si se omite
+    registros: Optional[int]  # Entidades de la capa de entrada según el catálogo
+    entidades: int  # Entidades estimadas en la salida
+    bytes: int  # Tamaño estimado en la salida
+    segundos: float  # Tiempo estimado de la capa
+
+def planificar_recorte(gdb_entrada: str, clip_features: str, motor: MotorGeoprocesamiento,
+                       planificador: Optional[Planificador] = None) -> List[PlanCapa]:
+    """Predice qué pasará con cada capa sin escribir nada en disco.
+
+    Solo se usan el catálogo, las extensiones y los predicados baratos del
+    motor: las capas contenidas se copiarán completas, las que intersectan
+    se recortarán y el resto se omite. Las entidades de salida se estiman
+    con la fracción de la extensión que cae sobre el área, y los bytes y
+    segundos con las métricas de recortes anteriores si el planificador las
+    tiene.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        clip_features: Ruta del shapefile de recorte.
+        motor: Motor de geoprocesamiento.
+        planificador: Planificador con el historial de recortes anteriores.
+
+    Returns:
+        Plan de cada capa en el orden del recorte serial.
+    """
+    planificador = planificador or Planificador()
+    area = motor.preparar_area(clip_features)
+    catalogo = leer_catalogo(gdb_entrada, motor)
+    capas = listar_capas(gdb_entrada, motor, catalogo)
+    segundos = planificador.estimar_segundos(capas, catalogo, area)
+
+    plan = []
+    for capa in capas:
+        elemento = catalogo.elemento(capa.nombre)
+        registros = elemento.registros if elemento is not None else None
+        if motor.esta_contenida(capa, area):
+            estado, fraccion = COPIADA, 1.0
+        elif motor.tiene_interseccion(capa, area):
+            estado = RECORTADA
+            fraccion = fraccion_solapada(elemento, area) if elemento is not None else 1.0
+        else:
+            plan.append(PlanCapa(capa, SIN_INTERSECCION, registros, 0, 0, 0.0))
+            continue
+        entidades = round((registros if registros is not None else REGISTROS_DESCONOCIDOS) * fraccion)
+        tamano = round(entidades * planificador.bytes_por_entidad(capa, elemento))
+        plan.append(PlanCapa(capa, estado, registros, entidades, tamano, segundos[capa]))
+    return plan
+
+def duracion_estimada(plan: List[PlanCapa], procesos: int = 1) -> float:
+    """Segundos que tomaría el plan repartiendo las capas, de la más costosa a la más barata, entre los procesos."""
+    ocupados = [0.0] * max(procesos, 1)
+    for segundos in sorted((capa.segundos for capa in plan), reverse=True):
+        heapq.heapreplace(ocupados, ocupados[0] + segundos)
+    return max(ocupados)
+
+def mostrar_plan(plan: List[PlanCapa], procesos: int = 1) -> None:
+    """Muestra en el log el plan de cada capa y los totales previstos."""
+    for capa in plan:
+        registros = capa.registros if capa.registros is not None else "?"
+        logging.info(f"  {capa.estado:<16} {capa.capa.ruta}: {registros} -> ~{capa.entidades} entidades, "
+                     f"~{capa.bytes / (1024 * 1024):.1f} MB, ~{capa.segundos:.1f} s")
+    por_estado = {estado: sum(1 for capa in plan if capa.estado == estado)
+                  for estado in (RECORTADA, COPIADA, SIN_INTERSECCION)}
+    logging.info(f"Plan: {por_estado[RECORTADA]} capas a recortar, {por_estado[COPIADA]} contenidas "
+                 f"y {por_estado[SIN_INTERSECCION]} sin intersección")
+    logging.info(f"Salida estimada: ~{sum(capa.entidades for capa in plan)} entidades, "
+                 f"~{sum(capa.bytes for capa in plan) / (1024 * 1024):.1f} MB")
+    logging.info(f"Tiempo estimado: ~{duracion_estimada(plan, procesos):.0f} s con {procesos} procesos")
@@ -0,0 +1,138 @@
+import json
+import logging
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional
+from area_recorte import AreaRecorte
+from catalogo import Catalogo, ElementoCatalogo
+from manifiesto import clave_capa
+from metricas import SUFIJO
+from motor_base import ERROR, Capa
+
+# Vértices por entidad que se suponen si ningún recorte anterior midió la capa
+VERTICES_POR_TIPO = {"point": 1, "line": 50, "polygon": 100}
+VERTICES_DESCONOCIDOS = 20
+
+# Registros que se suponen si el catálogo no trae el conteo
+REGISTROS_DESCONOCIDOS = 1000
+
+# Segundos por unidad de costo (vértice leído) mientras no haya historial con qué medirlos
+SEGUNDOS_POR_UNIDAD = 1e-6
+
+# Tamaño en disco de los atributos de una entidad y de cada vértice, sin historial de la capa
+BYTES_POR_FILA = 256
+BYTES_POR_VERTICE = 16
+
+def cargar_historial(carpeta: Path) -> Dict[str, dict]:
+    """Lee las métricas de los recortes anteriores guardadas en una carpeta.
+
+    Returns:
+        Último registro de cada capa por clave (dataset/nombre), sin las capas con error.
+    """
+    historial = {}
+    for ruta in sorted(Path(carpeta).glob(f"*{SUFIJO}"), key=lambda p: p.stat().st_mtime_ns):
+        try:
+            with open(ruta, encoding="utf-8") as archivo:
+                for linea in archivo:
+                    registro = json.loads(linea)
+                    if "clave" in registro and registro.get("estado") != ERROR:
+                        historial[registro["clave"]] = registro
+        except (OSError, ValueError) as e:
+            logging.warning(f"No se pueden leer las métricas de {ruta}: {e}")
+    return historial
+
+def _vertices_por_tipo(tipo_geometria: Optional[str]) -> int:
+    tipo = (tipo_geometria or "").lower()
+    for palabra, vertices in VERTICES_POR_TIPO.items():
+        if palabra in tipo:
+            return vertices
+    return VERTICES_DESCONOCIDOS
+
+def fraccion_solapada(elemento: ElementoCatalogo, area: AreaRecorte) -> float:
+    """Fracción de la extensión de la capa que cae sobre las partes del área de recorte.
+
+    Si la capa y el área están en sistemas distintos no se comparan las
+    extensiones y se supone la capa completa.
+    """
+    extension = elemento.extension
+    if extension is None or elemento.referencia != getattr(area.referencia, "name", area.referencia):
+        return 1.0
+    if extension.es_vacia():
+        return 0.0
+    partes = area.indice.consultar(extension)
+    superficie = extension.superficie()
+    if superficie == 0:
+        return 1.0 if partes else 0.0
+    solapada = sum(extension.interseccion(area.indice.extensiones[i]).superficie() for i in partes)
+    return min(solapada / superficie, 1.0)
+
+class Planificador:
+    """Ordena las capas de la más costosa a la más barata antes de repartirlas.
+
+    Con varios procesos o hilos, empezar por las capas más pesadas evita que
+    una capa grande quede para el final y corra sola (planificación LPT).
+    El costo se estima con los registros, el tipo de geometría, los vértices
+    por entidad y la parte de la capa que toca el área; si un recorte
+    anterior midió la capa, se usa su tiempo real.
+    """
+
+    def __init__(self, historial: Optional[Dict[str, dict]] = None):
+        """
+        Args:
+            historial: Métricas de recortes anteriores por clave de capa (ver cargar_historial).
+        """
+        self.historial = historial or {}
+
+    @classmethod
+    def desde_carpeta(cls, carpeta: Path) -> "Planificador":
+        """Crea un planificador con las métricas que dejaron los recortes anteriores en una carpeta."""
+        return cls(cargar_historial(carpeta))
+
+    def vertices_por_entidad(self, capa: Capa, elemento: Optional[ElementoCatalogo]) -> float:
+        """Vértices por entidad medidos en un recorte anterior, o supuestos según el tipo de geometría."""
+        anterior = self.historial.get(clave_capa(capa), {})
+        if anterior.get("vertices_entrada") and anterior.get("filas_entrada"):
+            return anterior["vertices_entrada"] / anterior["filas_entrada"]
+        return _vertices_por_tipo(elemento.tipo_geometria if elemento is not None else None)
+
+    def bytes_por_entidad(self, capa: Capa, elemento: Optional[ElementoCatalogo]) -> float:
+        """Bytes escritos por entidad en un recorte anterior, o estimados con sus vértices."""
+        anterior = self.historial.get(clave_capa(capa), {})
+        if anterior.get("bytes_escritos") and anterior.get("filas_salida"):
+            return anterior["bytes_escritos"] / anterior["filas_salida"]
+        return BYTES_POR_FILA + BYTES_POR_VERTICE * self.vertices_por_entidad(capa, elemento)
+
+    def costo_estimado(self, capa: Capa, elemento: Optional[ElementoCatalogo], area: AreaRecorte) -> float:
+        """Costo relativo de recortar una capa: entidades por vértices por fracción solapada."""
+        if elemento is None:
+            return float(REGISTROS_DESCONOCIDOS * VERTICES_DESCONOCIDOS)
+        registros = elemento.registros if elemento.registros is not None else REGISTROS_DESCONOCIDOS
+        return registros * self.vertices_por_entidad(capa, elemento) * fraccion_solapada(elemento, area)
+
+    def _segundos_anteriores(self, capa: Capa, elemento: Optional[ElementoCatalogo]) -> Optional[float]:
+        """Tiempo que tomó la capa en un recorte anterior, escalado por el cambio en sus registros."""
+        anterior = self.historial.get(clave_capa(capa))
+        if anterior is None or anterior.get("total_s") is None:
+            return None
+        segundos = anterior["total_s"]
+        if elemento is not None and elemento.registros and anterior.get("filas_entrada"):
+            segundos *= elemento.registros / anterior["filas_entrada"]
+        return segundos
+
+    def estimar_segundos(self, capas: List[Capa], catalogo: Catalogo, area: AreaRecorte) -> Dict[Capa, float]:
+        """Segundos estimados para recortar cada capa.
+
+        Las capas sin historial se pasan a segundos con la mediana de
+        segundos por unidad de costo de las capas que sí lo tienen, o con
+        SEGUNDOS_POR_UNIDAD si ninguna lo tiene.
+        """
+        costos = {capa: self.costo_estimado(capa, catalogo.elemento(capa.nombre), area) for capa in capas}
+        segundos = {capa: self._segundos_anteriores(capa, catalogo.elemento(capa.nombre)) for capa in capas}
+        tasas = [segundos[capa] / costos[capa] for capa in capas if segundos[capa] is not None and costos[capa] > 0]
+        tasa = statistics.median(tasas) if tasas else SEGUNDOS_POR_UNIDAD
+        return {capa: segundos[capa] if segundos[capa] is not None else costos[capa] * tasa for capa in capas}
+
+    def ordenar(self, capas: List[Capa], catalogo: Catalogo, area: AreaRecorte) -> List[Capa]:
+        """Devuelve las capas ordenadas de mayor a menor costo estimado; a igual costo se conserva el orden."""
+        estimados = self.estimar_segundos(capas, catalogo, area)
+        return sorted(capas, key=lambda capa: estimados[capa], reverse=True)
@@ -0,0 +1,162 @@
+import logging
+from typing import Dict, List, NamedTuple, Optional, Set
+from manejo_gdb import (capas_pendientes, copiar_tablas, crear_dataset_si_falta, datasets_existentes,
+                        leer_catalogo, listar_capas, recortar_capas)
+from manifiesto import Manifiesto
+from metricas import MedidorSalida, Metricas, MetricasCapa
+from motor_base import COPIADA, ERROR, RECORTADA, SIN_INTERSECCION, Capa, Conteo, MotorGeoprocesamiento
+from progreso import Progreso
+
+# Momento en que las capas preparadas en memoria se vuelcan a la GDB de salida
+VOLCADO_FINAL = "final"
+VOLCADO_DATASET = "dataset"  # Al terminar la raíz y cada feature dataset
+
+# Memoria por defecto para las capas preparadas
+MAX_BYTES = 1024 * 1024 * 1024
+
+# Tamaño estimado en memoria de un vértice (x, y en doble precisión) y de los atributos de una fila
+BYTES_POR_VERTICE = 16
+BYTES_POR_FILA = 256
+
+def estimar_bytes(conteo: Optional[Conteo]) -> int:
+    """Memoria aproximada de una capa recortada según sus filas y vértices escritos."""
+    if conteo is None:
+        return 0
+    return (conteo.filas_salida or 0) * BYTES_POR_FILA + (conteo.vertices_salida or 0) * BYTES_POR_VERTICE
+
+class CapaPreparada(NamedTuple):
+    """Capa terminada que espera el volcado a la GDB de salida."""
+
+    capa: Capa
+    estado: str
+    origen: Optional[Capa]  # Recorte en memoria, capa de entrada si se copia completa, o None sin salida
+    medicion: MetricasCapa
+
+def _volcar(preparadas: List[CapaPreparada], gdb_salida: str, motor: MotorGeoprocesamiento,
+            datasets_creados: Set[str], firmas: Dict[Capa, dict], manifiesto: Optional[Manifiesto],
+            metricas: Optional[Metricas], medidor: Optional[MedidorSalida]) -> None:
+    """Escribe en orden las capas preparadas y solo entonces las registra como terminadas."""
+    for preparada in preparadas:
+        capa, medicion, estado = preparada.capa, preparada.medicion, preparada.estado
+        if preparada.origen is not None and preparada.origen.gdb != gdb_salida:
+            try:
+                with medicion.medir("copia" if estado == COPIADA else "volcado"):
+                    crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+                    motor.copiar_capa(preparada.origen, capa.en(gdb_salida))
+                if estado == COPIADA:
+                    medicion.conteo = motor.ultimo_conteo
+            except Exception as e:
+                logging.error(f"Error escribiendo {capa.ruta}: {e}")
+                estado = medicion.estado = ERROR
+        # Una capa con error queda fuera del manifiesto para que --reanudar la vuelva a intentar
+        if manifiesto is not None and estado != ERROR:
+            manifiesto.registrar(capa, estado, firmas.get(capa))
+        if metricas is not None:
+            medicion.bytes_escritos = medidor.medir()
+            metricas.registrar(medicion)
+    preparadas.clear()
+
+def recortar_capas_en_memoria(gdb_entrada: str, clip_features: str, gdb_salida: str,
+                              motor: MotorGeoprocesamiento, max_bytes: int = MAX_BYTES,
+                              volcado: str = VOLCADO_FINAL, manifiesto: Optional[Manifiesto] = None,
+                              anterior: Optional[Manifiesto] = None, metricas: Optional[Metricas] = None,
+                              progreso: Optional[Progreso] = None) -> None:
+    """Recorta las capas en un espacio de trabajo en memoria y las escribe juntas en la GDB de salida.
+
+    En lugar de muchas escrituras pequeñas sobre el disco de salida (a
+    menudo una unidad de red), las capas recortadas se preparan en memoria
+    y se vuelcan en el orden del recorte serial al final o al terminar cada
+    dataset. Las capas contenidas por completo no pasan por memoria: se
+    copian desde la entrada al volcar. Si las capas preparadas superan
+    max_bytes, se vuelcan las pendientes y el resto se escribe directo en
+    la GDB de salida.
+
+    Si el motor no tiene espacio de trabajo en memoria, se recorta en serie.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        clip_features: Ruta del shapefile de recorte.
+        gdb_salida: Ruta de la GDB de salida.
+        motor: Motor de geoprocesamiento.
+        max_bytes: Memoria máxima estimada para las capas preparadas.
+        volcado: VOLCADO_FINAL o VOLCADO_DATASET.
+        manifiesto: Manifiesto donde registrar las capas, a medida que se vuelcan.
+        anterior: Manifiesto de un recorte anterior del que reutilizar las capas sin cambios.
+        metricas: Registro de tiempos por capa, con la etapa de volcado.
+        progreso: Avance con el tiempo restante estimado, actualizado al preparar cada capa.
+    """
+    gdb_memoria = motor.crear_gdb_memoria()
+    if gdb_memoria is None:
+        logging.info(f"El motor {motor.nombre} no admite preparar capas en memoria; se recorta en serie.")
+        recortar_capas(gdb_entrada, clip_features, gdb_salida, motor, manifiesto, anterior, metricas, progreso)
+        return
+
+    area = motor.preparar_area(clip_features)
+    catalogo = leer_catalogo(gdb_entrada, motor)
+    datasets_creados = datasets_existentes(gdb_salida, motor)
+    medidor = MedidorSalida(gdb_salida) if metricas is not None else None
+    capas, firmas = capas_pendientes(listar_capas(gdb_entrada, motor, catalogo), gdb_salida, motor,
+                                     manifiesto, anterior, datasets_creados)
+    if progreso is not None:
+        progreso.iniciar(capas, catalogo)
+    logging.info(f"Iniciando recorte en memoria de {len(capas)} capas (volcado: {volcado})...")
+
+    preparadas: List[CapaPreparada] = []
+    ocupados = 0
+    en_memoria = True
+    try:
+        for capa in capas:
+            if volcado == VOLCADO_DATASET and preparadas and preparadas[-1].capa.dataset != capa.dataset:
+                _volcar(preparadas, gdb_salida, motor, datasets_creados, firmas, manifiesto, metricas, medidor)
+                motor.vaciar_gdb_memoria(gdb_memoria)
+                ocupados = 0
+
+            medicion = MetricasCapa(capa)
+            motor.ultimo_conteo = None
+            origen = None
+            try:
+                with medicion.medir("interseccion"):
+                    contenida = motor.esta_contenida(capa, area)
+                    intersecta = contenida or motor.tiene_interseccion(capa, area)
+                if contenida:
+                    estado, origen = COPIADA, capa
+                elif intersecta:
+                    if en_memoria:
+                        origen = Capa(gdb_memoria, "", capa.nombre)
+                    else:
+                        origen = capa.en(gdb_salida)
+                        crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+                    with medicion.medir("recorte"):
+                        estado = motor.recortar_capa(capa, area, origen)
+                    if estado != RECORTADA:
+                        origen = None
+                else:
+                    estado = SIN_INTERSECCION
+            except Exception as e:
+                # Como en el recorte serial, la capa se registra como ERROR y el resto sigue
+                logging.error(f"Error recortando {capa.ruta}: {e}")
+                estado, origen = ERROR, None
+            medicion.estado = estado
+            medicion.conteo = motor.ultimo_conteo
+            preparadas.append(CapaPreparada(capa, estado, origen, medicion))
+            if progreso is not None:
+                # El avance se cuenta al recortar, que es lo que toma tiempo, no al volcar
+                progreso.registrar(medicion)
+
+            if en_memoria and estado == RECORTADA:
+                ocupados += estimar_bytes(medicion.conteo)
+                if ocupados > max_bytes:
+                    logging.warning(f"Las capas en memoria superan {max_bytes // (1024 * 1024)} MB; "
+                                    f"se vuelcan y el resto se escribe directo en {gdb_salida}.")
+                    _volcar(preparadas, gdb_salida, motor, datasets_creados, firmas, manifiesto, metricas, medidor)
+                    motor.vaciar_gdb_memoria(gdb_memoria)
+                    en_memoria = False
+            if not en_memoria:
+                # Sin memoria disponible cada capa se registra en cuanto queda escrita
+                _volcar(preparadas, gdb_salida, motor, datasets_creados, firmas, manifiesto, metricas, medidor)
+        _volcar(preparadas, gdb_salida, motor, datasets_creados, firmas, manifiesto, metricas, medidor)
+    finally:
+        motor.vaciar_gdb_memoria(gdb_memoria)
+
+    copiar_tablas(gdb_entrada, gdb_salida, motor, catalogo)
+    logging.info("Recorte en memoria finalizado.")
@@ -0,0 +1,114 @@
+import collections
+import logging
+import threading
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+from catalogo import Catalogo
+from metricas import MetricasCapa
+from motor_base import Capa
+from planificador import REGISTROS_DESCONOCIDOS, Planificador
+
+# Segundos mínimos entre dos mensajes de avance
+INTERVALO_S = 10.0
+
+# Segundos de capas terminadas con los que se calcula el rendimiento reciente
+VENTANA_S = 60.0
+
+def _duracion(segundos: float) -> str:
+    """Formatea una duración como 1h05m, 4m12s o 37s."""
+    segundos = int(round(segundos))
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    if horas:
+        return f"{horas}h{minutos:02d}m"
+    if minutos:
+        return f"{minutos}m{segundos:02d}s"
+    return f"{segundos}s"
+
+class Progreso:
+    """Avance de un recorte ponderado por entidades y vértices, con el tiempo restante estimado.
+
+    Cada capa pesa sus registros por los vértices por entidad, de modo que
+    terminar una capa grande cuenta más que varias pequeñas. El tiempo
+    restante se calcula con el peso terminado por segundo desde el inicio y
+    se afina a medida que terminan las capas; el rendimiento (entidades y MB
+    por segundo) es el de las capas terminadas en la última ventana. Se
+    puede llamar desde varios hilos, y los mensajes se limitan a uno cada
+    intervalo_s para no frenar el recorte escribiendo en la consola.
+    """
+
+    def __init__(self, intervalo_s: float = INTERVALO_S, ventana_s: float = VENTANA_S,
+                 planificador: Optional[Planificador] = None):
+        """
+        Args:
+            intervalo_s: Segundos mínimos entre dos mensajes; 0 informa cada capa.
+            ventana_s: Segundos de capas terminadas que cuentan para el rendimiento.
+            planificador: Planificador con los vértices por entidad medidos en recortes anteriores.
+        """
+        self.intervalo_s = intervalo_s
+        self.ventana_s = ventana_s
+        self.planificador = planificador or Planificador()
+        self._bloqueo = threading.Lock()
+        self._pesos: Dict[Capa, float] = {}
+        self._recientes: Deque[Tuple[float, int, int]] = collections.deque()
+        self._total = 0.0
+        self._terminado = 0.0
+        self._capas = 0
+        self._inicio = 0.0
+        self._ultimo_mensaje = 0.0
+
+    def iniciar(self, capas: List[Capa], catalogo: Catalogo) -> None:
+        """Calcula el peso de cada capa pendiente y pone en marcha el reloj."""
+        with self._bloqueo:
+            self._pesos = {}
+            for capa in capas:
+                elemento = catalogo.elemento(capa.nombre)
+                registros = REGISTROS_DESCONOCIDOS
+                if elemento is not None and elemento.registros is not None:
+                    registros = elemento.registros
+                # Las capas vacías también cuentan algo: hay que abrirlas y consultarlas
+                self._pesos[capa] = max(registros, 1) * self.planificador.vertices_por_entidad(capa, elemento)
+            self._total = sum(self._pesos.values())
+            self._terminado = 0.0
+            self._capas = 0
+            self._recientes.clear()
+            self._inicio = self._ultimo_mensaje = time.perf_counter()
+
+    def omitir(self, capa: Capa) -> None:
+        """Descuenta del total una capa que no se va a recortar, como las ya terminadas al reanudar."""
+        with self._bloqueo:
+            self._total -= self._pesos.pop(capa, 0.0)
+
+    def registrar(self, medicion: MetricasCapa) -> None:
+        """Suma una capa terminada e informa el avance si pasó el intervalo o era la última."""
+        ahora = time.perf_counter()
+        conteo = medicion.conteo
+        entidades = (conteo.filas_salida or 0) if conteo is not None else 0
+        with self._bloqueo:
+            self._terminado += self._pesos.pop(medicion.capa, 0.0)
+            self._capas += 1
+            self._recientes.append((ahora, entidades, medicion.bytes_escritos))
+            while self._recientes and self._recientes[0][0] < ahora - self.ventana_s:
+                self._recientes.popleft()
+            ultima = not self._pesos
+            if not ultima and ahora - self._ultimo_mensaje < self.intervalo_s:
+                return
+            self._ultimo_mensaje = ahora
+            mensaje = self._mensaje(ahora)
+        logging.info(mensaje)
+
+    def _mensaje(self, ahora: float) -> str:
+        transcurrido = ahora - self._inicio
+        fraccion = self._terminado / self._total if self._total else 1.0
+        segundos = max(ahora - max(self._inicio, ahora - self.ventana_s), 1e-9)
+        entidades_s = sum(r[1] for r in self._recientes) / segundos
+        mb_s = sum(r[2] for r in self._recientes) / segundos / (1024 * 1024)
+        if fraccion >= 1.0:
+            restante = "terminado"
+        elif self._terminado > 0:
+            restante = f"quedan ~{_duracion(transcurrido * (self._total - self._terminado) / self._terminado)}"
+        else:
+            restante = "calculando el tiempo restante"
+        return (f"Avance {fraccion:.0%} ({self._capas}/"
+                f"{self._capas + len(self._pesos)} capas) en {_duracion(transcurrido)}, "
+                f"{entidades_s:.0f} entidades/s, {mb_s:.1f} MB/s, {restante}")
@@ -0,0 +1,135 @@
+import argparse
+import logging
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+from area_recorte import AreaRecorte
+from cache_catalogo import CacheCatalogo
+from configuracion import Configuracion
+from manejo_gdb import copiar_tablas, leer_catalogo, listar_capas
+from motor_base import ERROR, MotorGeoprocesamiento, crear_motor
+from utilidades import generar_nombre_gdb_unico, liberar_nombre_gdb
+from validaciones import validar_entradas
+
+def nombre_valido(nombre: str) -> str:
+    """Convierte el nombre de un área en un sufijo válido para el nombre de una GDB."""
+    return re.sub(r"\W+", "_", nombre).strip("_") or "area"
+
+def preparar_areas(clips: List[str], motor: MotorGeoprocesamiento,
+                   campo: Optional[str] = None) -> Dict[str, AreaRecorte]:
+    """Prepara las áreas de recorte de un lote de proyectos.
+
+    Args:
+        clips: Shapefiles de recorte.
+        motor: Motor de geoprocesamiento.
+        campo: Si se indica, cada shapefile se divide en un área por cada valor del campo.
+
+    Returns:
+        Áreas por nombre: el nombre del shapefile, o el valor del campo
+        (precedido del shapefile si hay varios).
+    """
+    areas = {}
+    for clip in clips:
+        if not campo:
+            areas[Path(clip).stem] = motor.preparar_area(clip)
+            continue
+        for valor, area in motor.preparar_areas_por_campo(clip, campo).items():
+            areas[f"{Path(clip).stem}_{valor}" if len(clips) > 1 else valor] = area
+    return areas
+
+def recortar_multiples_areas(gdb_entrada: str, areas: Dict[str, AreaRecorte], gdb_salidas: Dict[str, str],
+                             motor: MotorGeoprocesamiento) -> Dict[str, Dict[str, int]]:
+    """Recorta una GDB contra varias áreas leyendo cada capa una sola vez.
+
+    Cada capa se lee una vez y sus entidades se reparten entre todas las
+    áreas que tocan, escribiendo en la GDB de salida de cada área. Un error
+    en una capa se registra y no detiene el resto del lote.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        areas: Áreas de recorte por nombre.
+        gdb_salidas: GDB de salida de cada área, con los mismos nombres.
+        motor: Motor de geoprocesamiento.
+
+    Returns:
+        Cantidad de capas por estado para cada área.
+    """
+    catalogo = leer_catalogo(gdb_entrada, motor)
+    capas = listar_capas(gdb_entrada, motor, catalogo)
+    logging.info(f"Iniciando recorte de {len(capas)} capas contra {len(areas)} áreas...")
+    resumen = {nombre: Counter() for nombre in areas}
+    for capa in capas:
+        destinos = {nombre: capa.en(gdb) for nombre, gdb in gdb_salidas.items()}
+        try:
+            estados = motor.recortar_capa_multiple(capa, areas, destinos)
+        except Exception as e:
+            logging.error(f"Error recortando {capa.ruta}: {e}")
+            estados = {nombre: ERROR for nombre in areas}
+        for nombre, estado in estados.items():
+            resumen[nombre][estado] += 1
+
+    for gdb_salida in gdb_salidas.values():
+        copiar_tablas(gdb_entrada, gdb_salida, motor, catalogo)
+        motor.eliminar_archivos_temp(gdb_salida)
+    logging.info("Recorte de múltiples áreas finalizado.")
+    return {nombre: dict(conteo) for nombre, conteo in resumen.items()}
+
+def crear_gdbs_salida(areas: Dict[str, AreaRecorte], carpeta: Path, prefijo: str,
+                      motor: MotorGeoprocesamiento) -> Dict[str, str]:
+    """Crea una GDB de salida con nombre único por área: <prefijo>_<área>_N.gdb.
+
+    Los nombres quedan reservados hasta que se liberan con liberar_nombre_gdb al terminar el recorte.
+    Si falla la creación de alguna, se liberan todas las reservas hechas hasta ese momento.
+    """
+    gdb_salidas = {}
+    reservadas = []
+    usados = set()
+    try:
+        for nombre in areas:
+            sufijo = nombre_valido(nombre)
+            if sufijo in usados:
+                sufijo = f"{sufijo}_{len(usados)}"
+            usados.add(sufijo)
+            reservadas.append(generar_nombre_gdb_unico(carpeta, f"{prefijo}_{sufijo}"))
+            gdb_salidas[nombre] = motor.crear_gdb(str(carpeta), Path(reservadas[-1]).name)
+    except BaseException:
+        for ruta in reservadas:
+            liberar_nombre_gdb(ruta)
+        raise
+    return gdb_salidas
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Recorta una GDB para varios proyectos a la vez, sin preguntas interactivas."""
+    parser = argparse.ArgumentParser(description="Recorta una GDB contra varias áreas leyendo cada capa una sola vez.")
+    parser.add_argument("gdb_entrada", help="GDB de entrada.")
+    parser.add_argument("areas", nargs="+", help="Shapefiles de recorte, uno por proyecto.")
+    parser.add_argument("--campo", help="Divide cada shapefile en un área por cada valor de este campo.")
+    args = parser.parse_args(argv)
+
+    config = Configuracion()
+    motor = crear_motor(config.obtener_motor())
+    motor.cache_catalogo = CacheCatalogo.desde_configuracion(config)
+    motor.campos_clave_tablas = config.obtener_claves_tablas()
+    for clip in args.areas:
+        valido, mensaje = validar_entradas(args.gdb_entrada, clip, motor)
+        if not valido:
+            logging.error(mensaje)
+            return
+
+    inicio = time.time()
+    areas = preparar_areas(args.areas, motor, args.campo)
+    gdb_salidas = crear_gdbs_salida(areas, Path(args.gdb_entrada).parent, config.obtener_prefijo_gdb(), motor)
+    try:
+        resumen = recortar_multiples_areas(args.gdb_entrada, areas, gdb_salidas, motor)
+    finally:
+        for gdb_salida in gdb_salidas.values():
+            liberar_nombre_gdb(gdb_salida)
+
+    for nombre, conteo in resumen.items():
+        logging.info(f"{nombre} -> {gdb_salidas[nombre]}: {conteo}")
+    logging.info(f"{len(areas)} áreas recortadas en {time.time() - inicio:.2f} segundos")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from area_recorte import AreaRecorte
+from manejo_gdb import (capas_pendientes, copiar_tablas, crear_dataset_si_falta, datasets_existentes,
+                        leer_catalogo, listar_capas, procesar_capa)
+from manifiesto import Manifiesto
+from metricas import MedidorSalida, Metricas, MetricasCapa
+from motor_base import (COPIADA, ERROR, RECORTADA, SIN_INTERSECCION, Capa, MotorGeoprocesamiento,
+                        crear_motor)
+from planificador import Planificador
+from progreso import Progreso
+
+# Estado de cada proceso trabajador, asignado en _inicializar_trabajador
+_motor: Optional[MotorGeoprocesamiento] = None
+_area: Optional[AreaRecorte] = None
+_gdb_temporal: Optional[str] = None
+
+def _inicializar_trabajador(nombre_motor: str, clip_features: str, carpeta_temporal: str) -> None:
+    """Prepara un proceso trabajador con su propio motor y GDB temporal de salida.
+
+    Cada trabajador escribe en una GDB distinta para no competir por el
+    bloqueo de escritura de la GDB final, y prepara el área de recorte una
+    sola vez para todas las capas que le toquen.
+    """
+    global _motor, _area, _gdb_temporal
+    _motor = crear_motor(nombre_motor)
+    _area = _motor.preparar_area(clip_features)
+    _gdb_temporal = _motor.crear_gdb(carpeta_temporal, f"trabajador_{os.getpid()}.gdb")
+
+def _recortar_en_trabajador(capa: Capa) -> Tuple[Capa, str, Capa, MetricasCapa]:
+    """Recorta una capa dentro del proceso trabajador.
+
+    Returns:
+        Tupla (capa, estado, capa resultante en la GDB temporal, métricas del trabajador).
+    """
+    temporal = Capa(_gdb_temporal, "", capa.nombre)
+    medicion = MetricasCapa(capa)
+    try:
+        estado = procesar_capa(capa, _area, temporal, _motor, medicion)
+    except Exception as e:
+        logging.error(f"Error recortando {capa.ruta}: {e}")
+        estado = ERROR
+    medicion.estado = estado
+    return capa, estado, temporal, medicion
+
+def recortar_capas_paralelo(gdb_entrada: str, clip_features: str, gdb_salida: str,
+                            motor: MotorGeoprocesamiento, num_procesos: int,
+                            manifiesto: Optional[Manifiesto] = None,
+                            anterior: Optional[Manifiesto] = None,
+                            metricas: Optional[Metricas] = None,
+                            planificador: Optional[Planificador] = None,
+                            progreso: Optional[Progreso] = None) -> None:
+    """Recorta las capas repartiéndolas entre un pool de procesos.
+
+    Cada proceso recorta en su propia GDB temporal y el proceso principal
+    copia los resultados a la GDB final en el mismo orden que el recorte
+    serial, por lo que la salida es idéntica a la de recortar_capas. Con un
+    planificador las capas se envían al pool de la más costosa a la más
+    barata, para que las grandes no queden solas al final.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        clip_features: Ruta del shapefile de recorte.
+        gdb_salida: Ruta de la GDB de salida.
+        motor: Motor de geoprocesamiento; cada trabajador crea uno del mismo tipo.
+        num_procesos: Número de procesos trabajadores.
+        manifiesto: Manifiesto donde registrar las capas terminadas; las que ya
+            figuran como terminadas no se envían a los trabajadores.
+        anterior: Manifiesto de un recorte anterior; las capas cuya firma no
+            cambió se copian desde su GDB de salida sin pasar por el pool.
+        metricas: Registro de tiempos por capa; cada trabajador mide su recorte
+            y el proceso principal agrega el tiempo de fusión.
+        planificador: Planificador que decide en qué orden se envían las capas al pool.
+        progreso: Avance con el tiempo restante estimado, actualizado al fusionar cada capa.
+    """
+    catalogo = leer_catalogo(gdb_entrada, motor)
+    capas = listar_capas(gdb_entrada, motor, catalogo)
+    datasets_creados = datasets_existentes(gdb_salida, motor)
+    capas, firmas = capas_pendientes(capas, gdb_salida, motor, manifiesto, anterior, datasets_creados)
+    logging.info(f"Iniciando recorte paralelo de {len(capas)} capas con {num_procesos} procesos...")
+    envio = capas
+    if planificador is not None:
+        envio = planificador.ordenar(capas, catalogo, motor.preparar_area(clip_features))
+    if progreso is not None:
+        progreso.iniciar(capas, catalogo)
+    medir_bytes = metricas is not None or progreso is not None
+    medidor = MedidorSalida(gdb_salida) if medir_bytes else None
+
+    carpeta_temporal = tempfile.mkdtemp(prefix="cortador_")
+    try:
+        with ProcessPoolExecutor(max_workers=num_procesos, initializer=_inicializar_trabajador,
+                                 initargs=(motor.nombre, clip_features, carpeta_temporal)) as pool:
+            # El pool toma las capas en el orden de envío, pero se fusionan en el orden serial
+            futuros = {capa: pool.submit(_recortar_en_trabajador, capa) for capa in envio}
+            for capa in capas:
+                # Como en la tubería, una capa con error se registra como ERROR y no entra al
+                # manifiesto, para que --reanudar la vuelva a intentar
+                try:
+                    capa, estado, temporal, medicion = futuros.pop(capa).result()
+                except Exception as e:
+                    # El proceso trabajador terminó de forma anormal o el resultado no se pudo recibir
+                    logging.error(f"Error recortando {capa.ruta}: {e}")
+                    estado, temporal, medicion = ERROR, None, MetricasCapa(capa)
+                if estado != ERROR and estado != SIN_INTERSECCION:
+                    try:
+                        with medicion.medir("fusion"):
+                            crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+                            if estado in (RECORTADA, COPIADA):
+                                motor.copiar_capa(temporal, capa.en(gdb_salida))
+                    except Exception as e:
+                        logging.error(f"Error copiando {capa.ruta} a la GDB de salida: {e}")
+                        estado = ERROR
+                medicion.estado = estado
+                if manifiesto is not None and estado != ERROR:
+                    manifiesto.registrar(capa, estado, firmas[capa])
+                if medir_bytes:
+                    medicion.bytes_escritos = medidor.medir()
+                if metricas is not None:
+                    metricas.registrar(medicion)
+                if progreso is not None:
+                    progreso.registrar(medicion)
+    finally:
+        shutil.rmtree(carpeta_temporal, ignore_errors=True)
+
+    copiar_tablas(gdb_entrada, gdb_salida, motor, catalogo)
+    logging.info("Recorte paralelo de capas finalizado.")
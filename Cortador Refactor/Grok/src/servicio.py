@@ -0,0 +1,359 @@
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+from configuracion import Configuracion
+from ejecutor_lotes import FALLIDO, Trabajo, ejecutar_trabajo, procesos_lote, trabajo_desde_dict
+from main import preparar_motor
+from manejo_gdb import leer_catalogo
+from motor_base import MotorGeoprocesamiento
+
+# Estados de un trabajo antes de su resultado (terminado o fallido, como en ejecutor_lotes)
+EN_COLA = "en_cola"
+EJECUTANDO = "ejecutando"
+
+# Dirección por defecto: solo la máquina local, porque el servicio no tiene autenticación
+HOST = "127.0.0.1"
+PUERTO = 8765
+
+# Motor, cola de eventos y manejador del log de cada proceso trabajador, asignados en _inicializar_trabajador
+_motor: Optional[MotorGeoprocesamiento] = None
+_ruta_config: Optional[str] = None
+_eventos = None
+_manejador: Optional["_ManejadorEventos"] = None
+
+class _ManejadorEventos(logging.Handler):
+    """Reenvía los mensajes del log al trabajo en curso como eventos de avance."""
+
+    def __init__(self, emitir: Callable[[str, str], None]):
+        super().__init__(logging.INFO)
+        self.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+        self.emitir = emitir
+        self.id_trabajo: Optional[str] = None
+
+    def emit(self, record: logging.LogRecord) -> None:
+        id_trabajo = self.id_trabajo
+        if id_trabajo is not None:
+            self.emitir(id_trabajo, self.format(record))
+
+def precalentar(motor: MotorGeoprocesamiento, gdbs: Sequence[str]) -> None:
+    """Lee el catálogo de las GDB maestras y lo deja en la memoria del motor para los trabajos."""
+    for gdb in gdbs:
+        inicio = time.perf_counter()
+        try:
+            catalogo = leer_catalogo(gdb, motor)
+        except Exception as e:
+            logging.warning(f"No se pudo precargar el catálogo de {gdb}: {e}")
+            continue
+        logging.info(f"Catálogo de {gdb} precargado ({len(catalogo.elementos)} elementos) "
+                     f"en {time.perf_counter() - inicio:.2f} s")
+
+class Servicio(ABC):
+    """Cola de trabajos de recorte con su estado y sus eventos de avance.
+
+    Las subclases deciden dónde corre cada trabajo; esta clase guarda los
+    eventos de cada uno (inicio, mensajes del log y fin con el resultado) y
+    permite seguirlos mientras llegan, que es lo que expone la API HTTP.
+    """
+
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._contador = itertools.count(1)
+        self._trabajos: Dict[str, Dict[str, Any]] = {}
+
+    def enviar(self, trabajo: Trabajo) -> str:
+        """Encola un trabajo y devuelve su identificador."""
+        with self._condicion:
+            id_trabajo = str(next(self._contador))
+            self._trabajos[id_trabajo] = {"id": id_trabajo, "nombre": trabajo.nombre, "estado": EN_COLA,
+                                          "resultado": None, "eventos": []}
+        self._lanzar(id_trabajo, trabajo)
+        return id_trabajo
+
+    @abstractmethod
+    def _lanzar(self, id_trabajo: str, trabajo: Trabajo) -> None:
+        """Pone a correr un trabajo ya registrado con su identificador."""
+
+    def _evento(self, id_trabajo: str, tipo: str, **datos: Any) -> None:
+        with self._condicion:
+            registro = self._trabajos.get(id_trabajo)
+            if registro is None:
+                return
+            if tipo == "inicio":
+                registro["estado"] = EJECUTANDO
+            elif tipo == "fin":
+                registro["estado"] = datos["resultado"]["estado"]
+                registro["resultado"] = datos["resultado"]
+            registro["eventos"].append({"tipo": tipo, "t": round(time.time(), 3), **datos})
+            self._condicion.notify_all()
+
+    def _avance(self, id_trabajo: str, mensaje: str) -> None:
+        self._evento(id_trabajo, "avance", mensaje=mensaje)
+
+    def estado(self, id_trabajo: str) -> Dict[str, Any]:
+        """Estado y resultado de un trabajo.
+
+        Raises:
+            KeyError: Si el trabajo no existe.
+        """
+        with self._condicion:
+            registro = self._trabajos[id_trabajo]
+            return {clave: registro[clave] for clave in ("id", "nombre", "estado", "resultado")}
+
+    def resumen(self) -> Dict[str, int]:
+        """Cantidad de trabajos en cada estado."""
+        with self._condicion:
+            conteo: Dict[str, int] = {}
+            for registro in self._trabajos.values():
+                conteo[registro["estado"]] = conteo.get(registro["estado"], 0) + 1
+            return conteo
+
+    def eventos(self, id_trabajo: str, desde: int = 0) -> Iterator[Dict[str, Any]]:
+        """Devuelve los eventos de un trabajo a medida que llegan, hasta el de fin.
+
+        Raises:
+            KeyError: Si el trabajo no existe.
+        """
+        with self._condicion:
+            eventos = self._trabajos[id_trabajo]["eventos"]
+        indice = desde
+        while True:
+            with self._condicion:
+                self._condicion.wait_for(lambda: len(eventos) > indice)
+                nuevos = eventos[indice:]
+            for evento in nuevos:
+                yield evento
+                if evento["tipo"] == "fin":
+                    return
+            indice += len(nuevos)
+
+    @abstractmethod
+    def cerrar(self) -> None:
+        """Espera a que terminen los trabajos en curso y libera los trabajadores."""
+
+class ServicioLocal(Servicio):
+    """Servicio que ejecuta los trabajos uno a uno en un hilo, con un motor ya cargado.
+
+    Sirve para usar el servicio sin procesos trabajadores y para probarlo con
+    cualquier motor, incluso uno que no se puede crear con crear_motor.
+    """
+
+    def __init__(self, motor: MotorGeoprocesamiento, ruta_config: Optional[str] = None):
+        super().__init__()
+        self.motor = motor
+        if motor.catalogos_en_memoria is None:
+            motor.catalogos_en_memoria = {}
+        self.ruta_config = ruta_config
+        self._cola: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._manejador = _ManejadorEventos(self._avance)
+        self._hilo = threading.Thread(target=self._atender, name="servicio-local", daemon=True)
+        self._hilo.start()
+
+    def _lanzar(self, id_trabajo: str, trabajo: Trabajo) -> None:
+        self._cola.put((id_trabajo, trabajo))
+
+    def _atender(self) -> None:
+        while True:
+            pedido = self._cola.get()
+            if pedido is None:
+                return
+            id_trabajo, trabajo = pedido
+            self._evento(id_trabajo, "inicio")
+            logging.getLogger().addHandler(self._manejador)
+            self._manejador.id_trabajo = id_trabajo
+            try:
+                resultado = ejecutar_trabajo(trabajo, self.ruta_config, self.motor)
+            finally:
+                self._manejador.id_trabajo = None
+                logging.getLogger().removeHandler(self._manejador)
+            self._evento(id_trabajo, "fin", resultado=resultado)
+
+    def cerrar(self) -> None:
+        self._cola.put(None)
+        self._hilo.join()
+
+def _inicializar_trabajador(ruta_config: Optional[str], gdbs_precarga: Sequence[str], eventos: Any) -> None:
+    global _motor, _ruta_config, _eventos, _manejador
+    _ruta_config = ruta_config
+    _eventos = eventos
+    config = Configuracion(Path(ruta_config)) if ruta_config else Configuracion()
+    _motor = preparar_motor(config)  # Aquí se paga una sola vez el import de arcpy
+    _motor.catalogos_en_memoria = {}
+    precalentar(_motor, gdbs_precarga)
+    _manejador = _ManejadorEventos(lambda id_trabajo, mensaje: _eventos.put((id_trabajo, "avance", mensaje)))
+    logging.getLogger().addHandler(_manejador)
+
+def _resultado(trabajo: Trabajo, futuro: Future) -> Dict[str, Any]:
+    try:
+        return futuro.result()
+    except Exception as e:
+        # El proceso del trabajo terminó de forma anormal (p. ej. sin memoria)
+        return {"nombre": trabajo.nombre, "gdb_entrada": trabajo.gdb_entrada, "area": trabajo.clip_features,
+                "estado": FALLIDO, "gdb_salida": None, "segundos": None, "error": str(e)}
+
+def _listo() -> None:
+    """Tarea vacía con la que se arrancan todos los trabajadores al iniciar el servicio."""
+
+def _ejecutar_en_trabajador(id_trabajo: str, trabajo: Trabajo) -> Dict[str, Any]:
+    _eventos.put((id_trabajo, "inicio", None))
+    _manejador.id_trabajo = id_trabajo
+    try:
+        return ejecutar_trabajo(trabajo, _ruta_config, _motor)
+    finally:
+        _manejador.id_trabajo = None
+
+class ServicioProcesos(Servicio):
+    """Servicio con un pool de procesos que cargan el motor y el catálogo maestro una sola vez.
+
+    Cada trabajador importa la librería del motor y lee el catálogo de las
+    GDB maestras al arrancar, antes de recibir trabajos, de modo que un
+    recorte pequeño ya no paga varios segundos de import de arcpy. Los
+    mensajes del log de cada trabajo vuelven como eventos por una cola del
+    Manager, cuyo put es síncrono: así el evento de fin, que se encola al
+    recibir el resultado, siempre llega después de los de avance.
+    """
+
+    def __init__(self, procesos: int, ruta_config: Optional[str] = None, gdbs_precarga: Sequence[str] = ()):
+        """
+        Args:
+            procesos: Trabajadores, es decir, trabajos que pueden correr a la vez.
+            ruta_config: config.ini con los valores por defecto; la opción motor de un trabajo se ignora
+                porque los trabajadores ya tienen el suyo cargado.
+            gdbs_precarga: GDB maestras cuyo catálogo se lee al arrancar cada trabajador.
+        """
+        super().__init__()
+        self._gestor = multiprocessing.Manager()
+        self._cola_eventos = self._gestor.Queue()
+        self._hilo = threading.Thread(target=self._recibir_eventos, name="servicio-eventos", daemon=True)
+        self._hilo.start()
+        self._pool = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_trabajador,
+                                         initargs=(ruta_config, tuple(gdbs_precarga), self._cola_eventos))
+        # El pool arranca los procesos bajo demanda: una tarea por trabajador los arranca a todos ya
+        for futuro in [self._pool.submit(_listo) for _ in range(procesos)]:
+            futuro.result()
+        logging.info(f"Servicio listo con {procesos} trabajadores.")
+
+    def _lanzar(self, id_trabajo: str, trabajo: Trabajo) -> None:
+        futuro = self._pool.submit(_ejecutar_en_trabajador, id_trabajo, trabajo)
+        futuro.add_done_callback(lambda f: self._cola_eventos.put((id_trabajo, "fin", _resultado(trabajo, f))))
+
+    def _recibir_eventos(self) -> None:
+        while True:
+            pedido = self._cola_eventos.get()
+            if pedido is None:
+                return
+            id_trabajo, tipo, datos = pedido
+            if tipo == "inicio":
+                self._evento(id_trabajo, "inicio")
+            elif tipo == "fin":
+                self._evento(id_trabajo, "fin", resultado=datos)
+            else:
+                self._avance(id_trabajo, datos)
+
+    def cerrar(self) -> None:
+        self._pool.shutdown(wait=True)
+        self._cola_eventos.put(None)
+        self._hilo.join()
+        self._gestor.shutdown()
+
+class _Manejador(BaseHTTPRequestHandler):
+    """API HTTP del servicio.
+
+    POST /trabajos            encola un trabajo (JSON como en el archivo de lotes) y devuelve su id
+    GET  /trabajos/<id>       estado y resultado del trabajo
+    GET  /trabajos/<id>/eventos  eventos en JSON, uno por línea, hasta que el trabajo termina
+    GET  /estado              cantidad de trabajos en cada estado
+    """
+
+    server: "ServidorCortador"
+
+    def _responder(self, codigo: int, datos: Any) -> None:
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/trabajos":
+            self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+            return
+        try:
+            entrada = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+            trabajo = trabajo_desde_dict(entrada, next(self.server.numeros))
+        except ValueError as e:
+            self._responder(400, {"error": str(e)})
+            return
+        self._responder(202, {"id": self.server.servicio.enviar(trabajo)})
+
+    def do_GET(self) -> None:
+        partes = self.path.strip("/").split("/")
+        servicio = self.server.servicio
+        try:
+            if partes == ["estado"]:
+                self._responder(200, servicio.resumen())
+            elif len(partes) == 2 and partes[0] == "trabajos":
+                self._responder(200, servicio.estado(partes[1]))
+            elif len(partes) == 3 and partes[0] == "trabajos" and partes[2] == "eventos":
+                eventos = servicio.eventos(partes[1])
+                primero = next(eventos)  # KeyError antes de enviar las cabeceras si no existe
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+                self.end_headers()
+                for evento in itertools.chain([primero], eventos):
+                    self.wfile.write(json.dumps(evento, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+            else:
+                self._responder(404, {"error": f"Ruta desconocida: {self.path}"})
+        except KeyError:
+            self._responder(404, {"error": f"Trabajo desconocido: {partes[1]}"})
+
+    def log_message(self, formato: str, *args: Any) -> None:
+        logging.debug(f"{self.address_string()} {formato % args}")
+
+class ServidorCortador(ThreadingHTTPServer):
+    """Servidor HTTP que atiende la API de un servicio, un hilo por conexión."""
+
+    daemon_threads = True
+
+    def __init__(self, servicio: Servicio, host: str = HOST, puerto: int = PUERTO):
+        super().__init__((host, puerto), _Manejador)
+        self.servicio = servicio
+        self.numeros = itertools.count(1)  # Para el nombre por defecto de los trabajos
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Arranca el servicio con sus trabajadores precalentados y atiende la API hasta Ctrl+C."""
+    parser = argparse.ArgumentParser(description="Servicio local que mantiene el motor cargado entre recortes.")
+    parser.add_argument("--host", default=HOST, help=f"Dirección en la que escucha (por defecto {HOST}).")
+    parser.add_argument("--puerto", type=int, default=PUERTO, help=f"Puerto de la API (por defecto {PUERTO}).")
+    parser.add_argument("--procesos", type=int, help="Trabajadores (por defecto según núcleos y memoria).")
+    parser.add_argument("--config", help="config.ini con los valores por defecto de los trabajos.")
+    parser.add_argument("--precargar", action="append", default=[], metavar="GDB",
+                        help="GDB maestra cuyo catálogo se lee al arrancar cada trabajador (se puede repetir).")
+    args = parser.parse_args(argv)
+
+    Configuracion(Path(args.config)) if args.config else Configuracion()  # Configura el logging
+    procesos = args.procesos or procesos_lote(multiprocessing.cpu_count())
+    servicio = ServicioProcesos(procesos, args.config, args.precargar)
+    servidor = ServidorCortador(servicio, args.host, args.puerto)
+    logging.info(f"API del cortador en http://{args.host}:{servidor.server_address[1]}/trabajos")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Deteniendo el servicio...")
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import logging
+import queue
+import threading
+from typing import List, NamedTuple, Optional
+from area_recorte import AreaRecorte
+from manejo_gdb import (capas_pendientes, copiar_tablas, crear_dataset_si_falta, datasets_existentes,
+                        leer_catalogo, listar_capas, recortar_capas)
+from manifiesto import Manifiesto
+from metricas import MedidorSalida, Metricas, MetricasCapa
+from motor_base import COPIADA, ERROR, SIN_INTERSECCION, Capa, Lote, MotorGeoprocesamiento
+from planificador import Planificador
+from progreso import Progreso
+
+# Capas que pueden esperar en cada cola; junto con los hilos de recorte acotan la memoria usada
+TAMANO_COLA = 2
+
+# Acciones que el lector encarga a las etapas siguientes
+RECORTAR = "recortar"
+COPIAR = "copiar"
+OMITIR = "omitir"
+
+class Tarea(NamedTuple):
+    """Capa en tránsito por la tubería, con el lote leído o recortado."""
+
+    capa: Capa
+    accion: str
+    lote: Optional[Lote]
+    medicion: MetricasCapa
+
+# Marca de fin de capas en las colas
+_FIN = None
+
+def _leer(capas: List[Capa], area: AreaRecorte, motor: MotorGeoprocesamiento, cola: queue.Queue,
+          hilos_recorte: int) -> None:
+    """Etapa de lectura: decide qué hacer con cada capa y lee por adelantado las que hay que recortar."""
+    for capa in capas:
+        medicion = MetricasCapa(capa)
+        try:
+            with medicion.medir("lectura"):
+                if motor.esta_contenida(capa, area):
+                    tarea = Tarea(capa, COPIAR, None, medicion)
+                else:
+                    lote = motor.leer_capa(capa, area)
+                    tarea = Tarea(capa, RECORTAR if lote is not None else OMITIR, lote, medicion)
+        except Exception as e:
+            logging.error(f"Error leyendo {capa.ruta}: {e}")
+            medicion.estado = ERROR
+            tarea = Tarea(capa, OMITIR, None, medicion)
+        cola.put(tarea)  # Se bloquea si el recorte va atrasado
+    for _ in range(hilos_recorte):
+        cola.put(_FIN)
+
+def _recortar(motor: MotorGeoprocesamiento, entrada: queue.Queue, salida: queue.Queue) -> None:
+    """Etapa de recorte: recorta en memoria los lotes leídos."""
+    while True:
+        tarea = entrada.get()
+        if tarea is _FIN:
+            salida.put(_FIN)
+            return
+        if tarea.accion == RECORTAR:
+            try:
+                with tarea.medicion.medir("recorte"):
+                    lote = motor.recortar_lote(tarea.lote)
+                tarea = tarea._replace(accion=RECORTAR if lote is not None else OMITIR, lote=lote)
+            except Exception as e:
+                logging.error(f"Error recortando {tarea.capa.ruta}: {e}")
+                tarea.medicion.estado = ERROR
+                tarea = tarea._replace(accion=OMITIR, lote=None)
+        salida.put(tarea)
+
+def recortar_capas_tuberia(gdb_entrada: str, clip_features: str, gdb_salida: str,
+                           motor: MotorGeoprocesamiento, hilos_recorte: int = 2,
+                           manifiesto: Optional[Manifiesto] = None, anterior: Optional[Manifiesto] = None,
+                           metricas: Optional[Metricas] = None, tamano_cola: int = TAMANO_COLA,
+                           planificador: Optional[Planificador] = None,
+                           progreso: Optional[Progreso] = None) -> None:
+    """Recorta las capas solapando lectura, recorte y escritura en hilos unidos por colas acotadas.
+
+    Un hilo lector prepara la siguiente capa mientras los hilos de recorte
+    trabajan y el hilo principal, único dueño de la GDB de salida, escribe
+    los resultados y registra el manifiesto y las métricas. Las colas
+    limitan cuántas capas quedan en memoria a la vez. Las capas se
+    escriben en el orden en que terminan, que puede diferir del serial.
+
+    Si el motor no separa las etapas (arcpy), se recorta en serie.
+
+    Args:
+        gdb_entrada: Ruta de la GDB de entrada.
+        clip_features: Ruta del shapefile de recorte.
+        gdb_salida: Ruta de la GDB de salida.
+        motor: Motor de geoprocesamiento.
+        hilos_recorte: Hilos de la etapa de recorte.
+        manifiesto: Manifiesto donde registrar las capas terminadas.
+        anterior: Manifiesto de un recorte anterior del que reutilizar las capas sin cambios.
+        metricas: Registro de tiempos por capa, con las etapas lectura, recorte y escritura.
+        tamano_cola: Capas que pueden esperar en cada cola.
+        planificador: Planificador que ordena la lectura de la capa más costosa a la más barata.
+        progreso: Avance con el tiempo restante estimado, actualizado al escribir cada capa.
+    """
+    if not motor.admite_tuberia:
+        logging.info(f"El motor {motor.nombre} no admite el recorte en tubería; se recorta en serie.")
+        recortar_capas(gdb_entrada, clip_features, gdb_salida, motor, manifiesto, anterior, metricas, progreso)
+        return
+
+    area = motor.preparar_area(clip_features)
+    catalogo = leer_catalogo(gdb_entrada, motor)
+    datasets_creados = datasets_existentes(gdb_salida, motor)
+    capas, firmas = capas_pendientes(listar_capas(gdb_entrada, motor, catalogo), gdb_salida, motor,
+                                     manifiesto, anterior, datasets_creados)
+    if planificador is not None:
+        capas = planificador.ordenar(capas, catalogo, area)
+    if progreso is not None:
+        progreso.iniciar(capas, catalogo)
+    medir_bytes = metricas is not None or progreso is not None
+    medidor = MedidorSalida(gdb_salida) if medir_bytes else None
+    logging.info(f"Iniciando recorte en tubería de {len(capas)} capas con {hilos_recorte} hilos de recorte...")
+
+    leidas = queue.Queue(maxsize=tamano_cola)
+    recortadas = queue.Queue(maxsize=tamano_cola)
+    hilos = [threading.Thread(target=_leer, args=(capas, area, motor, leidas, hilos_recorte), daemon=True)]
+    hilos.extend(threading.Thread(target=_recortar, args=(motor, leidas, recortadas), daemon=True)
+                 for _ in range(hilos_recorte))
+    for hilo in hilos:
+        hilo.start()
+
+    terminados = 0
+    while terminados < hilos_recorte:
+        tarea = recortadas.get()
+        if tarea is _FIN:
+            terminados += 1
+            continue
+        capa, medicion = tarea.capa, tarea.medicion
+        estado = medicion.estado or SIN_INTERSECCION
+        conteo = tarea.lote.conteo if tarea.lote is not None else None
+        try:
+            with medicion.medir("escritura"):
+                if tarea.accion == COPIAR:
+                    crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+                    motor.copiar_capa(capa, capa.en(gdb_salida))
+                    conteo = motor.ultimo_conteo
+                    estado = COPIADA
+                elif tarea.accion == RECORTAR:
+                    crear_dataset_si_falta(capa, gdb_salida, motor, datasets_creados)
+                    estado = motor.escribir_lote(tarea.lote, capa.en(gdb_salida))
+        except Exception as e:
+            logging.error(f"Error escribiendo {capa.ruta}: {e}")
+            estado = ERROR
+
+        if manifiesto is not None and estado != ERROR:
+            manifiesto.registrar(capa, estado, firmas.get(capa))
+        if medir_bytes:
+            medicion.estado = estado
+            medicion.conteo = conteo
+            medicion.bytes_escritos = medidor.medir()
+        if metricas is not None:
+            metricas.registrar(medicion)
+        if progreso is not None:
+            progreso.registrar(medicion)
+
+    for hilo in hilos:
+        hilo.join()
+    copiar_tablas(gdb_entrada, gdb_salida, motor, catalogo)
+    logging.info("Recorte en tubería finalizado.")
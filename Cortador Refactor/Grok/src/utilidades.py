@@ -1,10 +1,34 @@
-import arcpy
-import logging
+import os
+import re
 from pathlib import Path
-from typing import Optional
+
+# Archivo que aparta el nombre de una GDB mientras dura el recorte: CartoBase_3.gdb.reserva
+SUFIJO_RESERVA = ".reserva"
+
+def ultimo_numero_gdb(base_folder: Path, prefijo: str) -> int:
+    """Mayor N entre las GDB <prefijo>_N.gdb y sus reservas, leyendo la carpeta una sola vez.
+
+    Returns:
+        El mayor número encontrado, o 0 si no hay ninguna o la carpeta no existe.
+    """
+    patron = re.compile(rf"{re.escape(prefijo)}_(\d+)\.gdb(?:{re.escape(SUFIJO_RESERVA)})?", re.IGNORECASE)
+    try:
+        with os.scandir(base_folder) as entradas:
+            coincidencias = [patron.fullmatch(entrada.name) for entrada in entradas]
+    except FileNotFoundError:
+        return 0
+    return max((int(c.group(1)) for c in coincidencias if c), default=0)
 
 def generar_nombre_gdb_unico(base_folder: Path, prefijo: str) -> str:
-    """Genera un nombre único para la GDB de salida.
+    """Genera y reserva un nombre único para la GDB de salida.
+
+    El número sale de una sola lectura de la carpeta, en lugar de probar
+    CartoBase_1, CartoBase_2, ... uno por uno, lo que en una unidad de red
+    cuesta una consulta por cada recorte anterior. El nombre se aparta
+    creando de forma exclusiva su archivo de reserva, de modo que dos
+    recortes que empiezan a la vez en la misma carpeta nunca eligen el
+    mismo nombre. La reserva se libera con liberar_nombre_gdb al terminar;
+    si el proceso se interrumpe, queda un hueco en la numeración.
 
     Args:
         base_folder: Carpeta base para la GDB.
@@ -13,23 +37,25 @@ def generar_nombre_gdb_unico(base_folder: Path, prefijo: str) -> str:
     Returns:
         Ruta completa de la GDB única.
     """
-    contador = 1
+    base_folder = Path(base_folder)
+    contador = ultimo_numero_gdb(base_folder, prefijo) + 1
     while True:
-        nombre = f"{prefijo}_{contador}.gdb"
-        ruta = base_folder / nombre
-        if not arcpy.Exists(str(ruta)):
+        ruta = base_folder / f"{prefijo}_{contador}.gdb"
+        reserva = f"{ruta}{SUFIJO_RESERVA}"
+        try:
+            os.close(os.open(reserva, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            contador += 1  # Otro recorte lo reservó después de leer la carpeta
+            continue
+        if not ruta.exists():
             return str(ruta)
+        # Otro recorte terminó con este nombre y liberó su reserva después de leer la carpeta
+        os.remove(reserva)
         contador += 1
 
-def eliminar_archivos_temp(gdb_path: str) -> None:
-    """Elimina archivos temporales de la GDB.
-
-    Args:
-        gdb_path: Ruta de la GDB.
-    """
-    templates = ["GDB_EditingTemplates", "GDB_EditingTemplateRelationships"]
-    for template in templates:
-        ruta = f"{gdb_path}/{template}"
-        if arcpy.Exists(ruta):
-            arcpy.Delete_management(ruta)
-            logging.info(f"Archivo temporal eliminado: {ruta}")
\ No newline at end of file
+def liberar_nombre_gdb(ruta_gdb: str) -> None:
+    """Elimina la reserva de una GDB creada con generar_nombre_gdb_unico."""
+    try:
+        os.remove(f"{ruta_gdb}{SUFIJO_RESERVA}")
+    except FileNotFoundError:
+        pass
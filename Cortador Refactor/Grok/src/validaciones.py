@@ -1,22 +1,23 @@
-import arcpy
 import logging
 from pathlib import Path
 from typing import Tuple
+from motor_base import MotorGeoprocesamiento
 
-def validar_entradas(gdb_entrada: str, clip_features: str) -> Tuple[bool, str]:
+def validar_entradas(gdb_entrada: str, clip_features: str, motor: MotorGeoprocesamiento) -> Tuple[bool, str]:
     """Valida las entradas del usuario.
 
     Args:
         gdb_entrada: Ruta de la GDB de entrada.
         clip_features: Ruta del shapefile de recorte.
+        motor: Motor de geoprocesamiento con el que se comprueban las rutas.
 
     Returns:
         Tuple con (éxito, mensaje de error si aplica).
     """
     if not gdb_entrada or not clip_features:
         return False, "Las rutas no pueden estar vacías."
-    if not arcpy.Exists(gdb_entrada):
+    if not motor.existe(gdb_entrada):
         return False, f"La GDB de entrada no existe: {gdb_entrada}"
-    if not arcpy.Exists(clip_features):
+    if not motor.existe(clip_features):
         return False, f"El shapefile de recorte no existe: {clip_features}"
     return True, ""
\ No newline at end of file
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos de src/ se importan entre sí por nombre, igual que al ejecutar main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
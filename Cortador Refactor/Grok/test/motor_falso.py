@@ -0,0 +1,210 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from area_recorte import AreaRecorte
+from catalogo import DATASET, TABLA, Catalogo, ElementoCatalogo
+from extensiones import Extension
+from motor_base import RECORTADA, SIN_INTERSECCION, VACIA, Capa, Conteo, Lote, MotorGeoprocesamiento
+
+class GdbFalsa:
+    """GDB en memoria: cada entidad es un diccionario con coordenadas x, y y sus atributos."""
+
+    def __init__(self, datasets: List[str] = None):
+        self.datasets = list(datasets or [])
+        self.capas: Dict[Tuple[str, str], List[dict]] = {}
+        self.tablas: Dict[str, List[dict]] = {}
+        self.archivos: Dict[str, str] = {}  # Archivo .gdbtable de cada capa o tabla
+
+class AreaRecorteFalsa(AreaRecorte):
+    """Área de recorte formada por rectángulos; la unión de partes es su lista."""
+
+    def _unir(self, partes: Sequence) -> List[Extension]:
+        return list(partes)
+
+    def _contiene(self, geometria: List[Extension], extension: Extension) -> bool:
+        return any(parte.contiene(extension) for parte in geometria)
+
+class MotorFalso(MotorGeoprocesamiento):
+    """Motor en memoria para probar el recorte sin arcpy ni GDAL.
+
+    Las entidades son puntos y cada área de recorte es uno o varios rectángulos.
+    Para dividir un shapefile por campo, su área es un diccionario valor -> rectángulos.
+    """
+
+    nombre = "falso"
+    admite_tuberia = True
+
+    def __init__(self, gdbs: Dict[str, GdbFalsa] = None, areas: Dict[str, Union[Extension, List[Extension]]] = None):
+        self.gdbs = gdbs or {}
+        self.areas = areas or {}
+        self.operaciones: List[Tuple[str, str]] = []
+        self.areas_preparadas = 0
+        self.catalogos_leidos = 0
+        self.elementos_descritos: List[str] = []
+
+    def _entidades(self, capa: Capa) -> List[dict]:
+        return self.gdbs[capa.gdb].capas[(capa.dataset, capa.nombre)]
+
+    def _dentro(self, entidad: dict, area: AreaRecorte) -> bool:
+        punto = Extension(entidad["x"], entidad["y"], entidad["x"], entidad["y"])
+        return any(area.partes[i].contiene(punto) for i in area.indice.consultar(punto))
+
+    def existe(self, ruta: str) -> bool:
+        return ruta in self.gdbs or ruta in self.areas
+
+    def crear_gdb(self, carpeta: str, nombre: str) -> str:
+        ruta = f"{carpeta}/{nombre}"
+        self.gdbs[ruta] = GdbFalsa()
+        return ruta
+
+    def obtener_datasets(self, gdb: str) -> List[str]:
+        return list(self.gdbs[gdb].datasets)
+
+    def listar_capas(self, gdb: str, dataset: str = "") -> List[str]:
+        return [nombre for fds, nombre in self.gdbs[gdb].capas if fds == dataset]
+
+    def listar_tablas(self, gdb: str) -> List[str]:
+        return list(self.gdbs[gdb].tablas)
+
+    def catalogar(self, gdb: str) -> Catalogo:
+        self.catalogos_leidos += 1
+        catalogo = super().catalogar(gdb)
+        datos = self.gdbs[gdb]
+        for elemento in catalogo.elementos.values():
+            # Los campos de cada capa o tabla son los de su primera fila, sin las coordenadas;
+            # las vacías quedan sin describir, como en el catálogo base
+            filas = (datos.tablas[elemento.nombre] if elemento.tipo == TABLA else
+                     datos.capas.get((elemento.dataset, elemento.nombre)))
+            if filas:
+                campos = tuple(campo for campo in filas[0] if campo not in ("x", "y"))
+                catalogo.elementos[elemento.nombre] = elemento._replace(campos=campos, registros=len(filas))
+        return catalogo
+
+    def describir(self, gdb: str, elementos: List[ElementoCatalogo]) -> List[ElementoCatalogo]:
+        self.elementos_descritos.extend(e.nombre for e in elementos)
+        datos = self.gdbs[gdb]
+        return [e if e.tipo == DATASET else e._replace(registros=len(
+                    datos.tablas[e.nombre] if e.tipo == TABLA else datos.capas[(e.dataset, e.nombre)]))
+                for e in elementos]
+
+    def archivos_tablas(self, gdb: str) -> Dict[str, str]:
+        return dict(self.gdbs[gdb].archivos)
+
+    def esta_vacia(self, capa: Capa) -> bool:
+        gdb = self.gdbs[capa.gdb]
+        if capa.nombre in gdb.tablas:
+            return not gdb.tablas[capa.nombre]
+        return not gdb.capas.get((capa.dataset, capa.nombre))
+
+    def firma(self, capa: Capa) -> dict:
+        entidades = self._entidades(capa)
+        return {"registros": len(entidades), "entidades": [sorted(e.items()) for e in entidades]}
+
+    def preparar_area(self, clip_features: str) -> AreaRecorteFalsa:
+        self.areas_preparadas += 1
+        return _crear_area(clip_features, self.areas[clip_features])
+
+    def preparar_areas_por_campo(self, clip_features: str, campo: str) -> Dict[str, AreaRecorteFalsa]:
+        self.areas_preparadas += 1
+        return {valor: _crear_area(f"{clip_features}[{campo}={valor}]", partes)
+                for valor, partes in self.areas[clip_features].items()}
+
+    def tiene_interseccion(self, capa: Capa, area: AreaRecorte) -> bool:
+        self.operaciones.append(("interseccion", capa.ruta))
+        return any(self._dentro(e, area) for e in self._entidades(capa))
+
+    def esta_contenida(self, capa: Capa, area: AreaRecorte) -> bool:
+        entidades = self._entidades(capa)
+        return bool(entidades) and all(self._dentro(e, area) for e in entidades)
+
+    def crear_dataset(self, origen: Capa, gdb_salida: str) -> None:
+        self.operaciones.append(("crear_dataset", origen.dataset))
+        self.gdbs[gdb_salida].datasets.append(origen.dataset)
+
+    def recortar_capa(self, capa: Capa, area: AreaRecorte, destino: Capa) -> str:
+        self.operaciones.append(("recortar", capa.ruta))
+        recortadas = [dict(e) for e in self._entidades(capa) if self._dentro(e, area)]
+        filas = len(self._entidades(capa))
+        self.ultimo_conteo = Conteo(filas, len(recortadas), filas, len(recortadas))
+        if not recortadas:
+            return VACIA
+        self.gdbs[destino.gdb].capas[(destino.dataset, destino.nombre)] = recortadas
+        return RECORTADA
+
+    def recortar_capa_multiple(self, capa: Capa, areas: Dict[str, AreaRecorte],
+                               destinos: Dict[str, Capa]) -> Dict[str, str]:
+        self.operaciones.append(("recortar_multiple", capa.ruta))
+        entidades = self._entidades(capa)
+        estados = {}
+        for nombre, area in areas.items():
+            recortadas = [dict(e) for e in entidades if self._dentro(e, area)]
+            if not recortadas:
+                estados[nombre] = SIN_INTERSECCION
+                continue
+            destino = destinos[nombre]
+            gdb = self.gdbs[destino.gdb]
+            if destino.dataset and destino.dataset not in gdb.datasets:
+                gdb.datasets.append(destino.dataset)
+            gdb.capas[(destino.dataset, destino.nombre)] = recortadas
+            estados[nombre] = RECORTADA
+        return estados
+
+    def leer_capa(self, capa: Capa, area: AreaRecorte) -> Optional[Lote]:
+        self.operaciones.append(("leer", capa.ruta))
+        entidades = self._entidades(capa)
+        extension = Extension.envolvente(Extension(e["x"], e["y"], e["x"], e["y"]) for e in entidades)
+        if area.geometria_para(extension) is None:
+            return None
+        return Lote(None, entidades, None, area, Conteo(len(entidades), 0, len(entidades), 0))
+
+    def recortar_lote(self, lote: Lote) -> Optional[Lote]:
+        recortadas = [dict(e) for e in lote.geometrias if self._dentro(e, lote.area)]
+        if not recortadas:
+            return None
+        return lote._replace(geometrias=recortadas, conteo=lote.conteo._replace(
+            filas_salida=len(recortadas), vertices_salida=len(recortadas)))
+
+    def escribir_lote(self, lote: Lote, destino: Capa) -> str:
+        self.operaciones.append(("escribir", destino.ruta))
+        self.gdbs[destino.gdb].capas[(destino.dataset, destino.nombre)] = lote.geometrias
+        return RECORTADA
+
+    def copiar_capa(self, capa: Capa, destino: Capa) -> None:
+        self.operaciones.append(("copiar", capa.ruta))
+        self.gdbs[destino.gdb].capas[(destino.dataset, destino.nombre)] = [dict(e) for e in self._entidades(capa)]
+        filas = len(self._entidades(capa))
+        self.ultimo_conteo = Conteo(filas, filas, filas, filas)
+
+    def leer_valores(self, capa: Capa, campo: str) -> Set:
+        filas = self.gdbs[capa.gdb].tablas.get(capa.nombre) if not capa.dataset else None
+        if filas is None:
+            filas = self._entidades(capa)
+        return {fila[campo] for fila in filas if fila.get(campo) is not None}
+
+    def copiar_tabla_filtrada(self, tabla: Capa, destino: Capa, campo: str, valores: Iterable) -> int:
+        self.operaciones.append(("copiar_tabla_filtrada", tabla.ruta))
+        valores = set(valores)
+        filas = [dict(f) for f in self.gdbs[tabla.gdb].tablas[tabla.nombre] if f.get(campo) in valores]
+        if filas:
+            self.gdbs[destino.gdb].tablas[destino.nombre] = filas
+        return len(filas)
+
+    def crear_gdb_memoria(self) -> str:
+        return self.crear_gdb("memoria", "preparacion")
+
+    def vaciar_gdb_memoria(self, gdb: str) -> None:
+        self.operaciones.append(("vaciar_memoria", gdb))
+        self.gdbs[gdb] = GdbFalsa()
+
+    def optimizar_indice(self, capa: Capa) -> None:
+        self.operaciones.append(("optimizar_indice", capa.ruta))
+
+    def compactar_gdb(self, gdb: str) -> None:
+        self.operaciones.append(("compactar", gdb))
+
+    def copiar_tabla(self, tabla: Capa, destino: Capa) -> None:
+        self.operaciones.append(("copiar_tabla", tabla.ruta))
+        self.gdbs[destino.gdb].tablas[destino.nombre] = [dict(f) for f in self.gdbs[tabla.gdb].tablas[tabla.nombre]]
+
+def _crear_area(ruta: str, partes: Union[Extension, List[Extension]]) -> AreaRecorteFalsa:
+    if isinstance(partes, Extension):
+        partes = [partes]
+    return AreaRecorteFalsa(ruta, partes, partes)
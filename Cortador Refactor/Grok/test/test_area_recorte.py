@@ -0,0 +1,68 @@
+import unittest
+from area_recorte import CONTENIDA, DISJUNTA, SUPERPUESTA, IndiceEspacial
+from extensiones import Extension
+from motor_falso import AreaRecorteFalsa
+
+class ContadorArea(AreaRecorteFalsa):
+    """Cuenta las uniones y pruebas de contención que hace el área."""
+
+    def __init__(self, *args):
+        self.uniones = 0
+        self.contenciones = 0
+        super().__init__(*args)
+
+    def _unir(self, partes):
+        self.uniones += 1
+        return super()._unir(partes)
+
+    def _contiene(self, geometria, extension):
+        self.contenciones += 1
+        return super()._contiene(geometria, extension)
+
+def cuadricula(n: int, lado: float = 10, separacion: float = 20):
+    return [Extension(i * separacion, j * separacion, i * separacion + lado, j * separacion + lado)
+            for i in range(n) for j in range(n)]
+
+class TestIndiceEspacial(unittest.TestCase):
+    def test_consulta_igual_a_busqueda_lineal(self):
+        extensiones = cuadricula(12)
+        indice = IndiceEspacial(extensiones, capacidad=4)
+        for consulta in [Extension(0, 0, 5, 5), Extension(15, 15, 45, 45),
+                         Extension(-100, -100, 1000, 1000), Extension(11, 11, 19, 19)]:
+            esperado = [i for i, ext in enumerate(extensiones) if ext.intersecta(consulta)]
+            self.assertEqual(indice.consultar(consulta), esperado)
+
+    def test_ignora_extensiones_vacias(self):
+        nan = float("nan")
+        indice = IndiceEspacial([Extension(nan, nan, nan, nan), Extension(0, 0, 1, 1)])
+        self.assertEqual(indice.consultar(Extension(-1, -1, 2, 2)), [1])
+        self.assertEqual(indice.consultar(Extension(nan, nan, nan, nan)), [])
+
+class TestAreaRecorte(unittest.TestCase):
+    def setUp(self):
+        partes = [Extension(0, 0, 10, 10), Extension(100, 100, 110, 110)]
+        self.area = ContadorArea("aoi.shp", partes, partes)
+
+    def test_relacion(self):
+        self.assertEqual(self.area.relacion(Extension(2, 2, 3, 3)), CONTENIDA)
+        self.assertEqual(self.area.relacion(Extension(5, 5, 50, 50)), SUPERPUESTA)
+        self.assertEqual(self.area.relacion(Extension(50, 50, 60, 60)), DISJUNTA)
+
+    def test_relacion_se_guarda_por_extension(self):
+        for _ in range(3):
+            self.area.relacion(Extension(2, 2, 3, 3))
+        self.assertEqual(self.area.contenciones, 1)
+
+    def test_geometria_para_usa_solo_partes_cercanas(self):
+        self.assertEqual(self.area.geometria_para(Extension(1, 1, 2, 2)), [Extension(0, 0, 10, 10)])
+        self.assertIs(self.area.geometria_para(Extension(0, 0, 200, 200)), self.area.geometria)
+        self.assertIsNone(self.area.geometria_para(Extension(50, 50, 60, 60)))
+
+    def test_uniones_de_partes_se_reutilizan(self):
+        uniones = self.area.uniones
+        for _ in range(3):
+            self.area.geometria_para(Extension(101, 101, 102, 102))
+        self.assertEqual(self.area.uniones, uniones + 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from cache_catalogo import CacheCatalogo
+from motor_falso import GdbFalsa, MotorFalso
+
+class TestCacheCatalogo(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        carpeta = Path(self.temporal.name)
+        self.gdb = carpeta / "entrada.gdb"
+        self.gdb.mkdir()
+        entrada = GdbFalsa(datasets=["Hidrografia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}]
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": 1}]
+        entrada.archivos = {"GDB_SystemCatalog": "a00000001.gdbtable", "GDB_Items": "a00000004.gdbtable",
+                            "Vias": "a00000009.gdbtable", "Rios": "a0000000a.gdbtable",
+                            "PredioTB": "a0000000b.gdbtable"}
+        for archivo in entrada.archivos.values():
+            (self.gdb / archivo).write_bytes(b"datos")
+        self.motor = MotorFalso({str(self.gdb): entrada})
+        self.cache = CacheCatalogo(str(carpeta / "cache"))
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def _modificar(self, archivo: str) -> None:
+        ruta = self.gdb / archivo
+        ruta.write_bytes(b"datos modificados")
+        os.utime(ruta, ns=(1, 1))
+
+    def test_sin_cambios_no_abre_la_gdb(self):
+        primero = self.cache.obtener(str(self.gdb), self.motor)
+        segundo = self.cache.obtener(str(self.gdb), self.motor)
+        self.assertEqual(self.motor.catalogos_leidos, 1)
+        self.assertEqual(segundo.como_dict(), primero.como_dict())
+        self.assertEqual(segundo.capas("Hidrografia"), ["Rios"])
+
+    def test_solo_se_describen_las_tablas_modificadas(self):
+        self.cache.obtener(str(self.gdb), self.motor)
+        self.motor.gdbs[str(self.gdb)].capas[("", "Vias")].append({"x": 6, "y": 6})
+        self._modificar("a00000009.gdbtable")
+        # Los archivos de índice de una tabla también cuentan como cambios de esa tabla
+        (self.gdb / "a0000000a.spx").write_bytes(b"indice")
+
+        catalogo = CacheCatalogo(self.cache.carpeta).obtener(str(self.gdb), self.motor)
+        self.assertEqual(self.motor.catalogos_leidos, 1)
+        self.assertEqual(sorted(self.motor.elementos_descritos), ["Rios", "Vias"])
+        self.assertEqual(catalogo.elemento("Vias").registros, 2)
+
+    def test_cambio_de_estructura_recorre_toda_la_gdb(self):
+        self.cache.obtener(str(self.gdb), self.motor)
+        self._modificar("a00000004.gdbtable")
+        self.cache.obtener(str(self.gdb), self.motor)
+        self.assertEqual(self.motor.catalogos_leidos, 2)
+        self.assertEqual(self.motor.elementos_descritos, [])
+
+    def test_los_archivos_lock_no_invalidan_la_cache(self):
+        self.cache.obtener(str(self.gdb), self.motor)
+        (self.gdb / "a00000009.1234.sr.lock").write_bytes(b"")
+        self.cache.obtener(str(self.gdb), self.motor)
+        self.assertEqual(self.motor.catalogos_leidos, 1)
+
+    def test_desaloja_las_entradas_mas_antiguas(self):
+        self.cache.obtener(str(self.gdb), self.motor)
+        antigua = next(self.cache.carpeta.glob("*.json"))
+        os.utime(antigua, ns=(1, 1))
+        otra = Path(self.temporal.name) / "otra.gdb"
+        otra.mkdir()
+        self.motor.gdbs[str(otra)] = GdbFalsa()
+
+        CacheCatalogo(self.cache.carpeta, max_bytes=1).obtener(str(otra), self.motor)
+        self.assertFalse(antigua.exists())
+        self.assertEqual(len(list(self.cache.carpeta.glob("*.json"))), 1)
+
+    def test_solo_lectura_no_escribe(self):
+        carpeta = Path(self.temporal.name) / "sin_cache"
+        catalogo = CacheCatalogo(str(carpeta), solo_lectura=True).obtener(str(self.gdb), self.motor)
+        self.assertEqual(catalogo.capas("Hidrografia"), ["Rios"])
+        self.assertFalse(carpeta.exists())
+
+        self.cache.obtener(str(self.gdb), self.motor)
+        entrada = next(self.cache.carpeta.glob("*.json"))
+        os.utime(entrada, ns=(1, 1))
+        CacheCatalogo(str(self.cache.carpeta), solo_lectura=True).obtener(str(self.gdb), self.motor)
+        self.assertEqual(self.motor.catalogos_leidos, 2)
+        self.assertEqual(entrada.stat().st_mtime_ns, 1)
+
+if __name__ == "__main__":
+    unittest.main()
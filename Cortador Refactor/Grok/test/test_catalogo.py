@@ -0,0 +1,48 @@
+import unittest
+from catalogo import CAPA, DATASET, TABLA, Catalogo, ElementoCatalogo
+from extensiones import Extension
+from manejo_gdb import copiar_tablas
+from motor_falso import GdbFalsa, MotorFalso
+
+class TestCatalogo(unittest.TestCase):
+    def setUp(self):
+        self.catalogo = Catalogo("entrada.gdb", [
+            ElementoCatalogo("Vias", "", CAPA, "MAGNA", Extension(0, 0, 10, 10), "Polyline", 2, ("OBJECTID", "NOMBRE")),
+            ElementoCatalogo("Hidrografia", "", DATASET, "MAGNA"),
+            ElementoCatalogo("Rios", "Hidrografia", CAPA, "MAGNA", Extension(1, 1, 5, 5), "Polyline", 7),
+            ElementoCatalogo("PredioTB", "", TABLA, registros=0),
+        ])
+
+    def test_consultas_por_tipo_y_dataset(self):
+        self.assertEqual(self.catalogo.datasets(), ["Hidrografia"])
+        self.assertEqual(self.catalogo.capas(), ["Vias"])
+        self.assertEqual(self.catalogo.capas("Hidrografia"), ["Rios"])
+        self.assertEqual(self.catalogo.tablas(), ["PredioTB"])
+        self.assertEqual(self.catalogo.elemento("Rios").registros, 7)
+        self.assertIsNone(self.catalogo.elemento("NoExiste"))
+
+    def test_como_dict_serializable(self):
+        datos = self.catalogo.como_dict()
+        self.assertEqual(datos["elementos"][0]["extension"], [0, 0, 10, 10])
+        self.assertEqual(datos["elementos"][0]["campos"], ["OBJECTID", "NOMBRE"])
+
+    def test_catalogo_base_desde_listados_del_motor(self):
+        entrada = GdbFalsa(datasets=["Hidrografia"])
+        entrada.capas[("", "Vias")] = []
+        entrada.capas[("Hidrografia", "Rios")] = []
+        entrada.tablas["PredioTB"] = []
+        catalogo = MotorFalso({"entrada.gdb": entrada}).catalogar("entrada.gdb")
+        self.assertEqual((catalogo.capas(), catalogo.datasets(), catalogo.capas("Hidrografia"), catalogo.tablas()),
+                         (["Vias"], ["Hidrografia"], ["Rios"], ["PredioTB"]))
+        self.assertIsNone(catalogo.elemento("Vias").registros)
+
+    def test_copiar_tablas_usa_registros_del_catalogo(self):
+        entrada = GdbFalsa()
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": 1}]
+        motor = MotorFalso({"entrada.gdb": entrada})
+        salida = motor.crear_gdb("salida", "CartoBase_1.gdb")
+        copiar_tablas("entrada.gdb", salida, motor, self.catalogo)
+        self.assertEqual(motor.gdbs[salida].tablas, {})
+
+if __name__ == "__main__":
+    unittest.main()
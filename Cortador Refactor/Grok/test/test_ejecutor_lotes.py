@@ -0,0 +1,99 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from ejecutor_lotes import FALLIDO, TERMINADO, cargar_trabajos, ejecutar_lote, escribir_resumen, procesos_lote
+from extensiones import Extension
+from motor_falso import GdbFalsa, MotorFalso
+
+CONFIG = """[Settings]
+log_level = WARNING
+gdb_prefix = CartoBase
+num_procesos = 4
+motor = arcpy
+metricas = true
+progreso_s =
+cache_catalogo =
+"""
+
+class TestEjecutorLotes(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.carpeta = Path(self.temporal.name)
+        self.config = self.carpeta / "config.ini"
+        self.config.write_text(CONFIG, encoding="utf-8")
+        entrada = GdbFalsa()
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def escribir_trabajos(self, datos) -> Path:
+        ruta = self.carpeta / "trabajos.json"
+        ruta.write_text(json.dumps(datos), encoding="utf-8")
+        return ruta
+
+    def test_cargar_trabajos_con_opciones_comunes(self):
+        ruta = self.escribir_trabajos({
+            "opciones": {"metricas": False, "gdb_prefix": "Lote"},
+            "trabajos": [
+                {"gdb_entrada": "C:/datos/entrada.gdb", "area": "aoi.shp"},
+                {"nombre": "norte", "gdb_entrada": "entrada.gdb", "area": "norte.shp",
+                 "carpeta_salida": "salida", "opciones": {"gdb_prefix": "Norte"}},
+            ],
+        })
+        primero, segundo = cargar_trabajos(ruta)
+
+        self.assertEqual(primero.nombre, "trabajo_1")
+        self.assertEqual(Path(primero.carpeta_salida), Path("C:/datos"))
+        self.assertEqual(primero.opciones, {"metricas": False, "gdb_prefix": "Lote"})
+        self.assertEqual(segundo.nombre, "norte")
+        self.assertEqual(segundo.carpeta_salida, "salida")
+        self.assertEqual(segundo.opciones, {"metricas": False, "gdb_prefix": "Norte"})
+
+    def test_cargar_trabajos_incompletos(self):
+        with self.assertRaises(ValueError):
+            cargar_trabajos(self.escribir_trabajos([{"gdb_entrada": "entrada.gdb"}]))
+        with self.assertRaises(ValueError):
+            cargar_trabajos(self.escribir_trabajos({"opciones": {}}))
+
+    def test_procesos_lote_limitados_por_memoria(self):
+        with patch("ejecutor_lotes.os.cpu_count", return_value=8), \
+                patch("ejecutor_lotes.memoria_disponible", return_value=3 * 1024 * 1024 * 1024):
+            self.assertEqual(procesos_lote(10, memoria_por_trabajo_mb=1024), 3)
+            self.assertEqual(procesos_lote(2, memoria_por_trabajo_mb=1024), 2)
+            self.assertEqual(procesos_lote(10, memoria_por_trabajo_mb=8192), 1)
+        with patch("ejecutor_lotes.os.cpu_count", return_value=4), \
+                patch("ejecutor_lotes.memoria_disponible", return_value=None):
+            self.assertEqual(procesos_lote(10), 4)
+
+    def test_un_trabajo_fallido_no_detiene_el_lote(self):
+        ruta = self.escribir_trabajos([
+            {"nombre": "bueno", "gdb_entrada": "entrada.gdb", "area": "aoi.shp",
+             "carpeta_salida": str(self.carpeta)},
+            {"nombre": "sin_area", "gdb_entrada": "entrada.gdb", "area": "no_existe.shp",
+             "carpeta_salida": str(self.carpeta)},
+        ])
+        with patch("ejecutor_lotes.preparar_motor", return_value=self.motor):
+            resultados = ejecutar_lote(cargar_trabajos(ruta), procesos=1, ruta_config=str(self.config))
+
+        bueno, fallido = resultados
+        self.assertEqual(bueno["estado"], TERMINADO)
+        self.assertEqual(Path(bueno["gdb_salida"]).name, "CartoBase_1.gdb")
+        self.assertEqual(self.motor.gdbs[bueno["gdb_salida"]].capas[("", "Vias")], [{"x": 5, "y": 5}])
+        self.assertTrue((self.carpeta / "CartoBase_1.metricas.jsonl").exists())
+        self.assertFalse((self.carpeta / "CartoBase_1.gdb.reserva").exists())
+        self.assertEqual(fallido["estado"], FALLIDO)
+        self.assertIn("no_existe.shp", fallido["error"])
+        # Cada trabajo recorta en un solo proceso aunque config.ini indique más
+        self.assertIn(("leer", "entrada.gdb/Vias"), self.motor.operaciones)
+
+        resumen = escribir_resumen(resultados, self.carpeta / "trabajos.resumen.json", 1.5)
+        guardado = json.loads((self.carpeta / "trabajos.resumen.json").read_text(encoding="utf-8"))
+        self.assertEqual((resumen["terminados"], resumen["fallidos"]), (1, 1))
+        self.assertEqual(guardado["trabajos"][0]["nombre"], "bueno")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from extensiones import Extension
+
+class TestExtension(unittest.TestCase):
+    def test_intersecta_superpuestas(self):
+        a = Extension(0, 0, 10, 10)
+        b = Extension(5, 5, 15, 15)
+        self.assertTrue(a.intersecta(b))
+        self.assertTrue(b.intersecta(a))
+
+    def test_intersecta_borde_compartido(self):
+        self.assertTrue(Extension(0, 0, 10, 10).intersecta(Extension(10, 0, 20, 10)))
+
+    def test_disjuntas(self):
+        a = Extension(0, 0, 10, 10)
+        self.assertFalse(a.intersecta(Extension(20, 0, 30, 10)))
+        self.assertFalse(a.intersecta(Extension(0, 11, 10, 20)))
+
+    def test_extension_vacia_no_intersecta(self):
+        vacia = Extension(float("nan"), float("nan"), float("nan"), float("nan"))
+        self.assertTrue(vacia.es_vacia())
+        self.assertFalse(vacia.intersecta(Extension(0, 0, 10, 10)))
+        self.assertFalse(Extension(0, 0, 10, 10).intersecta(vacia))
+
+    def test_contiene(self):
+        aoi = Extension(0, 0, 100, 100)
+        self.assertTrue(aoi.contiene(Extension(10, 10, 20, 20)))
+        self.assertTrue(aoi.contiene(aoi))
+        self.assertFalse(aoi.contiene(Extension(90, 90, 110, 110)))
+        self.assertFalse(aoi.contiene(Extension(float("nan"), 0, 1, 1)))
+
+    def test_interseccion_y_superficie(self):
+        comun = Extension(0, 0, 10, 10).interseccion(Extension(5, 5, 20, 20))
+        self.assertEqual(comun, Extension(5, 5, 10, 10))
+        self.assertEqual(comun.superficie(), 25)
+        self.assertEqual(Extension(0, 0, 1, 1).interseccion(Extension(5, 5, 6, 6)).superficie(), 0)
+
+    def test_expandir(self):
+        self.assertEqual(Extension(0, 0, 10, 20).expandir(0.1), Extension(-1, -2, 11, 22))
+
+if __name__ == "__main__":
+    unittest.main()
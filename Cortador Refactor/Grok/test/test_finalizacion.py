@@ -0,0 +1,37 @@
+import unittest
+from extensiones import Extension
+from finalizacion import finalizar_gdb, ruta_comprimida
+from manejo_gdb import recortar_capas
+from motor_falso import GdbFalsa, MotorFalso
+
+class TestFinalizacion(unittest.TestCase):
+    def setUp(self):
+        entrada = GdbFalsa(datasets=["Hidrografia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        self.salida = self.motor.crear_gdb("salida", "CartoBase_1.gdb")
+        recortar_capas("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        self.motor.operaciones.clear()
+
+    def test_reindexa_las_capas_de_salida_y_compacta(self):
+        resultado = finalizar_gdb(self.salida, self.motor, num_procesos=4, comprimida=True)
+
+        self.assertEqual(self.motor.operaciones, [
+            ("optimizar_indice", f"{self.salida}/Vias"),
+            ("optimizar_indice", f"{self.salida}/Hidrografia/Rios"),
+            ("compactar", self.salida),
+        ])
+        # El motor falso no admite la copia comprimida
+        self.assertIsNone(resultado.gdb_comprimida)
+
+    def test_sin_salida_no_hace_nada(self):
+        self.assertIsNone(finalizar_gdb("salida/CartoBase_9.gdb", self.motor))
+        self.assertEqual(self.motor.operaciones, [])
+
+    def test_ruta_comprimida(self):
+        self.assertEqual(ruta_comprimida("/datos/CartoBase_1.gdb"), "/datos/CartoBase_1_comprimida.gdb")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from extensiones import Extension
+from manejo_gdb import leer_catalogo, listar_capas, recortar_capas
+from manifiesto import Manifiesto
+from motor_base import Capa, crear_motor
+from motor_falso import GdbFalsa, MotorFalso
+
+class TestRecortarCapas(unittest.TestCase):
+    def setUp(self):
+        entrada = GdbFalsa(datasets=["Hidrografia", "Geologia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Muestreo")] = [{"x": 2, "y": 2}, {"x": 3, "y": 3}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}, {"x": 90, "y": 90}]
+        entrada.capas[("Geologia", "Fallas")] = [{"x": 300, "y": 300}]
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": 1}]
+        entrada.tablas["VaciaTB"] = []
+        entrada.tablas["Otra"] = [{"ID": 1}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        self.salida = self.motor.crear_gdb("salida", "CartoBase_1.gdb")
+
+    def test_listar_capas_en_orden_serial(self):
+        capas = listar_capas("entrada.gdb", self.motor)
+        self.assertEqual([(c.dataset, c.nombre) for c in capas],
+                         [("", "Vias"), ("", "Muestreo"), ("", "Lejana"),
+                          ("Hidrografia", "Rios"), ("Geologia", "Fallas")])
+
+    def test_recortar_capas(self):
+        recortar_capas("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        salida = self.motor.gdbs[self.salida]
+
+        self.assertEqual(salida.capas[("", "Vias")], [{"x": 5, "y": 5}])
+        self.assertEqual(len(salida.capas[("", "Muestreo")]), 2)
+        self.assertEqual(salida.capas[("Hidrografia", "Rios")], [{"x": 1, "y": 9}])
+        self.assertNotIn(("", "Lejana"), salida.capas)
+        self.assertEqual(salida.datasets, ["Hidrografia"])
+        self.assertEqual(list(salida.tablas), ["PredioTB"])
+
+    def test_capa_contenida_se_copia_sin_recortar(self):
+        recortar_capas("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        self.assertIn(("copiar", Capa("entrada.gdb", "", "Muestreo").ruta), self.motor.operaciones)
+        self.assertNotIn(("recortar", Capa("entrada.gdb", "", "Muestreo").ruta), self.motor.operaciones)
+
+    def test_recorte_relacional_de_tablas(self):
+        entrada = self.motor.gdbs["entrada.gdb"]
+        entrada.capas[("", "Predios")] = [{"x": 1, "y": 1, "ID_PREDIO": 7}, {"x": 80, "y": 80, "ID_PREDIO": 8}]
+        entrada.capas[("Hidrografia", "Rios")][0]["id_predio"] = 9
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": v} for v in (7, 8, 9, 10)]
+        entrada.tablas["ObraTB"] = [{"ID_OBRA": 1}]
+        self.motor.campos_clave_tablas = ("ID_PREDIO",)
+
+        recortar_capas("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        salida = self.motor.gdbs[self.salida]
+        self.assertEqual(salida.tablas["PredioTB"], [{"ID_PREDIO": 7}, {"ID_PREDIO": 9}])
+        # Las tablas sin campo clave se copian completas
+        self.assertEqual(salida.tablas["ObraTB"], [{"ID_OBRA": 1}])
+
+    def test_gdb_se_cataloga_una_vez(self):
+        recortar_capas("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        self.assertEqual(self.motor.catalogos_leidos, 1)
+
+    def test_area_se_prepara_una_vez(self):
+        recortar_capas("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        self.assertEqual(self.motor.areas_preparadas, 1)
+
+    def test_reanudar_omite_capas_terminadas(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            clip = Path(carpeta) / "aoi.shp"
+            clip.write_bytes(b"poligono")
+            self.motor.areas[str(clip)] = self.motor.areas["aoi.shp"]
+            gdb_salida = str(Path(carpeta) / "CartoBase_1.gdb")
+            self.motor.gdbs[gdb_salida] = self.motor.gdbs.pop(self.salida)
+
+            recortar_capas("entrada.gdb", str(clip), gdb_salida, self.motor,
+                           Manifiesto.crear(gdb_salida, "entrada.gdb", str(clip)))
+            self.assertEqual(len(Manifiesto.cargar(gdb_salida).capas), 5)
+
+            # Solo cambia una capa: al reanudar es la única que se vuelve a procesar
+            self.motor.gdbs["entrada.gdb"].capas[("", "Vias")].append({"x": 6, "y": 6})
+            self.motor.operaciones.clear()
+            recortar_capas("entrada.gdb", str(clip), gdb_salida, self.motor, Manifiesto.cargar(gdb_salida))
+
+            procesadas = {ruta for operacion, ruta in self.motor.operaciones if operacion != "copiar_tabla"}
+            self.assertEqual(procesadas, {Capa("entrada.gdb", "", "Vias").ruta})
+            self.assertEqual(len(self.motor.gdbs[gdb_salida].capas[("", "Vias")]), 2)
+            self.assertEqual(self.motor.gdbs[gdb_salida].datasets, ["Hidrografia"])
+
+    def test_recorte_incremental_reutiliza_capas_sin_cambios(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            clip = str(Path(carpeta) / "aoi.shp")
+            Path(clip).write_bytes(b"poligono")
+            self.motor.areas[clip] = self.motor.areas["aoi.shp"]
+            gdb_anterior = self.motor.crear_gdb(carpeta, "CartoBase_1.gdb")
+            recortar_capas("entrada.gdb", clip, gdb_anterior, self.motor,
+                           Manifiesto.crear(gdb_anterior, "entrada.gdb", clip))
+
+            self.motor.gdbs["entrada.gdb"].capas[("Hidrografia", "Rios")].append({"x": 2, "y": 2})
+            self.motor.operaciones.clear()
+            gdb_nueva = self.motor.crear_gdb(carpeta, "CartoBase_2.gdb")
+            recortar_capas("entrada.gdb", clip, gdb_nueva, self.motor,
+                           Manifiesto.crear(gdb_nueva, "entrada.gdb", clip), Manifiesto.cargar(gdb_anterior))
+
+            rios = Capa("entrada.gdb", "Hidrografia", "Rios")
+            self.assertIn(("recortar", rios.ruta), self.motor.operaciones)
+            # Las demás capas se copian desde la salida anterior, sin predicados ni recorte
+            self.assertIn(("copiar", Capa("entrada.gdb", "", "Vias").en(gdb_anterior).ruta), self.motor.operaciones)
+            self.assertEqual([op for op in self.motor.operaciones if op[0] in ("interseccion", "recortar")],
+                             [("interseccion", rios.ruta), ("recortar", rios.ruta)])
+            salida = self.motor.gdbs[gdb_nueva]
+            self.assertEqual(salida.capas[("", "Vias")], [{"x": 5, "y": 5}])
+            self.assertEqual(salida.capas[("Hidrografia", "Rios")], [{"x": 1, "y": 9}, {"x": 2, "y": 2}])
+            self.assertNotIn(("", "Lejana"), salida.capas)
+            self.assertEqual(len(Manifiesto.cargar(gdb_nueva).capas), 5)
+
+    def test_capa_con_error_queda_fuera_del_manifiesto(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            clip = str(Path(carpeta) / "aoi.shp")
+            Path(clip).write_bytes(b"poligono")
+            self.motor.areas[clip] = self.motor.areas["aoi.shp"]
+            gdb_salida = self.motor.crear_gdb(carpeta, "CartoBase_1.gdb")
+            with patch.object(self.motor, "recortar_capa", side_effect=RuntimeError("geometría inválida")):
+                recortar_capas("entrada.gdb", clip, gdb_salida, self.motor,
+                               Manifiesto.crear(gdb_salida, "entrada.gdb", clip))
+
+            # Vias y Rios se recortan y fallan; el resto sigue y queda registrado
+            self.assertEqual(len(Manifiesto.cargar(gdb_salida).capas), 3)
+            self.assertEqual(len(self.motor.gdbs[gdb_salida].capas[("", "Muestreo")]), 2)
+
+    def test_catalogo_en_memoria_hasta_que_cambia_la_gdb(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            gdb = str(Path(carpeta) / "maestra.gdb")
+            Path(gdb).mkdir()
+            (Path(gdb) / "a00000001.gdbtable").write_bytes(b"tabla")
+            self.motor.gdbs[gdb] = self.motor.gdbs["entrada.gdb"]
+            self.motor.catalogos_en_memoria = {}
+
+            primero = leer_catalogo(gdb, self.motor)
+            self.assertIs(leer_catalogo(gdb, self.motor), primero)
+            self.assertEqual(self.motor.catalogos_leidos, 1)
+            (Path(gdb) / "a00000002.gdbtable").write_bytes(b"capa nueva")
+            self.assertIsNot(leer_catalogo(gdb, self.motor), primero)
+            self.assertEqual(self.motor.catalogos_leidos, 2)
+            # Las GDB que no están en disco se catalogan siempre
+            leer_catalogo("entrada.gdb", self.motor)
+            self.assertNotIn("entrada.gdb", self.motor.catalogos_en_memoria)
+
+    def test_motor_desconocido(self):
+        with self.assertRaises(ValueError):
+            crear_motor("qgis")
+
+if __name__ == "__main__":
+    unittest.main()
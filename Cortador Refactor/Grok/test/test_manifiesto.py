@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from manifiesto import Manifiesto, ruta_manifiesto
+from motor_base import RECORTADA, Capa
+
+class TestManifiesto(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(self.carpeta.cleanup)
+        base = Path(self.carpeta.name)
+        self.clip = base / "aoi.shp"
+        self.clip.write_bytes(b"poligono")
+        self.gdb_salida = str(base / "CartoBase_1.gdb")
+        self.capa = Capa("entrada.gdb", "Hidrografia", "Rios")
+        self.firma = {"registros": 2, "extension": [0, 0, 10, 10]}
+
+    def test_ruta_junto_a_la_gdb(self):
+        self.assertEqual(ruta_manifiesto("/datos/CartoBase_1.gdb"), Path("/datos/CartoBase_1.manifiesto.json"))
+
+    def test_registrar_y_cargar(self):
+        manifiesto = Manifiesto.crear(self.gdb_salida, "entrada.gdb", str(self.clip))
+        manifiesto.registrar(self.capa, RECORTADA, self.firma)
+
+        cargado = Manifiesto.cargar(self.gdb_salida)
+        self.assertEqual(cargado.gdb_entrada, "entrada.gdb")
+        self.assertTrue(cargado.completada(self.capa, self.firma))
+        self.assertFalse(cargado.completada(Capa("entrada.gdb", "", "Rios"), self.firma))
+
+    def test_capa_modificada_no_esta_completada(self):
+        manifiesto = Manifiesto.crear(self.gdb_salida, "entrada.gdb", str(self.clip))
+        manifiesto.registrar(self.capa, RECORTADA, self.firma)
+        self.assertFalse(manifiesto.completada(self.capa, dict(self.firma, registros=3)))
+
+    def test_area_modificada_invalida_todo(self):
+        Manifiesto.crear(self.gdb_salida, "entrada.gdb", str(self.clip)).registrar(self.capa, RECORTADA, self.firma)
+        self.clip.write_bytes(b"otro poligono")
+        self.assertFalse(Manifiesto.cargar(self.gdb_salida).completada(self.capa, self.firma))
+
+    def test_sin_manifiesto(self):
+        with self.assertRaises(FileNotFoundError):
+            Manifiesto.cargar(os.path.join(self.carpeta.name, "CartoBase_9.gdb"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from extensiones import Extension
+from manejo_gdb import recortar_capas
+from metricas import MedidorSalida, Metricas, MetricasCapa, ruta_metricas
+from motor_base import COPIADA, RECORTADA, SIN_INTERSECCION, Capa, Conteo
+from motor_falso import GdbFalsa, MotorFalso
+
+class TestMetricas(unittest.TestCase):
+    def test_ruta_junto_a_la_gdb(self):
+        self.assertEqual(ruta_metricas("/datos/CartoBase_1.gdb"), Path("/datos/CartoBase_1.metricas.jsonl"))
+
+    def test_medir_acumula_por_etapa(self):
+        medicion = MetricasCapa(Capa("entrada.gdb", "", "Vias"))
+        for _ in range(2):
+            with medicion.medir("recorte"):
+                pass
+        self.assertEqual(list(medicion.tiempos), ["recorte"])
+        self.assertAlmostEqual(medicion.total, medicion.tiempos["recorte"])
+
+    def test_medidor_solo_cuenta_las_tablas_nuevas(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            gdb = Path(carpeta)
+            (gdb / "a00000001.gdbtable").write_bytes(b"x" * 100)
+            (gdb / "gdb").write_bytes(b"x" * 50)
+            medidor = MedidorSalida(carpeta)
+
+            (gdb / "a00000002.gdbtable").write_bytes(b"x" * 10)
+            (gdb / "a00000002.gdbtablx").write_bytes(b"x" * 5)
+            self.assertEqual(medidor.medir(), 15)
+            # La tabla a00000003 es una capa vacía que se borró
+            (gdb / "a00000004.gdbtable").write_bytes(b"x" * 7)
+            (gdb / "a00000004.spx").write_bytes(b"x" * 3)
+            self.assertEqual(medidor.medir(), 10)
+            self.assertEqual(medidor.medir(), 0)
+        self.assertEqual(MedidorSalida(str(gdb / "no_existe.gdb")).medir(), 0)
+
+    def test_jsonl_con_resumen_de_capas_lentas(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta = Path(carpeta) / "CartoBase_1.metricas.jsonl"
+            metricas = Metricas(ruta)
+            for nombre, segundos in [("Rapida", 0.1), ("Lenta", 5.0), ("Media", 1.0)]:
+                medicion = MetricasCapa(Capa("entrada.gdb", "", nombre))
+                medicion.tiempos["recorte"] = segundos
+                medicion.estado = RECORTADA
+                medicion.conteo = Conteo(10, 4, 40, 16)
+                metricas.registrar(medicion)
+            resumen = metricas.cerrar()
+
+            lineas = [json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines()]
+            self.assertEqual(len(lineas), 4)
+            self.assertEqual(lineas[0]["filas_entrada"], 10)
+            self.assertEqual(lineas[-1]["resumen"], resumen)
+            self.assertEqual([c["capa"] for c in resumen["capas_lentas"]][:2],
+                             ["entrada.gdb/Lenta", "entrada.gdb/Media"])
+            self.assertEqual(resumen["filas_escritas"], 12)
+
+    def test_recortar_capas_registra_cada_capa(self):
+        entrada = GdbFalsa()
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Muestreo")] = [{"x": 2, "y": 2}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        salida = motor.crear_gdb("salida", "CartoBase_1.gdb")
+
+        metricas = Metricas()
+        recortar_capas("entrada.gdb", "aoi.shp", salida, motor, metricas=metricas)
+
+        registros = {r["capa"]: r for r in metricas.capas}
+        self.assertEqual(registros["entrada.gdb/Vias"]["estado"], RECORTADA)
+        self.assertEqual((registros["entrada.gdb/Vias"]["filas_entrada"], registros["entrada.gdb/Vias"]["filas_salida"]),
+                         (2, 1))
+        self.assertEqual(registros["entrada.gdb/Muestreo"]["estado"], COPIADA)
+        self.assertIn("copia", registros["entrada.gdb/Muestreo"]["tiempos_s"])
+        self.assertEqual(registros["entrada.gdb/Lejana"]["estado"], SIN_INTERSECCION)
+        self.assertIsNone(registros["entrada.gdb/Lejana"]["filas_salida"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import importlib
+import sys
+import types
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from motor_base import Capa
+
+class CursorFalso:
+    """Cursor de lectura sobre una lista de filas en diccionarios, con solo los campos pedidos."""
+
+    def __init__(self, filas, campos):
+        self.filas = [tuple(fila[campo] for campo in campos) for fila in filas]
+
+    def __enter__(self):
+        return iter(self.filas)
+
+    def __exit__(self, *error):
+        return False
+
+def arcpy_falso(tablas, campos, salidas):
+    """Módulo arcpy mínimo: lee de tablas y guarda en salidas las filas insertadas, por ruta."""
+    arcpy = types.ModuleType("arcpy")
+    arcpy.env = SimpleNamespace()
+    arcpy.ListFields = lambda ruta: campos[ruta]
+    arcpy.CreateTable_management = lambda gdb, nombre, plantilla: salidas.setdefault(f"{gdb}/{nombre}", [])
+    arcpy.da = SimpleNamespace(
+        SearchCursor=lambda ruta, nombres: CursorFalso(tablas[ruta], nombres),
+        InsertCursor=lambda ruta, nombres: SimpleNamespace(insertRow=salidas[ruta].append))
+    return arcpy
+
+def campo(nombre, editable=True):
+    return SimpleNamespace(name=nombre, editable=editable)
+
+class TestMotorArcpy(unittest.TestCase):
+    def setUp(self):
+        self.tablas = {"entrada.gdb/PrediosTB": [
+            {"OBJECTID": 1, "ID_PREDIO": "A", "VALOR": 10},
+            {"OBJECTID": 2, "ID_PREDIO": "B", "VALOR": 20},
+            {"OBJECTID": 3, "ID_PREDIO": "C", "VALOR": 30},
+        ]}
+        campos = {"entrada.gdb/PrediosTB": [campo("OBJECTID", editable=False), campo("ID_PREDIO"), campo("VALOR")]}
+        self.salidas = {}
+        # motor_arcpy se importa con el arcpy falso y sale de sys.modules al terminar
+        with patch.dict(sys.modules, {"arcpy": arcpy_falso(self.tablas, campos, self.salidas)}):
+            sys.modules.pop("motor_arcpy", None)
+            self.motor = importlib.import_module("motor_arcpy").MotorArcpy()
+        self.tabla = Capa("entrada.gdb", "", "PrediosTB")
+
+    def test_copiar_tabla_filtrada_por_campo_editable(self):
+        filas = self.motor.copiar_tabla_filtrada(self.tabla, self.tabla.en("salida.gdb"), "ID_PREDIO", ["B"])
+
+        self.assertEqual(filas, 1)
+        self.assertEqual(self.salidas["salida.gdb/PrediosTB"], [("B", 20)])
+
+    def test_copiar_tabla_filtrada_por_clave_no_editable(self):
+        filas = self.motor.copiar_tabla_filtrada(self.tabla, self.tabla.en("salida.gdb"), "OBJECTID", [1, 3])
+
+        self.assertEqual(filas, 2)
+        self.assertEqual(self.salidas["salida.gdb/PrediosTB"], [("A", 10), ("C", 30)])
+
+    def test_cursor_sin_filtro_espacial_en_versiones_anteriores(self):
+        # El SearchCursor falso, como el de ArcGIS Pro anterior a 3.2, no acepta spatial_filter
+        for _ in range(2):
+            with self.motor._cursor_filtrado(self.tabla.ruta, ["ID_PREDIO"], object()) as cursor:
+                self.assertEqual(list(cursor), [("A",), ("B",), ("C",)])
+        self.assertFalse(self.motor._admite_filtro_espacial)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from extensiones import Extension
+from motor_base import COPIADA, RECORTADA, SIN_INTERSECCION, Capa
+from motor_falso import GdbFalsa, MotorFalso
+from plan_recorte import PlanCapa, duracion_estimada, planificar_recorte
+from planificador import Planificador
+
+class TestPlanRecorte(unittest.TestCase):
+    def setUp(self):
+        entrada = GdbFalsa(datasets=["Hidrografia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Muestreo")] = [{"x": 2, "y": 2}, {"x": 3, "y": 3}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}, {"x": 90, "y": 90}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+
+    def test_predice_sin_escribir(self):
+        plan = {p.capa.nombre: p for p in planificar_recorte("entrada.gdb", "aoi.shp", self.motor)}
+
+        self.assertEqual(list(self.motor.gdbs), ["entrada.gdb"])
+        self.assertEqual(plan["Vias"].estado, RECORTADA)
+        self.assertEqual(plan["Muestreo"].estado, COPIADA)
+        self.assertEqual(plan["Muestreo"].entidades, 2)
+        self.assertEqual(plan["Lejana"], PlanCapa(plan["Lejana"].capa, SIN_INTERSECCION, 1, 0, 0, 0.0))
+        self.assertEqual(plan["Rios"].capa, Capa("entrada.gdb", "Hidrografia", "Rios"))
+
+    def test_usa_el_historial(self):
+        historial = {"Vias": {"total_s": 40.0, "filas_entrada": 2, "bytes_escritos": 3000, "filas_salida": 1}}
+        plan = {p.capa.nombre: p for p in planificar_recorte("entrada.gdb", "aoi.shp", self.motor,
+                                                             Planificador(historial))}
+        self.assertEqual(plan["Vias"].segundos, 40.0)
+        self.assertEqual(plan["Vias"].bytes, plan["Vias"].entidades * 3000)
+
+    def test_duracion_estimada(self):
+        capa = Capa("entrada.gdb", "", "Vias")
+        plan = [PlanCapa(capa, RECORTADA, 1, 1, 1, segundos) for segundos in (4.0, 3.0, 3.0, 2.0)]
+        self.assertEqual(duracion_estimada(plan), 12.0)
+        self.assertEqual(duracion_estimada(plan, procesos=2), 6.0)
+
+if __name__ == "__main__":
+    unittest.main()
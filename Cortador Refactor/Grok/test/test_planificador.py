@@ -0,0 +1,66 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from catalogo import CAPA, Catalogo, ElementoCatalogo
+from extensiones import Extension
+from motor_base import ERROR, Capa
+from motor_falso import AreaRecorteFalsa
+from planificador import Planificador, cargar_historial, fraccion_solapada
+
+def _capa(nombre: str, registros: int, extension: Extension, geometria: str = "Polygon") -> ElementoCatalogo:
+    return ElementoCatalogo(nombre, "", CAPA, "MAGNA", extension, geometria, registros)
+
+class TestPlanificador(unittest.TestCase):
+    def setUp(self):
+        self.area = AreaRecorteFalsa("aoi.shp", [Extension(0, 0, 10, 10)], [Extension(0, 0, 10, 10)], "MAGNA")
+        self.catalogo = Catalogo("entrada.gdb", [
+            _capa("Puntos", 10000, Extension(0, 0, 10, 10), "Point"),
+            _capa("Predios", 1000, Extension(0, 0, 10, 10)),
+            _capa("Borde", 1000, Extension(5, 0, 25, 10)),
+            _capa("Otra", 1000, Extension(0, 0, 10, 10), "Point"),
+        ])
+        self.capas = [Capa("entrada.gdb", "", nombre) for nombre in ("Puntos", "Predios", "Borde", "Otra")]
+
+    def test_fraccion_solapada(self):
+        self.assertEqual(fraccion_solapada(self.catalogo.elemento("Predios"), self.area), 1.0)
+        self.assertEqual(fraccion_solapada(self.catalogo.elemento("Borde"), self.area), 0.25)
+        otro_sistema = self.catalogo.elemento("Borde")._replace(referencia="WGS84")
+        self.assertEqual(fraccion_solapada(otro_sistema, self.area), 1.0)
+
+    def test_ordena_de_mayor_a_menor_costo(self):
+        ordenadas = Planificador().ordenar(self.capas, self.catalogo, self.area)
+        # Predios: 1000 x 100; Borde: 1000 x 100 x 0.25; Puntos: 10000 x 1; Otra: 1000 x 1
+        self.assertEqual([c.nombre for c in ordenadas], ["Predios", "Borde", "Puntos", "Otra"])
+
+    def test_el_historial_prevalece_sobre_la_heuristica(self):
+        historial = {
+            "Otra": {"total_s": 60.0, "filas_entrada": 500},
+            "Predios": {"total_s": 1.0, "filas_entrada": 1000},
+            "Puntos": {"total_s": 2.0, "filas_entrada": 10000},
+        }
+        ordenadas = Planificador(historial).ordenar(self.capas, self.catalogo, self.area)
+        # Otra duplicó sus registros (120 s); Borde usa la mediana de 2 s por 10000 de costo (5 s)
+        self.assertEqual([c.nombre for c in ordenadas], ["Otra", "Borde", "Puntos", "Predios"])
+
+    def test_sin_catalogo_conserva_el_orden(self):
+        vacio = Catalogo("entrada.gdb", [])
+        self.assertEqual(Planificador().ordenar(self.capas, vacio, self.area), self.capas)
+
+    def test_cargar_historial(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            registros = [
+                {"capa": "a.gdb/Vias", "clave": "Vias", "estado": "recortada", "total_s": 3.0},
+                {"capa": "a.gdb/Rios", "clave": "Rios", "estado": ERROR, "total_s": 0.1},
+                {"resumen": {"capas": 2}},
+            ]
+            ruta = Path(carpeta) / "CartoBase_1.metricas.jsonl"
+            ruta.write_text("".join(json.dumps(r) + "\n" for r in registros), encoding="utf-8")
+            (Path(carpeta) / "notas.txt").write_text("no son métricas", encoding="utf-8")
+
+            historial = cargar_historial(Path(carpeta))
+        self.assertEqual(list(historial), ["Vias"])
+        self.assertEqual(historial["Vias"]["total_s"], 3.0)
+
+if __name__ == "__main__":
+    unittest.main()
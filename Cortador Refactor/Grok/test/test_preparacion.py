@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from extensiones import Extension
+from manejo_gdb import recortar_capas
+from manifiesto import Manifiesto
+from metricas import Metricas
+from motor_base import COPIADA, ERROR, RECORTADA, SIN_INTERSECCION, Capa
+from motor_falso import GdbFalsa, MotorFalso
+from preparacion import VOLCADO_DATASET, recortar_capas_en_memoria
+
+class TestRecortarCapasEnMemoria(unittest.TestCase):
+    def setUp(self):
+        entrada = GdbFalsa(datasets=["Hidrografia", "Geologia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Muestreo")] = [{"x": 2, "y": 2}, {"x": 3, "y": 3}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}, {"x": 90, "y": 90}]
+        entrada.capas[("Geologia", "Fallas")] = [{"x": 300, "y": 300}]
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": 1}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        self.salida = self.motor.crear_gdb("salida", "CartoBase_1.gdb")
+
+    def _escrituras(self):
+        return [ruta for operacion, ruta in self.motor.operaciones if operacion in ("recortar", "copiar")]
+
+    def test_misma_salida_que_el_recorte_serial(self):
+        recortar_capas_en_memoria("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        en_memoria = self.motor.gdbs.pop(self.salida)
+        serial = self.motor.crear_gdb("salida", "CartoBase_2.gdb")
+        recortar_capas("entrada.gdb", "aoi.shp", serial, self.motor)
+        self.assertEqual(en_memoria.capas, self.motor.gdbs[serial].capas)
+        self.assertEqual(list(en_memoria.capas), list(self.motor.gdbs[serial].capas))
+        self.assertEqual(en_memoria.datasets, ["Hidrografia"])
+        self.assertEqual(list(en_memoria.tablas), ["PredioTB"])
+
+    def test_vuelca_al_final_en_orden(self):
+        metricas = Metricas()
+        recortar_capas_en_memoria("entrada.gdb", "aoi.shp", self.salida, self.motor, metricas=metricas)
+        # Todo se recorta en memoria antes de copiar la primera capa a la salida
+        self.assertEqual(self._escrituras(), [
+            "entrada.gdb/Vias", "entrada.gdb/Hidrografia/Rios",
+            "memoria/preparacion/Vias", "entrada.gdb/Muestreo", "memoria/preparacion/Rios"])
+        estados = {r["capa"]: r["estado"] for r in metricas.capas}
+        self.assertEqual(estados[Capa("entrada.gdb", "", "Vias").ruta], RECORTADA)
+        self.assertEqual(estados[Capa("entrada.gdb", "", "Muestreo").ruta], COPIADA)
+        self.assertEqual(estados[Capa("entrada.gdb", "", "Lejana").ruta], SIN_INTERSECCION)
+
+    def test_vuelca_por_dataset(self):
+        recortar_capas_en_memoria("entrada.gdb", "aoi.shp", self.salida, self.motor, volcado=VOLCADO_DATASET)
+        self.assertEqual(self._escrituras(), [
+            "entrada.gdb/Vias", "memoria/preparacion/Vias", "entrada.gdb/Muestreo",
+            "entrada.gdb/Hidrografia/Rios", "memoria/preparacion/Rios"])
+
+    def test_sin_memoria_escribe_directo(self):
+        recortar_capas_en_memoria("entrada.gdb", "aoi.shp", self.salida, self.motor, max_bytes=1)
+        salida = self.motor.gdbs[self.salida]
+        self.assertEqual(salida.capas[("Hidrografia", "Rios")], [{"x": 1, "y": 9}])
+        self.assertNotIn(("Hidrografia", "Rios"), self.motor.gdbs["memoria/preparacion"].capas)
+        self.assertIn(("recortar", "entrada.gdb/Hidrografia/Rios"), self.motor.operaciones)
+        self.assertNotIn(("copiar", "memoria/preparacion/Rios"), self.motor.operaciones)
+
+    def test_capa_con_error_no_detiene_el_recorte(self):
+        recortar = self.motor.recortar_capa
+
+        def fallar_vias(capa, area, destino):
+            if capa.nombre == "Vias":
+                raise RuntimeError("geometría inválida")
+            return recortar(capa, area, destino)
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            clip = str(Path(carpeta) / "aoi.shp")
+            Path(clip).write_bytes(b"poligono")
+            self.motor.areas[clip] = self.motor.areas["aoi.shp"]
+            gdb_salida = self.motor.crear_gdb(carpeta, "CartoBase_1.gdb")
+            metricas = Metricas()
+            with patch.object(self.motor, "recortar_capa", side_effect=fallar_vias):
+                manifiesto = Manifiesto.crear(gdb_salida, "entrada.gdb", clip)
+                recortar_capas_en_memoria("entrada.gdb", clip, gdb_salida, self.motor, manifiesto=manifiesto,
+                                          metricas=metricas)
+
+            # Las capas preparadas antes y después del error se vuelcan; Vias queda fuera del manifiesto
+            salida = self.motor.gdbs[gdb_salida]
+            self.assertEqual(salida.capas[("Hidrografia", "Rios")], [{"x": 1, "y": 9}])
+            self.assertNotIn(("", "Vias"), salida.capas)
+            manifiesto = Manifiesto.cargar(gdb_salida)
+            self.assertEqual(len(manifiesto.capas), 4)
+            vias = Capa("entrada.gdb", "", "Vias")
+            self.assertFalse(manifiesto.completada(vias, self.motor.firma(vias)))
+            estados = {r["capa"]: r["estado"] for r in metricas.capas}
+            self.assertEqual(estados[vias.ruta], ERROR)
+
+if __name__ == "__main__":
+    unittest.main()
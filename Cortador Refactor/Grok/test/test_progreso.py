@@ -0,0 +1,62 @@
+import unittest
+from unittest.mock import patch
+from catalogo import CAPA, Catalogo, ElementoCatalogo
+from extensiones import Extension
+from manejo_gdb import recortar_capas
+from metricas import MetricasCapa
+from motor_base import Capa, Conteo
+from motor_falso import GdbFalsa, MotorFalso
+from progreso import Progreso
+
+def _terminada(nombre: str, filas: int) -> MetricasCapa:
+    medicion = MetricasCapa(Capa("entrada.gdb", "", nombre))
+    medicion.conteo = Conteo(filas, filas, None, None)
+    return medicion
+
+class TestProgreso(unittest.TestCase):
+    def setUp(self):
+        self.catalogo = Catalogo("entrada.gdb", [
+            ElementoCatalogo("Predios", "", CAPA, None, None, "Polygon", 900),
+            ElementoCatalogo("Puntos", "", CAPA, None, None, "Point", 10000),
+        ])
+        self.capas = [Capa("entrada.gdb", "", "Predios"), Capa("entrada.gdb", "", "Puntos")]
+
+    def test_pondera_por_entidades_y_vertices(self):
+        reloj = iter([0.0, 30.0, 40.0])
+        progreso = Progreso(intervalo_s=0)
+        with patch("progreso.time.perf_counter", lambda: next(reloj)), \
+                self.assertLogs(level="INFO") as registro:
+            progreso.iniciar(self.capas, self.catalogo)
+            progreso.registrar(_terminada("Predios", 300))
+            progreso.registrar(_terminada("Puntos", 5000))
+        # Predios pesa 900 x 100 y Puntos 10000 x 1: terminar Predios es el 90 % en 30 s
+        self.assertIn("Avance 90% (1/2 capas) en 30s, 10 entidades/s", registro.output[0])
+        self.assertIn("quedan ~3s", registro.output[0])
+        self.assertIn("Avance 100% (2/2 capas) en 40s", registro.output[1])
+        self.assertIn("terminado", registro.output[1])
+
+    def test_limita_los_mensajes(self):
+        reloj = iter([0.0, 1.0, 2.0])
+        progreso = Progreso(intervalo_s=10)
+        with patch("progreso.time.perf_counter", lambda: next(reloj)), \
+                self.assertLogs(level="INFO") as registro:
+            progreso.iniciar(self.capas, self.catalogo)
+            progreso.registrar(_terminada("Predios", 300))
+            progreso.registrar(_terminada("Puntos", 5000))
+        self.assertEqual(len(registro.output), 1)
+        self.assertIn("Avance 100%", registro.output[0])
+
+    def test_recorte_serial_informa_el_avance(self):
+        entrada = GdbFalsa()
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        salida = motor.crear_gdb("salida", "CartoBase_1.gdb")
+        with self.assertLogs(level="INFO") as registro:
+            recortar_capas("entrada.gdb", "aoi.shp", salida, motor, progreso=Progreso())
+        avances = [linea for linea in registro.output if "Avance" in linea]
+        self.assertEqual(len(avances), 1)
+        self.assertIn("Avance 100% (2/2 capas)", avances[0])
+
+if __name__ == "__main__":
+    unittest.main()
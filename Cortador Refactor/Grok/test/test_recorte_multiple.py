@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from extensiones import Extension
+from motor_base import RECORTADA, SIN_INTERSECCION
+from motor_falso import GdbFalsa, MotorFalso
+from recorte_multiple import crear_gdbs_salida, nombre_valido, preparar_areas, recortar_multiples_areas
+
+class TestRecorteMultiple(unittest.TestCase):
+    def setUp(self):
+        entrada = GdbFalsa(datasets=["Hidrografia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 105, "y": 105}, {"x": 50, "y": 50}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 101, "y": 109}]
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": 1}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {
+            "norte.shp": Extension(0, 0, 10, 10),
+            "sur.shp": Extension(100, 100, 110, 110),
+            "proyectos.shp": {"P-1": Extension(0, 0, 10, 10), "P-2": Extension(100, 100, 110, 110)},
+        })
+        # Los nombres de salida se reservan en disco aunque las GDB del motor falso estén en memoria
+        self.temporal = tempfile.TemporaryDirectory()
+        self.carpeta = Path(self.temporal.name)
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def test_cada_capa_se_lee_una_vez(self):
+        areas = preparar_areas(["norte.shp", "sur.shp"], self.motor)
+        salidas = crear_gdbs_salida(areas, self.carpeta, "CartoBase", self.motor)
+        resumen = recortar_multiples_areas("entrada.gdb", areas, salidas, self.motor)
+
+        lecturas = [op for op in self.motor.operaciones if op[0] == "recortar_multiple"]
+        self.assertEqual(len(lecturas), 2)
+        norte, sur = self.motor.gdbs[salidas["norte"]], self.motor.gdbs[salidas["sur"]]
+        self.assertEqual(norte.capas[("", "Vias")], [{"x": 5, "y": 5}])
+        self.assertEqual(sur.capas[("", "Vias")], [{"x": 105, "y": 105}])
+        self.assertNotIn(("Hidrografia", "Rios"), norte.capas)
+        self.assertEqual(sur.datasets, ["Hidrografia"])
+        self.assertEqual(list(norte.tablas), ["PredioTB"])
+        self.assertEqual(resumen["norte"], {RECORTADA: 1, SIN_INTERSECCION: 1})
+
+    def test_dividir_por_campo(self):
+        areas = preparar_areas(["proyectos.shp"], self.motor, "PROYECTO")
+        self.assertEqual(list(areas), ["P-1", "P-2"])
+        salidas = crear_gdbs_salida(areas, self.carpeta, "CartoBase", self.motor)
+        self.assertEqual(Path(salidas["P-1"]).name, "CartoBase_P_1_1.gdb")
+        self.assertEqual(self.motor.areas_preparadas, 1)
+
+    def test_error_al_crear_una_gdb_libera_todas_las_reservas(self):
+        areas = preparar_areas(["norte.shp", "sur.shp"], self.motor)
+        crear_gdb = self.motor.crear_gdb
+
+        def fallar_sur(carpeta, nombre):
+            if "sur" in nombre:
+                raise OSError("disco lleno")
+            return crear_gdb(carpeta, nombre)
+
+        with patch.object(self.motor, "crear_gdb", side_effect=fallar_sur), self.assertRaises(OSError):
+            crear_gdbs_salida(areas, self.carpeta, "CartoBase", self.motor)
+        self.assertEqual(list(self.carpeta.glob("*.reserva")), [])
+
+    def test_nombre_valido(self):
+        self.assertEqual(nombre_valido("Proyecto Río/Norte"), "Proyecto_Río_Norte")
+        self.assertEqual(nombre_valido("///"), "area")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+from extensiones import Extension
+from manifiesto import Manifiesto
+from metricas import Metricas
+from motor_base import ERROR, Capa
+from motor_falso import GdbFalsa, MotorFalso
+from recorte_paralelo import recortar_capas_paralelo
+
+class MotorConFallos(MotorFalso):
+    """Motor falso en el que falla el recorte de Vias y la copia de Rios a la GDB final."""
+
+    def recortar_capa(self, capa, area, destino):
+        if capa.nombre == "Vias":
+            raise RuntimeError("geometría inválida")
+        return super().recortar_capa(capa, area, destino)
+
+    def copiar_capa(self, capa, destino):
+        if capa.nombre == "Rios" and destino.gdb == self.gdb_final:
+            raise RuntimeError("GDB bloqueada")
+        super().copiar_capa(capa, destino)
+
+class TestRecortarCapasParalelo(unittest.TestCase):
+    def test_capas_con_error_quedan_fuera_del_manifiesto(self):
+        entrada = GdbFalsa(datasets=["Hidrografia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Muestreo")] = [{"x": 2, "y": 2}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}, {"x": 90, "y": 90}]
+        with tempfile.TemporaryDirectory() as carpeta:
+            clip = str(Path(carpeta) / "aoi.shp")
+            Path(clip).write_bytes(b"poligono")
+            motor = MotorConFallos({"entrada.gdb": entrada}, {clip: Extension(0, 0, 10, 10)})
+            motor.gdb_final = motor.crear_gdb(carpeta, "CartoBase_1.gdb")
+            metricas = Metricas()
+
+            # Los trabajadores son hilos con el mismo motor falso: crear_motor no conoce el motor "falso".
+            # Un solo hilo, porque los hilos comparten el pid y con él la GDB temporal del trabajador
+            with patch("recorte_paralelo.ProcessPoolExecutor", ThreadPoolExecutor), \
+                    patch("recorte_paralelo.crear_motor", return_value=motor):
+                recortar_capas_paralelo("entrada.gdb", clip, motor.gdb_final, motor, 1,
+                                        Manifiesto.crear(motor.gdb_final, "entrada.gdb", clip), metricas=metricas)
+
+            terminadas = Manifiesto.cargar(motor.gdb_final).capas
+            self.assertEqual(len(terminadas), 1)
+            self.assertTrue(Manifiesto.cargar(motor.gdb_final).completada(
+                Capa("entrada.gdb", "", "Muestreo"), motor.firma(Capa("entrada.gdb", "", "Muestreo"))))
+            estados = {r["capa"]: r["estado"] for r in metricas.capas}
+            self.assertEqual(estados["entrada.gdb/Vias"], ERROR)
+            self.assertEqual(estados["entrada.gdb/Hidrografia/Rios"], ERROR)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import logging
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+from ejecutor_lotes import FALLIDO, TERMINADO, Trabajo
+from extensiones import Extension
+from motor_falso import GdbFalsa, MotorFalso
+from servicio import ServicioLocal, ServidorCortador
+
+CONFIG = """[Settings]
+log_level = INFO
+gdb_prefix = CartoBase
+metricas = false
+progreso_s = 0
+cache_catalogo =
+"""
+
+class TestServicio(unittest.TestCase):
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.carpeta = Path(self.temporal.name)
+        config = self.carpeta / "config.ini"
+        config.write_text(CONFIG, encoding="utf-8")
+        entrada = GdbFalsa()
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        self.servicio = ServicioLocal(self.motor, str(config))
+        # Los eventos de avance son los mensajes INFO del log
+        self.nivel = logging.getLogger().level
+        logging.getLogger().setLevel(logging.INFO)
+
+    def tearDown(self):
+        logging.getLogger().setLevel(self.nivel)
+        self.servicio.cerrar()
+        self.temporal.cleanup()
+
+    def trabajo(self, area: str = "aoi.shp", carpeta: str = "") -> Trabajo:
+        salida = self.carpeta / carpeta
+        salida.mkdir(exist_ok=True)
+        return Trabajo("prueba", "entrada.gdb", area, str(salida), {})
+
+    def test_reutiliza_el_motor_entre_trabajos(self):
+        primero = self.servicio.enviar(self.trabajo())
+        segundo = self.servicio.enviar(self.trabajo("no_existe.shp"))
+        # Las GDB del motor falso no existen en disco: otra carpeta evita repetir el nombre
+        tercero = self.servicio.enviar(self.trabajo(carpeta="otra"))
+
+        eventos = list(self.servicio.eventos(primero))
+        self.assertEqual(eventos[0]["tipo"], "inicio")
+        self.assertEqual(eventos[-1]["tipo"], "fin")
+        self.assertTrue(any("Avance 100%" in e.get("mensaje", "") for e in eventos))
+        list(self.servicio.eventos(tercero))
+        self.assertEqual(self.servicio.estado(segundo)["estado"], FALLIDO)
+        salidas = [self.servicio.estado(t)["resultado"]["gdb_salida"] for t in (primero, tercero)]
+        self.assertEqual(Path(salidas[1]), self.carpeta / "otra" / "CartoBase_1.gdb")
+        self.assertEqual(self.motor.gdbs[salidas[1]].capas[("", "Vias")], [{"x": 5, "y": 5}])
+        self.assertEqual(self.servicio.resumen(), {TERMINADO: 2, FALLIDO: 1})
+
+    def test_api_http(self):
+        servidor = ServidorCortador(self.servicio, puerto=0)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{servidor.server_address[1]}"
+        try:
+            pedido = urllib.request.Request(f"{base}/trabajos", method="POST", data=json.dumps({
+                "gdb_entrada": "entrada.gdb", "area": "aoi.shp", "carpeta_salida": str(self.carpeta)}).encode())
+            with urllib.request.urlopen(pedido) as respuesta:
+                self.assertEqual(respuesta.status, 202)
+                id_trabajo = json.load(respuesta)["id"]
+
+            with urllib.request.urlopen(f"{base}/trabajos/{id_trabajo}/eventos") as respuesta:
+                eventos = [json.loads(linea) for linea in respuesta]
+            self.assertEqual(eventos[-1]["resultado"]["estado"], TERMINADO)
+
+            with urllib.request.urlopen(f"{base}/trabajos/{id_trabajo}") as respuesta:
+                estado = json.load(respuesta)
+            self.assertEqual((estado["nombre"], estado["estado"]), ("trabajo_1", TERMINADO))
+
+            for ruta, datos, codigo in ((f"{base}/trabajos/99", None, 404),
+                                        (f"{base}/trabajos", json.dumps({"area": "aoi.shp"}).encode(), 400)):
+                with self.assertRaises(urllib.error.HTTPError) as error:
+                    urllib.request.urlopen(urllib.request.Request(ruta, data=datos))
+                self.assertEqual(error.exception.code, codigo)
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import tempfile
+import unittest
+from pathlib import Path
+from extensiones import Extension
+from manifiesto import Manifiesto
+from metricas import Metricas
+from motor_base import COPIADA, RECORTADA, SIN_INTERSECCION, Capa
+from motor_falso import GdbFalsa, MotorFalso
+from planificador import Planificador
+from tuberia import recortar_capas_tuberia
+
+class TestRecortarCapasTuberia(unittest.TestCase):
+    def setUp(self):
+        entrada = GdbFalsa(datasets=["Hidrografia", "Geologia"])
+        entrada.capas[("", "Vias")] = [{"x": 5, "y": 5}, {"x": 50, "y": 50}]
+        entrada.capas[("", "Muestreo")] = [{"x": 2, "y": 2}, {"x": 3, "y": 3}]
+        entrada.capas[("", "Lejana")] = [{"x": 500, "y": 500}]
+        entrada.capas[("", "Esquina")] = [{"x": 20, "y": 20}, {"x": -5, "y": -5}]
+        entrada.capas[("Hidrografia", "Rios")] = [{"x": 1, "y": 9}, {"x": 90, "y": 90}]
+        entrada.capas[("Geologia", "Fallas")] = [{"x": 300, "y": 300}]
+        entrada.tablas["PredioTB"] = [{"ID_PREDIO": 1}]
+        self.motor = MotorFalso({"entrada.gdb": entrada}, {"aoi.shp": Extension(0, 0, 10, 10)})
+        self.salida = self.motor.crear_gdb("salida", "CartoBase_1.gdb")
+
+    def test_misma_salida_que_el_recorte_serial(self):
+        metricas = Metricas()
+        recortar_capas_tuberia("entrada.gdb", "aoi.shp", self.salida, self.motor, hilos_recorte=3,
+                               metricas=metricas, tamano_cola=1)
+        salida = self.motor.gdbs[self.salida]
+
+        self.assertEqual(salida.capas[("", "Vias")], [{"x": 5, "y": 5}])
+        self.assertEqual(len(salida.capas[("", "Muestreo")]), 2)
+        self.assertEqual(salida.capas[("Hidrografia", "Rios")], [{"x": 1, "y": 9}])
+        self.assertNotIn(("", "Lejana"), salida.capas)
+        self.assertNotIn(("", "Esquina"), salida.capas)
+        self.assertEqual(salida.datasets, ["Hidrografia"])
+        self.assertEqual(list(salida.tablas), ["PredioTB"])
+
+        estados = {r["capa"]: r["estado"] for r in metricas.capas}
+        self.assertEqual(len(estados), 6)
+        self.assertEqual(estados[Capa("entrada.gdb", "", "Vias").ruta], RECORTADA)
+        self.assertEqual(estados[Capa("entrada.gdb", "", "Muestreo").ruta], COPIADA)
+        self.assertEqual(estados[Capa("entrada.gdb", "", "Esquina").ruta], SIN_INTERSECCION)
+
+    def test_las_capas_lejanas_no_se_leen(self):
+        recortar_capas_tuberia("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        self.assertNotIn(("escribir", Capa(self.salida, "", "Lejana").ruta), self.motor.operaciones)
+        self.assertIn(("leer", Capa("entrada.gdb", "", "Lejana").ruta), self.motor.operaciones)
+        self.assertEqual(self.motor.areas_preparadas, 1)
+
+    def test_lee_primero_las_capas_mas_costosas(self):
+        planificador = Planificador({"Hidrografia/Rios": {"total_s": 30.0}, "Vias": {"total_s": 1.0}})
+        recortar_capas_tuberia("entrada.gdb", "aoi.shp", self.salida, self.motor, planificador=planificador)
+        leidas = [ruta for operacion, ruta in self.motor.operaciones if operacion == "leer"]
+        # Las capas sin historial se estiman con la mediana y quedan entre las dos medidas
+        self.assertEqual(leidas[0], Capa("entrada.gdb", "Hidrografia", "Rios").ruta)
+        self.assertEqual(leidas[-1], Capa("entrada.gdb", "", "Vias").ruta)
+
+    def test_registra_el_manifiesto(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            clip = Path(carpeta) / "aoi.shp"
+            clip.write_bytes(b"poligono")
+            self.motor.areas[str(clip)] = self.motor.areas["aoi.shp"]
+            gdb_salida = str(Path(carpeta) / "CartoBase_1.gdb")
+            self.motor.gdbs[gdb_salida] = self.motor.gdbs.pop(self.salida)
+
+            recortar_capas_tuberia("entrada.gdb", str(clip), gdb_salida, self.motor,
+                                   manifiesto=Manifiesto.crear(gdb_salida, "entrada.gdb", str(clip)))
+            self.assertEqual(len(Manifiesto.cargar(gdb_salida).capas), 6)
+
+    def test_motor_sin_tuberia_recorta_en_serie(self):
+        self.motor.admite_tuberia = False
+        recortar_capas_tuberia("entrada.gdb", "aoi.shp", self.salida, self.motor)
+        self.assertIn(("recortar", Capa("entrada.gdb", "", "Vias").ruta), self.motor.operaciones)
+        self.assertFalse(any(operacion == "leer" for operacion, _ in self.motor.operaciones))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,50 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
-from src.utilidades import generar_nombre_gdb_unico
+from pathlib import Path
+from utilidades import SUFIJO_RESERVA, generar_nombre_gdb_unico, liberar_nombre_gdb, ultimo_numero_gdb
 
 class TestUtilidades(unittest.TestCase):
-    @patch("arcpy.Exists")
-    def test_generar_nombre_gdb_unico(self, mock_exists):
-        mock_exists.side_effect = [True, False]  # Simula que el primer nombre existe, el segundo no
-        ruta = generar_nombre_gdb_unico("/ruta", "CartoBase")
-        self.assertEqual(ruta, "/ruta/CartoBase_2.gdb")
+    def setUp(self):
+        self.temporal = tempfile.TemporaryDirectory()
+        self.carpeta = Path(self.temporal.name)
+
+    def tearDown(self):
+        self.temporal.cleanup()
+
+    def test_generar_nombre_gdb_unico(self):
+        for nombre in ("CartoBase_1.gdb", "CartoBase_7.gdb", "CartoBase_x.gdb", "Otra_9.gdb"):
+            (self.carpeta / nombre).mkdir()
+        (self.carpeta / "CartoBase_8.metricas.jsonl").write_text("", encoding="utf-8")
+
+        ruta = generar_nombre_gdb_unico(self.carpeta, "CartoBase")
+        self.assertEqual(ruta, str(self.carpeta / "CartoBase_8.gdb"))
+        self.assertTrue(os.path.exists(ruta + SUFIJO_RESERVA))
+
+    def test_carpeta_vacia(self):
+        self.assertEqual(ultimo_numero_gdb(self.carpeta / "no_existe", "CartoBase"), 0)
+        self.assertEqual(generar_nombre_gdb_unico(self.carpeta, "CartoBase"), str(self.carpeta / "CartoBase_1.gdb"))
+
+    def test_recortes_simultaneos_no_repiten_nombre(self):
+        primera = generar_nombre_gdb_unico(self.carpeta, "CartoBase")
+        segunda = generar_nombre_gdb_unico(self.carpeta, "CartoBase")
+        self.assertEqual([Path(primera).name, Path(segunda).name], ["CartoBase_1.gdb", "CartoBase_2.gdb"])
+
+    def test_reserva_tomada_despues_de_leer_la_carpeta(self):
+        # Otro recorte reservó el 1 y ya creó el 2 entre la lectura de la carpeta y la reserva
+        with patch("utilidades.ultimo_numero_gdb", return_value=0):
+            (self.carpeta / f"CartoBase_1.gdb{SUFIJO_RESERVA}").touch()
+            (self.carpeta / "CartoBase_2.gdb").mkdir()
+            ruta = generar_nombre_gdb_unico(self.carpeta, "CartoBase")
+        self.assertEqual(ruta, str(self.carpeta / "CartoBase_3.gdb"))
+        self.assertFalse((self.carpeta / f"CartoBase_2.gdb{SUFIJO_RESERVA}").exists())
+
+    def test_liberar_nombre_gdb(self):
+        ruta = generar_nombre_gdb_unico(self.carpeta, "CartoBase")
+        liberar_nombre_gdb(ruta)
+        liberar_nombre_gdb(ruta)
+        self.assertEqual(list(self.carpeta.iterdir()), [])
 
 if __name__ == "__main__":
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -9,7 +9,9 @@
 # ============================================================================
 
 import arcpy
+import math
 import os
+import re
 import time
 
 __author__ = "Jorge Vallejo @OnfeVS"
@@ -29,46 +31,238 @@ arcpy.env.overwriteOutput = True
 # === Funciones principales ==================================================
 # ============================================================================
 
-def get_all_datasets(gdb):
-    """Obtiene todos los feature datasets recursivamente"""
-    arcpy.env.workspace = gdb
-    datasets = []
-    for ds in arcpy.ListDatasets("", "Feature"):
-        datasets.append(ds)
-        sub_datasets = arcpy.ListDatasets(ds + "/*", "Feature")
-        if sub_datasets:
-            datasets.extend(sub_datasets)
-    return datasets
+# Descripciones de las capas, datasets y tablas de la GDB de entrada, por nombre
+catalog = {}
+
+def load_catalog(gdb):
+    """Recorre la GDB una sola vez y devuelve sus capas raíz, sus datasets con sus capas y sus tablas
+
+    Las descripciones quedan en el catálogo para que las funciones de recorte no vuelvan a llamar a Describe.
+    """
+    catalog.clear()
+    root_fcs, datasets, tables = [], {}, []
+    pending = [(arcpy.Describe(gdb), None)]
+    while pending:
+        parent, fds = pending.pop(0)
+        for child in parent.children:
+            catalog[child.name] = child
+            if child.dataType == "FeatureDataset":
+                datasets[child.name] = []
+                pending.append((child, child.name))
+            elif child.dataType == "FeatureClass":
+                (datasets[fds] if fds else root_fcs).append(child.name)
+            elif child.dataType == "Table" and not fds:
+                tables.append(child.name)
+    return root_fcs, datasets, tables
+
+def describe(item):
+    """Obtiene la descripción de una capa o dataset del catálogo, o de arcpy si no está en él"""
+    return catalog.get(item) or arcpy.Describe(item)
+
+# Extensiones del área de recorte ya calculadas, por shapefile y sistema de coordenadas
+clip_extents = {}
+
+def get_clip_extent(clip_features, spatial_reference):
+    """Obtiene la extensión del área de recorte en el sistema de coordenadas de la capa"""
+    key = (clip_features, spatial_reference.name)
+    if key not in clip_extents:
+        extent = arcpy.Describe(clip_features).extent
+        if extent.spatialReference.name != spatial_reference.name:
+            extent = extent.projectAs(spatial_reference)
+            # Margen del 1% para no descartar capas por la deformación al reproyectar
+            dx = (extent.XMax - extent.XMin) * 0.01
+            dy = (extent.YMax - extent.YMin) * 0.01
+            extent = arcpy.Extent(extent.XMin - dx, extent.YMin - dy, extent.XMax + dx, extent.YMax + dy)
+        clip_extents[key] = extent
+    return clip_extents[key]
+
+def extents_overlap(extent_a, extent_b):
+    """Compara dos extensiones; una extensión vacía (capa sin registros) nunca se superpone"""
+    coords = [extent_a.XMin, extent_a.YMin, extent_a.XMax, extent_a.YMax,
+              extent_b.XMin, extent_b.YMin, extent_b.XMax, extent_b.YMax]
+    if any(c is None or math.isnan(c) for c in coords):
+        return False
+    return (extent_a.XMin <= extent_b.XMax and extent_b.XMin <= extent_a.XMax and
+            extent_a.YMin <= extent_b.YMax and extent_b.YMin <= extent_a.YMax)
 
 def has_intersection(fc, clip_features):
     """Verifica si una capa tiene intersección con el área de recorte"""
     try:
-        result = arcpy.SelectLayerByLocation_management(fc, "INTERSECT", clip_features, selection_type="NEW_SELECTION")
+        # Descarte rápido: si las extensiones no se tocan no hace falta la selección espacial
+        desc = describe(fc)
+        if not extents_overlap(desc.extent, get_clip_extent(clip_features, desc.spatialReference)):
+            return False
+        # La selección se hace contra el área ya proyectada al sistema de la capa
+        clip_geometry = get_clip_geometry(clip_features, desc.spatialReference)
+        if clip_geometry is None:
+            return False
+        result = arcpy.SelectLayerByLocation_management(fc, "INTERSECT", clip_geometry, selection_type="NEW_SELECTION")
         count = int(arcpy.GetCount_management(result)[0])
         return count > 0
     except Exception as e:
         print(f"Error verificando intersección para {fc}: {e}")
         return False
 
-def is_empty(fc):
-    """Verifica si una capa está vacía"""
+# Geometrías disueltas del área de recorte, leídas una sola vez por shapefile
+clip_geometries = {}
+
+# Geometrías del área de recorte ya proyectadas, por shapefile y sistema de coordenadas
+projected_clip_geometries = {}
+
+def get_clip_geometry(clip_features, spatial_reference=None):
+    """Obtiene la unión de todos los polígonos del área de recorte
+
+    Con un sistema de coordenadas distinto al del shapefile, la geometría se proyecta una sola vez
+    por sistema y se reutiliza en todas las capas que lo comparten.
+    """
+    if clip_features not in clip_geometries:
+        geometry = None
+        with arcpy.da.SearchCursor(clip_features, ["SHAPE@"]) as cursor:
+            for (shape,) in cursor:
+                if shape is not None:
+                    geometry = shape if geometry is None else geometry.union(shape)
+        clip_geometries[clip_features] = geometry
+    geometry = clip_geometries[clip_features]
+    if geometry is None or spatial_reference is None or spatial_reference.name == geometry.spatialReference.name:
+        return geometry
+    key = (clip_features, spatial_reference.name)
+    if key not in projected_clip_geometries:
+        # Densificar para que los bordes del área sigan la curvatura al reproyectar
+        extent = geometry.extent
+        side = max(extent.XMax - extent.XMin, extent.YMax - extent.YMin)
+        projected_clip_geometries[key] = geometry.densify("DISTANCE", side / 50).projectAs(spatial_reference)
+        print(f"Área de recorte proyectada a {spatial_reference.name}")
+    return projected_clip_geometries[key]
+
+def is_contained(fc, clip_features):
+    """Verifica si la extensión de una capa queda completamente dentro del área de recorte"""
     try:
-        count = int(arcpy.GetCount_management(fc)[0])
-        return count == 0
+        desc = describe(fc)
+        extent = desc.extent
+        clip_extent = get_clip_extent(clip_features, desc.spatialReference)
+        if not extents_overlap(extent, clip_extent):
+            return False
+        # Descarte rápido: la caja de la capa debe caber en la caja del recorte
+        if not (clip_extent.XMin <= extent.XMin and extent.XMax <= clip_extent.XMax and
+                clip_extent.YMin <= extent.YMin and extent.YMax <= clip_extent.YMax):
+            return False
+        clip_geometry = get_clip_geometry(clip_features, desc.spatialReference)
+        if clip_geometry is None:
+            return False
+        corners = arcpy.Array([arcpy.Point(extent.XMin, extent.YMin), arcpy.Point(extent.XMin, extent.YMax),
+                               arcpy.Point(extent.XMax, extent.YMax), arcpy.Point(extent.XMax, extent.YMin)])
+        return clip_geometry.contains(arcpy.Polygon(corners, desc.spatialReference))
     except Exception as e:
-        print(f"Error verificando si la capa está vacía: {e}")
-        return True
+        print(f"Error verificando si la capa está contenida {fc}: {e}")
+        return False
+
+# Dimensión que debe devolver Geometry.intersect según el tipo de geometría de la capa; los demás
+# tipos (p. ej. MultiPatch) se recortan con la herramienta Clip
+INTERSECT_DIMENSIONS = {"Point": 1, "Multipoint": 1, "Polyline": 2, "Polygon": 4}
+
+def clip_feature(shape, clip_geometry, dimension):
+    """Recorta una entidad con el área de recorte; devuelve None si queda fuera"""
+    if shape is None or clip_geometry.disjoint(shape):
+        return None
+    if clip_geometry.contains(shape):
+        return shape
+    clipped = shape.intersect(clip_geometry, dimension)
+    return clipped if clipped.pointCount > 0 else None
+
+# spatial_filter de arcpy.da.SearchCursor existe desde ArcGIS Pro 3.2; pasa a False en versiones anteriores
+spatial_filter_supported = True
+
+def search_features(fc, fields, clip_geometry):
+    """Abre un cursor que entrega solo las entidades que tocan el área de recorte
+
+    En ArcGIS Pro anterior a 3.2 el cursor no acepta spatial_filter y lanza TypeError: se avisa una vez
+    y desde entonces se leen las capas completas, descartando en clip_feature las entidades de fuera.
+    """
+    global spatial_filter_supported
+    if spatial_filter_supported:
+        try:
+            return arcpy.da.SearchCursor(fc, fields, spatial_filter=clip_geometry)
+        except TypeError:
+            spatial_filter_supported = False
+            print("Esta versión de ArcGIS Pro no admite spatial_filter (requiere 3.2): se leen las capas completas")
+    return arcpy.da.SearchCursor(fc, fields)
+
+def stream_clip(fc, clip_features, output_fc):
+    """Recorta una capa en una sola pasada con cursores y devuelve el número de entidades escritas
+
+    La capa de salida se crea al llegar la primera entidad que sobrevive al recorte,
+    por lo que un recorte vacío no escribe ni elimina nada.
+    """
+    desc = describe(fc)
+    clip_geometry = get_clip_geometry(clip_features, desc.spatialReference)
+    if clip_geometry is None:
+        return 0
+    dimension = INTERSECT_DIMENSIONS.get(desc.shapeType)
+    if dimension is None:
+        # Tipos que Geometry.intersect no recorta (p. ej. MultiPatch): herramienta Clip, sin dejar salidas vacías
+        arcpy.Clip_analysis(fc, clip_features, output_fc)
+        written = int(arcpy.GetCount_management(output_fc)[0])
+        if not written:
+            arcpy.Delete_management(output_fc)
+        return written
+    fields = ["SHAPE@"] + [f.name for f in desc.fields if f.editable and f.type != "Geometry"]
+    written = 0
+    output = None
+    try:
+        # Las entidades se leen en el sistema de la capa, el mismo del área proyectada, y el filtro espacial
+        # entrega solo las que tocan el área en lugar de la capa completa
+        with search_features(fc, fields, clip_geometry) as cursor:
+            for row in cursor:
+                shape = clip_feature(row[0], clip_geometry, dimension)
+                if shape is None:
+                    continue
+                if output is None:
+                    arcpy.CreateFeatureclass_management(
+                        os.path.dirname(output_fc), os.path.basename(output_fc), desc.shapeType, desc.catalogPath,
+                        "ENABLED" if desc.hasM else "DISABLED", "ENABLED" if desc.hasZ else "DISABLED",
+                        desc.spatialReference)
+                    output = arcpy.da.InsertCursor(output_fc, fields)
+                output.insertRow((shape,) + tuple(row[1:]))
+                written += 1
+    finally:
+        if output is not None:
+            del output
+    return written
+
+# Archivo que aparta el nombre de la GDB de salida mientras dura el recorte: CartoBase_3.gdb.reserva
+RESERVATION_SUFFIX = ".reserva"
 
 def get_unique_gdb_name(base_folder):
-    """Genera un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc."""
-    counter = 1
+    """Genera y reserva un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc.
+
+    El número sale de una sola lectura de la carpeta (el mayor CartoBase_N más uno), sin probar los nombres
+    uno por uno, y el nombre se aparta creando de forma exclusiva su archivo de reserva, para que dos
+    recortes que empiezan a la vez en la misma carpeta no elijan el mismo nombre.
+    """
+    pattern = re.compile(r"CartoBase_(\d+)\.gdb(?:\.reserva)?", re.IGNORECASE)
+    with os.scandir(base_folder) as entries:
+        matches = [pattern.fullmatch(entry.name) for entry in entries]
+    counter = max((int(match.group(1)) for match in matches if match), default=0) + 1
     while True:
-        gdb_name = f"CartoBase_{counter}.gdb"
-        gdb_path = os.path.join(base_folder, gdb_name)
-        if not arcpy.Exists(gdb_path):
+        gdb_path = os.path.join(base_folder, f"CartoBase_{counter}.gdb")
+        try:
+            os.close(os.open(gdb_path + RESERVATION_SUFFIX, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            counter += 1  # Otro recorte lo reservó después de leer la carpeta
+            continue
+        if not os.path.exists(gdb_path):
             return gdb_path
+        # Otro recorte terminó con este nombre y liberó su reserva después de leer la carpeta
+        os.remove(gdb_path + RESERVATION_SUFFIX)
         counter += 1
 
+def release_gdb_name(gdb_path):
+    """Elimina la reserva del nombre de la GDB de salida al terminar el recorte"""
+    try:
+        os.remove(gdb_path + RESERVATION_SUFFIX)
+    except FileNotFoundError:
+        pass
+
 def delete_unwanted_files(gdb_path):
     """Elimina archivos no deseados que se crean automáticamente en la GDB"""
     try:
@@ -85,31 +279,34 @@ def clip_layers(gdb_input, clip_features, gdb_output):
     """Procesa las capas y datasets recortando con un shapefile"""
     try:
         arcpy.env.workspace = gdb_input
+        root_fcs, datasets, _ = load_catalog(gdb_input)
 
         # Procesar capas en la raíz
         print("\nProcesando capas en la raíz...")
-        for fc in arcpy.ListFeatureClasses():
+        for fc in root_fcs:
             try:
+                output_fc = os.path.join(gdb_output, os.path.basename(fc))
+                if is_contained(fc, clip_features):
+                    arcpy.CopyFeatures_management(fc, output_fc)
+                    print(f"Copiada completa (dentro del área de recorte): {fc}")
+                    continue
+
                 print(f"Verificando intersección para: {fc}...")
                 if not has_intersection(fc, clip_features):
                     print(f"Sin intersección: {fc}. Omitiendo...")
                     continue
 
-                output_fc = os.path.join(gdb_output, os.path.basename(fc))
-                arcpy.Clip_analysis(fc, clip_features, output_fc)
-
-                if is_empty(output_fc):
-                    arcpy.Delete_management(output_fc)
-                    print(f"Capa recortada vacía eliminada: {fc}")
-                else:
+                if stream_clip(fc, clip_features, output_fc):
                     print(f"Recortada: {fc}")
+                else:
+                    print(f"Recorte vacío, sin salida: {fc}")
             except Exception as e:
                 print(f"Error en capa raíz {fc}: {str(e)}")
                 continue
 
         # Procesar datasets
         print("\nProcesando Feature Datasets...")
-        all_datasets = get_all_datasets(gdb_input)
+        all_datasets = list(datasets)
 
         if not all_datasets:
             print("¡No se encontraron datasets en la GDB de entrada!")
@@ -117,21 +314,19 @@ def clip_layers(gdb_input, clip_features, gdb_output):
 
         for fds in all_datasets:
             try:
-                if not arcpy.Exists(os.path.join(gdb_input, fds)):
-                    print(f"Dataset no existe en input: {fds}")
-                    continue
-
-                desc = arcpy.Describe(fds)
+                desc = describe(fds)
                 output_fds = os.path.join(gdb_output, fds)
 
                 # Crear dataset en la salida solo si tiene capas válidas
                 dataset_has_data = False
-                for fc in arcpy.ListFeatureClasses("", "", fds):
+                for fc in datasets[fds]:
                     try:
-                        print(f"Verificando intersección para: {fc}...")
-                        if not has_intersection(fc, clip_features):
-                            print(f"Sin intersección: {fc}. Omitiendo...")
-                            continue
+                        contained = is_contained(fc, clip_features)
+                        if not contained:
+                            print(f"Verificando intersección para: {fc}...")
+                            if not has_intersection(fc, clip_features):
+                                print(f"Sin intersección: {fc}. Omitiendo...")
+                                continue
 
                         if not dataset_has_data:
                             arcpy.CreateFeatureDataset_management(gdb_output, fds, desc.spatialReference)
@@ -139,13 +334,15 @@ def clip_layers(gdb_input, clip_features, gdb_output):
                             dataset_has_data = True
 
                         output_fc = os.path.join(gdb_output, fds, os.path.basename(fc))
-                        arcpy.Clip_analysis(fc, clip_features, output_fc)
+                        if contained:
+                            arcpy.CopyFeatures_management(fc, output_fc)
+                            print(f"Copiada completa (dentro del área de recorte): {fds}/{os.path.basename(fc)}")
+                            continue
 
-                        if is_empty(output_fc):
-                            arcpy.Delete_management(output_fc)
-                            print(f"Capa recortada vacía eliminada: {fds}/{os.path.basename(fc)}")
-                        else:
+                        if stream_clip(fc, clip_features, output_fc):
                             print(f"Recortada: {fds}/{os.path.basename(fc)}")
+                        else:
+                            print(f"Recorte vacío, sin salida: {fds}/{os.path.basename(fc)}")
                     except Exception as e:
                         print(f"Error en capa {fds}/{fc}: {str(e)}")
                         continue
@@ -175,21 +372,24 @@ def main():
     # Solicitar rutas al usuario
     gdb_input = input("Ingrese la ruta de la GDB de entrada: ").strip()
     clip_features = input("Ingrese la ruta del shapefile para el recorte: ").strip()
-    output_folder = os.path.dirname(gdb_input)
+    # Una GDB indicada sin carpeta está en la carpeta actual
+    output_folder = os.path.dirname(gdb_input) or "."
 
-    # Crear un nombre único para la GDB de salida
+    # Crear un nombre único para la GDB de salida; su reserva se libera aunque el recorte falle o se interrumpa
     gdb_output = get_unique_gdb_name(output_folder)
-
-    # Crear la GDB de salida
-    arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
-    print(f"\nNueva GDB creada: {gdb_output}")
-
-    # Validar rutas de entrada
-    if all([arcpy.Exists(gdb_input), arcpy.Exists(clip_features)]):
-        clip_layers(gdb_input, clip_features, gdb_output)
-        delete_unwanted_files(gdb_output)
-    else:
-        print("Error: Verifique que las rutas de la GDB de entrada y el shapefile sean correctas.")
+    try:
+        # Crear la GDB de salida
+        arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
+        print(f"\nNueva GDB creada: {gdb_output}")
+
+        # Validar rutas de entrada
+        if all([arcpy.Exists(gdb_input), arcpy.Exists(clip_features)]):
+            clip_layers(gdb_input, clip_features, gdb_output)
+            delete_unwanted_files(gdb_output)
+        else:
+            print("Error: Verifique que las rutas de la GDB de entrada y el shapefile sean correctas.")
+    finally:
+        release_gdb_name(gdb_output)
 
     # Finalizar el cronómetro y calcular tiempo
     elapsed_time = time.time() - start_time
@@ -9,8 +9,15 @@
 # ============================================================================
 
 import arcpy
+import collections
+import itertools
+import math
 import os
+import re
+import shutil
+import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 __author__ = "Jorge Vallejo @OnfeVS"
 __version__ = "1.0.0"
@@ -25,50 +32,525 @@ Este script realiza el recorte de capas y datasets de una GDB utilizando un áre
 # ============================================================================
 arcpy.env.overwriteOutput = True
 
+# Recorte relacional: de las tablas TB solo se copian las filas relacionadas con las entidades recortadas.
+# Desactivado por defecto, como claves_tablas en el refactor: cambia lo que se entrega y una tabla con
+# ID_PREDIO saldría vacía si ninguna capa recortada tiene ese campo
+RELATIONAL_TB = False
+
+# Campos que unen capas y tablas TB cuando no hay una relationship class que lo indique
+KEY_FIELDS = ["ID_PREDIO"]
+
+# Filas que se leen y escriben por bloque al copiar las tablas TB
+TABLE_BLOCK_ROWS = 50000
+
+# Segundos mínimos entre dos mensajes de avance y segundos de capas terminadas que cuentan para el rendimiento
+PROGRESS_INTERVAL = 10
+THROUGHPUT_WINDOW = 60
+
+# Vértices por entidad supuestos según el tipo de geometría, para que el avance pese más en las capas complejas
+VERTICES_PER_SHAPE = {"Point": 1, "Multipoint": 5, "Polyline": 50, "Polygon": 100}
+
+# Al terminar: reconstruir los índices espaciales con las entidades recortadas y compactar la GDB de salida,
+# y crear además una copia comprimida de solo lectura (CartoBase_N_comprimida.gdb) para los visores
+OPTIMIZE_OUTPUT = False
+COMPRESSED_COPY = False
+
+# Procesos que reconstruyen a la vez los índices de capas distintas. Por defecto en serie: cada proceso
+# carga arcpy de nuevo y todos escriben en la misma GDB, así que más de 2 o 3 no acelera en un disco local
+OPTIMIZE_PROCESSES = 1
+
 # ============================================================================
 # === Funciones principales ==================================================
 # ============================================================================
 
-def get_all_datasets(gdb):
-    """Obtiene todos los feature datasets recursivamente"""
-    arcpy.env.workspace = gdb
-    datasets = []
-    for ds in arcpy.ListDatasets("", "Feature"):
-        datasets.append(ds)
-        sub_datasets = arcpy.ListDatasets(ds + "/*", "Feature")
-        if sub_datasets:
-            datasets.extend(sub_datasets)
-    return datasets
+# Descripciones de las capas, datasets y tablas de la GDB de entrada, por nombre
+catalog = {}
+
+def load_catalog(gdb):
+    """Recorre la GDB una sola vez y devuelve sus capas raíz, sus datasets con sus capas y sus tablas
+
+    Las descripciones quedan en el catálogo para que las funciones de recorte no vuelvan a llamar a Describe.
+    """
+    catalog.clear()
+    root_fcs, datasets, tables = [], {}, []
+    pending = [(arcpy.Describe(gdb), None)]
+    while pending:
+        parent, fds = pending.pop(0)
+        for child in parent.children:
+            catalog[child.name] = child
+            if child.dataType == "FeatureDataset":
+                datasets[child.name] = []
+                pending.append((child, child.name))
+            elif child.dataType == "FeatureClass":
+                (datasets[fds] if fds else root_fcs).append(child.name)
+            elif child.dataType == "Table" and not fds:
+                tables.append(child.name)
+    return root_fcs, datasets, tables
+
+def describe(item):
+    """Obtiene la descripción de una capa o dataset del catálogo, o de arcpy si no está en él"""
+    return catalog.get(item) or arcpy.Describe(item)
+
+# Extensiones del área de recorte ya calculadas, por shapefile y sistema de coordenadas
+clip_extents = {}
+
+def get_clip_extent(clip_features, spatial_reference):
+    """Obtiene la extensión del área de recorte en el sistema de coordenadas de la capa"""
+    key = (clip_features, spatial_reference.name)
+    if key not in clip_extents:
+        extent = arcpy.Describe(clip_features).extent
+        if extent.spatialReference.name != spatial_reference.name:
+            extent = extent.projectAs(spatial_reference)
+            # Margen del 1% para no descartar capas por la deformación al reproyectar
+            dx = (extent.XMax - extent.XMin) * 0.01
+            dy = (extent.YMax - extent.YMin) * 0.01
+            extent = arcpy.Extent(extent.XMin - dx, extent.YMin - dy, extent.XMax + dx, extent.YMax + dy)
+        clip_extents[key] = extent
+    return clip_extents[key]
+
+def extents_overlap(extent_a, extent_b):
+    """Compara dos extensiones; una extensión vacía (capa sin registros) nunca se superpone"""
+    coords = [extent_a.XMin, extent_a.YMin, extent_a.XMax, extent_a.YMax,
+              extent_b.XMin, extent_b.YMin, extent_b.XMax, extent_b.YMax]
+    if any(c is None or math.isnan(c) for c in coords):
+        return False
+    return (extent_a.XMin <= extent_b.XMax and extent_b.XMin <= extent_a.XMax and
+            extent_a.YMin <= extent_b.YMax and extent_b.YMin <= extent_a.YMax)
 
 def has_intersection(fc, clip_features):
     """Verifica si una capa tiene intersección con el área de recorte"""
     try:
-        result = arcpy.SelectLayerByLocation_management(fc, "INTERSECT", clip_features, selection_type="NEW_SELECTION")
+        # Descarte rápido: si las extensiones no se tocan no hace falta la selección espacial
+        desc = describe(fc)
+        if not extents_overlap(desc.extent, get_clip_extent(clip_features, desc.spatialReference)):
+            return False
+        # La selección se hace contra el área ya proyectada al sistema de la capa
+        clip_geometry = get_clip_geometry(clip_features, desc.spatialReference)
+        if clip_geometry is None:
+            return False
+        result = arcpy.SelectLayerByLocation_management(fc, "INTERSECT", clip_geometry, selection_type="NEW_SELECTION")
         count = int(arcpy.GetCount_management(result)[0])
         return count > 0
     except Exception as e:
         print(f"Error verificando intersección para {fc}: {e}")
         return False
 
-def is_empty(fc):
-    """Verifica si una capa está vacía"""
+# Geometrías disueltas del área de recorte, leídas una sola vez por shapefile
+clip_geometries = {}
+
+# Geometrías del área de recorte ya proyectadas, por shapefile y sistema de coordenadas
+projected_clip_geometries = {}
+
+def get_clip_geometry(clip_features, spatial_reference=None):
+    """Obtiene la unión de todos los polígonos del área de recorte
+
+    Con un sistema de coordenadas distinto al del shapefile, la geometría se proyecta una sola vez
+    por sistema y se reutiliza en todas las capas que lo comparten.
+    """
+    if clip_features not in clip_geometries:
+        geometry = None
+        with arcpy.da.SearchCursor(clip_features, ["SHAPE@"]) as cursor:
+            for (shape,) in cursor:
+                if shape is not None:
+                    geometry = shape if geometry is None else geometry.union(shape)
+        clip_geometries[clip_features] = geometry
+    geometry = clip_geometries[clip_features]
+    if geometry is None or spatial_reference is None or spatial_reference.name == geometry.spatialReference.name:
+        return geometry
+    key = (clip_features, spatial_reference.name)
+    if key not in projected_clip_geometries:
+        # Densificar para que los bordes del área sigan la curvatura al reproyectar
+        extent = geometry.extent
+        side = max(extent.XMax - extent.XMin, extent.YMax - extent.YMin)
+        projected_clip_geometries[key] = geometry.densify("DISTANCE", side / 50).projectAs(spatial_reference)
+        print(f"Área de recorte proyectada a {spatial_reference.name}")
+    return projected_clip_geometries[key]
+
+def is_contained(fc, clip_features):
+    """Verifica si la extensión de una capa queda completamente dentro del área de recorte"""
     try:
-        count = int(arcpy.GetCount_management(fc)[0])
-        return count == 0
+        desc = describe(fc)
+        extent = desc.extent
+        clip_extent = get_clip_extent(clip_features, desc.spatialReference)
+        if not extents_overlap(extent, clip_extent):
+            return False
+        # Descarte rápido: la caja de la capa debe caber en la caja del recorte
+        if not (clip_extent.XMin <= extent.XMin and extent.XMax <= clip_extent.XMax and
+                clip_extent.YMin <= extent.YMin and extent.YMax <= clip_extent.YMax):
+            return False
+        clip_geometry = get_clip_geometry(clip_features, desc.spatialReference)
+        if clip_geometry is None:
+            return False
+        corners = arcpy.Array([arcpy.Point(extent.XMin, extent.YMin), arcpy.Point(extent.XMin, extent.YMax),
+                               arcpy.Point(extent.XMax, extent.YMax), arcpy.Point(extent.XMax, extent.YMin)])
+        return clip_geometry.contains(arcpy.Polygon(corners, desc.spatialReference))
     except Exception as e:
-        print(f"Error verificando si la capa está vacía: {e}")
+        print(f"Error verificando si la capa está contenida {fc}: {e}")
+        return False
+
+# Dimensión que debe devolver Geometry.intersect según el tipo de geometría de la capa; los demás
+# tipos (p. ej. MultiPatch) se recortan con la herramienta Clip
+INTERSECT_DIMENSIONS = {"Point": 1, "Multipoint": 1, "Polyline": 2, "Polygon": 4}
+
+def clip_feature(shape, clip_geometry, dimension):
+    """Recorta una entidad con el área de recorte; devuelve None si queda fuera"""
+    if shape is None or clip_geometry.disjoint(shape):
+        return None
+    if clip_geometry.contains(shape):
+        return shape
+    clipped = shape.intersect(clip_geometry, dimension)
+    return clipped if clipped.pointCount > 0 else None
+
+# Valores de los campos clave de las entidades escritas en la salida, por (capa, campo en mayúsculas)
+clipped_keys = {}
+
+def get_relationships():
+    """Obtiene las relationship classes del catálogo como (capa origen, clave primaria, tabla destino, clave foránea)"""
+    relationships = []
+    for item in catalog.values():
+        if item.dataType != "RelationshipClass":
+            continue
+        # originClassKeys entrega tuplas (campo, rol, ...) cuyo largo cambia entre versiones de arcpy
+        keys = {key[1]: key[0] for key in item.originClassKeys}
+        if "OriginPrimary" not in keys or "OriginForeign" not in keys:
+            continue
+        for origin in item.originClassNames:
+            for destination in item.destinationClassNames:
+                relationships.append((origin, keys["OriginPrimary"], destination, keys["OriginForeign"]))
+    return relationships
+
+def get_key_fields(fc):
+    """Obtiene los campos de una capa cuyos valores relacionan sus entidades con las tablas TB"""
+    if not RELATIONAL_TB:
+        return []
+    wanted = {field.upper() for field in KEY_FIELDS}
+    wanted.update(primary.upper() for origin, primary, _, _ in get_relationships() if origin == os.path.basename(fc))
+    return [f.name for f in describe(fc).fields if f.name.upper() in wanted]
+
+def collect_keys(fc, key_fields, rows):
+    """Agrega al conjunto de claves recortadas los valores de las filas (solo campos clave) de una capa"""
+    sets = [clipped_keys.setdefault((os.path.basename(fc), field.upper()), set()) for field in key_fields]
+    for row in rows:
+        for values, value in zip(sets, row):
+            if value is not None:
+                values.add(value)
+
+def copy_contained(fc, output_fc):
+    """Copia completa una capa contenida en el área de recorte, registra sus claves para las tablas TB
+    y devuelve el número de entidades copiadas"""
+    arcpy.CopyFeatures_management(fc, output_fc)
+    key_fields = get_key_fields(fc)
+    if key_fields:
+        with arcpy.da.SearchCursor(fc, key_fields) as cursor:
+            collect_keys(fc, key_fields, cursor)
+    # GetCount lee el conteo guardado en la GDB, sin recorrer las entidades
+    return int(arcpy.GetCount_management(output_fc)[0])
+
+# spatial_filter de arcpy.da.SearchCursor existe desde ArcGIS Pro 3.2; pasa a False en versiones anteriores
+spatial_filter_supported = True
+
+def search_features(fc, fields, clip_geometry):
+    """Abre un cursor que entrega solo las entidades que tocan el área de recorte
+
+    En ArcGIS Pro anterior a 3.2 el cursor no acepta spatial_filter y lanza TypeError: se avisa una vez
+    y desde entonces se leen las capas completas, descartando en clip_feature las entidades de fuera.
+    """
+    global spatial_filter_supported
+    if spatial_filter_supported:
+        try:
+            return arcpy.da.SearchCursor(fc, fields, spatial_filter=clip_geometry)
+        except TypeError:
+            spatial_filter_supported = False
+            print("Esta versión de ArcGIS Pro no admite spatial_filter (requiere 3.2): se leen las capas completas")
+    return arcpy.da.SearchCursor(fc, fields)
+
+def stream_clip(fc, clip_features, output_fc):
+    """Recorta una capa en una sola pasada con cursores y devuelve el número de entidades escritas
+
+    La capa de salida se crea al llegar la primera entidad que sobrevive al recorte,
+    por lo que un recorte vacío no escribe ni elimina nada. Las claves de las
+    entidades escritas se guardan para el recorte relacional de las tablas TB.
+    """
+    desc = describe(fc)
+    clip_geometry = get_clip_geometry(clip_features, desc.spatialReference)
+    if clip_geometry is None:
+        return 0
+    dimension = INTERSECT_DIMENSIONS.get(desc.shapeType)
+    if dimension is None:
+        # Tipos que Geometry.intersect no recorta (p. ej. MultiPatch): herramienta Clip, sin dejar salidas vacías
+        arcpy.Clip_analysis(fc, clip_features, output_fc)
+        written = int(arcpy.GetCount_management(output_fc)[0])
+        if not written:
+            arcpy.Delete_management(output_fc)
+            return 0
+        key_fields = get_key_fields(fc)
+        if key_fields:
+            with arcpy.da.SearchCursor(output_fc, key_fields) as cursor:
+                collect_keys(fc, key_fields, cursor)
+        return written
+    fields = ["SHAPE@"] + [f.name for f in desc.fields if f.editable and f.type != "Geometry"]
+    # Las claves no editables (OBJECTID, GlobalID) se leen al final de la fila, sin escribirse en la salida
+    key_fields = get_key_fields(fc)
+    read_fields = fields + [field for field in key_fields if field not in fields]
+    key_positions = [read_fields.index(field) for field in key_fields]
+    keys = []
+    written = 0
+    output = None
+    try:
+        # Las entidades se leen en el sistema de la capa, el mismo del área proyectada, y el filtro espacial
+        # entrega solo las que tocan el área en lugar de la capa completa
+        with search_features(fc, read_fields, clip_geometry) as cursor:
+            for row in cursor:
+                shape = clip_feature(row[0], clip_geometry, dimension)
+                if shape is None:
+                    continue
+                if output is None:
+                    arcpy.CreateFeatureclass_management(
+                        os.path.dirname(output_fc), os.path.basename(output_fc), desc.shapeType, desc.catalogPath,
+                        "ENABLED" if desc.hasM else "DISABLED", "ENABLED" if desc.hasZ else "DISABLED",
+                        desc.spatialReference)
+                    output = arcpy.da.InsertCursor(output_fc, fields)
+                output.insertRow((shape,) + tuple(row[1:len(fields)]))
+                if key_positions:
+                    keys.append([row[i] for i in key_positions])
+                written += 1
+    finally:
+        if output is not None:
+            del output
+    collect_keys(fc, key_fields, keys)
+    return written
+
+def get_table_filters(table):
+    """Obtiene (campo de la tabla, claves permitidas) para recortar una tabla TB, o [] si no se relaciona
+
+    Las relationship classes que tienen la tabla como destino mandan; si no hay, se usan los
+    campos de KEY_FIELDS que tenga la tabla con las claves de todas las capas recortadas.
+    """
+    filters = [(foreign, clipped_keys.get((origin, primary.upper()), set()))
+               for origin, primary, destination, foreign in get_relationships() if destination == table]
+    if filters:
+        return filters
+    table_fields = {f.name.upper(): f.name for f in describe(table).fields}
+    for field in KEY_FIELDS:
+        if field.upper() in table_fields:
+            values = set()
+            for (_, key_field), keys in clipped_keys.items():
+                if key_field == field.upper():
+                    values |= keys
+            filters.append((table_fields[field.upper()], values))
+    return filters
+
+def is_relational(table):
+    """Verifica si una tabla TB se recorta por sus claves: es destino de una relationship class o tiene un KEY_FIELDS"""
+    if not RELATIONAL_TB:
+        return False
+    if any(destination == table for _, _, destination, _ in get_relationships()):
         return True
+    table_fields = {f.name.upper() for f in describe(table).fields}
+    return any(field.upper() in table_fields for field in KEY_FIELDS)
+
+def copy_table(table, output_table, filters=None):
+    """Copia una tabla por bloques de filas, completa o solo con las filas relacionadas con el recorte
+
+    La tabla se recorre una sola vez con un cursor, sin GetCount previo: una tabla vacía o sin filas
+    relacionadas simplemente no crea salida. Si falta algún campo clave, la tabla se copia completa.
+    Devuelve el número de filas escritas.
+    """
+    desc = describe(table)
+    # Rutas completas: la copia no depende del workspace activo
+    source = desc.catalogPath
+    fields = [f.name for f in desc.fields if f.editable]
+    table_fields = {f.name.upper(): f.name for f in desc.fields}
+    missing = [field for field, _ in filters or [] if field.upper() not in table_fields]
+    if missing:
+        print(f"Campos clave no encontrados en {table} ({', '.join(missing)}): se copia la tabla completa")
+        filters = None
+    # Las claves no editables (OBJECTID, GlobalID) se leen al final de la fila, sin escribirse en la salida
+    read_fields = list(fields)
+    positions = []
+    for field, values in filters or []:
+        name = table_fields[field.upper()]
+        if name not in read_fields:
+            read_fields.append(name)
+        positions.append((read_fields.index(name), values))
+    written = 0
+    output = None
+    try:
+        with arcpy.da.SearchCursor(source, read_fields) as cursor:
+            while True:
+                block = list(itertools.islice(cursor, TABLE_BLOCK_ROWS))
+                if not block:
+                    break
+                if filters is not None:
+                    block = [row for row in block if any(row[i] in values for i, values in positions)]
+                if not block:
+                    continue
+                if output is None:
+                    arcpy.CreateTable_management(os.path.dirname(output_table), os.path.basename(output_table), source)
+                    output = arcpy.da.InsertCursor(output_table, fields)
+                for row in block:
+                    output.insertRow(row[:len(fields)])
+                written += len(block)
+    finally:
+        if output is not None:
+            del output
+    return written
+
+def export_table(table, gdb_output, filters=None):
+    """Copia una tabla TB a la salida e informa el resultado"""
+    try:
+        written = copy_table(table, os.path.join(gdb_output, os.path.basename(table)), filters)
+        if filters is None:
+            print(f"Copiada: {table} ({written} filas)" if written else f"Tabla vacía, no copiada: {table}")
+        elif written:
+            print(f"Copiadas {written} filas relacionadas con el recorte: {table}")
+        else:
+            print(f"Sin filas relacionadas con el recorte, no copiada: {table}")
+    except Exception as e:
+        print(f"Error copiando tabla {table}: {e}")
+
+def classify_tables(tables):
+    """Separa las tablas TB en las que se copian completas y las que se recortan por sus claves"""
+    plain, relational = [], []
+    for table in tables:
+        if not table.endswith("TB"):
+            print(f"Tabla no procesada (no termina en TB): {table}")
+        elif is_relational(table):
+            relational.append(table)
+        else:
+            plain.append(table)
+    return plain, relational
+
+def copy_plain_tables(tables, scratch_gdb):
+    """Proceso de tablas: copia a una GDB temporal las tablas TB que no dependen del recorte
+
+    Corre en su propio proceso, con su propio arcpy, mientras el proceso principal recorta las capas,
+    y no toca la GDB de salida. Recibe rutas completas y devuelve (tabla, filas escritas, error) por tabla.
+    """
+    arcpy.CreateFileGDB_management(os.path.dirname(scratch_gdb), os.path.basename(scratch_gdb))
+    results = []
+    for table in tables:
+        name = os.path.basename(table)
+        try:
+            results.append((name, copy_table(table, os.path.join(scratch_gdb, name)), None))
+        except Exception as e:
+            results.append((name, 0, str(e)))
+    return results
+
+def merge_plain_tables(pending, plain, scratch_gdb, gdb_output):
+    """Pasa a la salida las tablas que copió el proceso de tablas; si el proceso falló, las copia aquí"""
+    try:
+        results = pending.result()
+    except Exception as e:
+        print(f"Error en el proceso de tablas ({e}); se copian en el proceso principal")
+        for table in plain:
+            export_table(table, gdb_output)
+        return
+    for name, written, error in results:
+        if error:
+            print(f"Error copiando tabla {name}: {error}")
+        elif not written:
+            print(f"Tabla vacía, no copiada: {name}")
+        else:
+            try:
+                arcpy.Copy_management(os.path.join(scratch_gdb, name), os.path.join(gdb_output, name))
+                print(f"Copiada: {name} ({written} filas)")
+            except Exception as e:
+                print(f"Error copiando tabla {name}: {e}")
+
+def start_table_process(plain, scratch_gdb):
+    """Lanza el proceso de tablas para las tablas TB completas; devuelve (proceso, resultado pendiente) o None"""
+    if not plain:
+        return None
+    print(f"\nCopiando {len(plain)} tablas TB en otro proceso, en paralelo al recorte...")
+    table_process = ProcessPoolExecutor(max_workers=1)
+    return table_process, table_process.submit(copy_plain_tables, [describe(table).catalogPath for table in plain],
+                                               scratch_gdb)
+
+def rebuild_spatial_index(fc):
+    """Vuelve a crear el índice espacial de una capa con la grilla calculada para sus entidades recortadas"""
+    try:
+        result = arcpy.CalculateDefaultGridIndex_management(fc)
+        grids = [float(result.getOutput(i)) for i in range(3)]
+        if arcpy.Describe(fc).hasSpatialIndex:
+            arcpy.RemoveSpatialIndex_management(fc)
+        arcpy.AddSpatialIndex_management(fc, *grids)
+        return None
+    except Exception as e:
+        return f"Error reconstruyendo el índice espacial de {fc}: {e}"
+
+def optimize_output(gdb_output):
+    """Reindexa las capas de la GDB de salida, la compacta y muestra el espacio recuperado"""
+    start = time.time()
+    initial_size = folder_size(gdb_output)
+    layers = [os.path.join(root, name)
+              for root, _, names in arcpy.da.Walk(gdb_output, datatype="FeatureClass") for name in names]
+    print(f"\nOptimizando {len(layers)} capas de la GDB de salida...")
+
+    if OPTIMIZE_PROCESSES > 1 and len(layers) > 1:
+        # Cada capa se reindexa en un proceso del grupo; arcpy bloquea solo el esquema de esa capa
+        with ProcessPoolExecutor(max_workers=min(OPTIMIZE_PROCESSES, len(layers))) as pool:
+            errors = list(pool.map(rebuild_spatial_index, layers))
+    else:
+        errors = [rebuild_spatial_index(fc) for fc in layers]
+    for error in errors:
+        if error:
+            print(error)
+
+    # Se compacta con el grupo de procesos ya cerrado: ninguna capa queda bloqueada
+    try:
+        arcpy.Compact_management(gdb_output)
+    except Exception as e:
+        print(f"Error compactando la GDB de salida: {e}")
+    final_size = folder_size(gdb_output)
+    mb = 1024 * 1024
+    print(f"GDB optimizada en {time.time() - start:.2f} segundos: {initial_size / mb:.1f} MB -> "
+          f"{final_size / mb:.1f} MB ({(initial_size - final_size) / mb:.1f} MB recuperados)")
+
+    if COMPRESSED_COPY:
+        name, extension = os.path.splitext(gdb_output)
+        compressed = f"{name}_comprimida{extension}"
+        try:
+            arcpy.Copy_management(gdb_output, compressed)
+            arcpy.CompressFileGeodatabaseData_management(compressed)
+            print(f"Copia comprimida de solo lectura: {compressed} ({folder_size(compressed) / mb:.1f} MB)")
+        except Exception as e:
+            print(f"Error creando la copia comprimida: {e}")
+
+# Archivo que aparta el nombre de la GDB de salida mientras dura el recorte: CartoBase_3.gdb.reserva
+RESERVATION_SUFFIX = ".reserva"
 
 def get_unique_gdb_name(base_folder):
-    """Genera un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc."""
-    counter = 1
+    """Genera y reserva un nombre único para la GDB de salida siguiendo el formato CartoBase_1, CartoBase_2, etc.
+
+    El número sale de una sola lectura de la carpeta (el mayor CartoBase_N más uno), sin probar los nombres
+    uno por uno, y el nombre se aparta creando de forma exclusiva su archivo de reserva, para que dos
+    recortes que empiezan a la vez en la misma carpeta no elijan el mismo nombre.
+    """
+    pattern = re.compile(r"CartoBase_(\d+)\.gdb(?:\.reserva)?", re.IGNORECASE)
+    with os.scandir(base_folder) as entries:
+        matches = [pattern.fullmatch(entry.name) for entry in entries]
+    counter = max((int(match.group(1)) for match in matches if match), default=0) + 1
     while True:
-        gdb_name = f"CartoBase_{counter}.gdb"
-        gdb_path = os.path.join(base_folder, gdb_name)
-        if not arcpy.Exists(gdb_path):
+        gdb_path = os.path.join(base_folder, f"CartoBase_{counter}.gdb")
+        try:
+            os.close(os.open(gdb_path + RESERVATION_SUFFIX, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            counter += 1  # Otro recorte lo reservó después de leer la carpeta
+            continue
+        if not os.path.exists(gdb_path):
             return gdb_path
+        # Otro recorte terminó con este nombre y liberó su reserva después de leer la carpeta
+        os.remove(gdb_path + RESERVATION_SUFFIX)
         counter += 1
 
+def release_gdb_name(gdb_path):
+    """Elimina la reserva del nombre de la GDB de salida al terminar el recorte"""
+    try:
+        os.remove(gdb_path + RESERVATION_SUFFIX)
+    except FileNotFoundError:
+        pass
+
 def delete_unwanted_files(gdb_path):
     """Elimina archivos no deseados que se crean automáticamente en la GDB"""
     try:
@@ -81,92 +563,189 @@ def delete_unwanted_files(gdb_path):
     except Exception as e:
         print(f"Error eliminando archivos no deseados: {e}")
 
-def clip_layers(gdb_input, clip_features, gdb_output):
-    """Procesa las capas y datasets recortando con un shapefile"""
+def format_duration(seconds):
+    """Formatea una duración como 1h05m, 4m12s o 37s"""
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+def folder_size(path):
+    """Suma el tamaño de los archivos de una GDB"""
     try:
-        arcpy.env.workspace = gdb_input
-
-        # Procesar capas en la raíz
-        print("\nProcesando capas en la raíz...")
-        for fc in arcpy.ListFeatureClasses():
+        with os.scandir(path) as entries:
+            return sum(entry.stat().st_size for entry in entries if entry.is_file())
+    except OSError:
+        return 0
+
+class ProgressReporter:
+    """Avance del recorte ponderado por entidades y vértices, con rendimiento y tiempo restante
+
+    Cada capa pesa sus entidades por los vértices supuestos para su tipo de geometría. El tiempo
+    restante se calcula con el peso terminado por segundo y se afina al terminar cada capa; el
+    rendimiento en entidades por segundo es el de las capas terminadas en la última ventana, y el
+    de MB por segundo se mide con el tamaño de la GDB solo al imprimir, cada PROGRESS_INTERVAL segundos.
+    """
+
+    def __init__(self, layers, gdb_output, interval=PROGRESS_INTERVAL):
+        self.gdb_output = gdb_output
+        self.interval = interval
+        self.weights = {}
+        for fc in layers:
+            # GetCount lee el conteo guardado en la GDB, sin recorrer las entidades
             try:
-                print(f"Verificando intersección para: {fc}...")
-                if not has_intersection(fc, clip_features):
-                    print(f"Sin intersección: {fc}. Omitiendo...")
-                    continue
-
-                output_fc = os.path.join(gdb_output, os.path.basename(fc))
-                arcpy.Clip_analysis(fc, clip_features, output_fc)
-
-                if is_empty(output_fc):
-                    arcpy.Delete_management(output_fc)
-                    print(f"Capa recortada vacía eliminada: {fc}")
-                else:
-                    print(f"Recortada: {fc}")
-            except Exception as e:
-                print(f"Error en capa raíz {fc}: {str(e)}")
-                continue
-
-        # Procesar datasets
-        print("\nProcesando Feature Datasets...")
-        all_datasets = get_all_datasets(gdb_input)
-
-        if not all_datasets:
-            print("¡No se encontraron datasets en la GDB de entrada!")
+                count = int(arcpy.GetCount_management(fc)[0])
+            except Exception:
+                count = 0
+            self.weights[fc] = max(count, 1) * VERTICES_PER_SHAPE.get(describe(fc).shapeType, 20)
+        self.total = sum(self.weights.values())
+        self.done = 0
+        self.layers_done = 0
+        self.recent = collections.deque()
+        self.start = self.last_report = time.time()
+        self.last_size = folder_size(gdb_output)
+
+    def layer_done(self, fc, features):
+        """Suma una capa terminada con las entidades escritas e imprime el avance si corresponde"""
+        now = time.time()
+        self.done += self.weights.pop(fc, 0)
+        self.layers_done += 1
+        self.recent.append((now, features))
+        while self.recent and self.recent[0][0] < now - THROUGHPUT_WINDOW:
+            self.recent.popleft()
+        if self.weights and now - self.last_report < self.interval:
             return
+        # El tamaño de la GDB se mide una vez por mensaje, no por capa
+        size = folder_size(self.gdb_output)
+        mb_s = (size - self.last_size) / max(now - self.last_report, 1e-9) / (1024 * 1024)
+        self.last_size = size
+        self.last_report = now
+        elapsed = now - self.start
+        window = max(now - max(self.start, now - THROUGHPUT_WINDOW), 1e-9)
+        features_s = sum(r[1] for r in self.recent) / window
+        fraction = self.done / self.total if self.total else 1.0
+        if not self.weights:
+            remaining = "terminado"
+        elif self.done:
+            remaining = f"quedan ~{format_duration(elapsed * (self.total - self.done) / self.done)}"
+        else:
+            remaining = "calculando el tiempo restante"
+        print(f"Avance {fraction:.0%} ({self.layers_done}/{self.layers_done + len(self.weights)} capas) "
+              f"en {format_duration(elapsed)}, {features_s:.0f} entidades/s, {mb_s:.1f} MB/s, {remaining}")
+
+def clip_spatial_layers(root_fcs, datasets, clip_features, gdb_output):
+    """Recorta las capas raíz y las de cada feature dataset"""
+    progress = ProgressReporter(list(root_fcs) + [fc for fds in datasets for fc in datasets[fds]], gdb_output)
+
+    # Procesar capas en la raíz
+    print("\nProcesando capas en la raíz...")
+    for fc in root_fcs:
+        written = 0
+        try:
+            output_fc = os.path.join(gdb_output, os.path.basename(fc))
+            if is_contained(fc, clip_features):
+                written = copy_contained(fc, output_fc)
+                print(f"Copiada completa (dentro del área de recorte): {fc}")
+                continue
 
-        for fds in all_datasets:
-            try:
-                if not arcpy.Exists(os.path.join(gdb_input, fds)):
-                    print(f"Dataset no existe en input: {fds}")
-                    continue
-
-                desc = arcpy.Describe(fds)
-                output_fds = os.path.join(gdb_output, fds)
+            print(f"Verificando intersección para: {fc}...")
+            if not has_intersection(fc, clip_features):
+                print(f"Sin intersección: {fc}. Omitiendo...")
+                continue
 
-                # Crear dataset en la salida solo si tiene capas válidas
-                dataset_has_data = False
-                for fc in arcpy.ListFeatureClasses("", "", fds):
-                    try:
+            written = stream_clip(fc, clip_features, output_fc)
+            if written:
+                print(f"Recortada: {fc}")
+            else:
+                print(f"Recorte vacío, sin salida: {fc}")
+        except Exception as e:
+            print(f"Error en capa raíz {fc}: {str(e)}")
+            continue
+        finally:
+            progress.layer_done(fc, written)
+
+    # Procesar datasets
+    print("\nProcesando Feature Datasets...")
+    all_datasets = list(datasets)
+
+    if not all_datasets:
+        print("¡No se encontraron datasets en la GDB de entrada!")
+        return
+
+    for fds in all_datasets:
+        try:
+            desc = describe(fds)
+            output_fds = os.path.join(gdb_output, fds)
+
+            # Crear dataset en la salida solo si tiene capas válidas
+            dataset_has_data = False
+            for fc in datasets[fds]:
+                written = 0
+                try:
+                    contained = is_contained(fc, clip_features)
+                    if not contained:
                         print(f"Verificando intersección para: {fc}...")
                         if not has_intersection(fc, clip_features):
                             print(f"Sin intersección: {fc}. Omitiendo...")
                             continue
 
-                        if not dataset_has_data:
-                            arcpy.CreateFeatureDataset_management(gdb_output, fds, desc.spatialReference)
-                            print(f"\nDataset creado: {fds}")
-                            dataset_has_data = True
-
-                        output_fc = os.path.join(gdb_output, fds, os.path.basename(fc))
-                        arcpy.Clip_analysis(fc, clip_features, output_fc)
-
-                        if is_empty(output_fc):
-                            arcpy.Delete_management(output_fc)
-                            print(f"Capa recortada vacía eliminada: {fds}/{os.path.basename(fc)}")
-                        else:
-                            print(f"Recortada: {fds}/{os.path.basename(fc)}")
-                    except Exception as e:
-                        print(f"Error en capa {fds}/{fc}: {str(e)}")
+                    if not dataset_has_data:
+                        arcpy.CreateFeatureDataset_management(gdb_output, fds, desc.spatialReference)
+                        print(f"\nDataset creado: {fds}")
+                        dataset_has_data = True
+
+                    output_fc = os.path.join(gdb_output, fds, os.path.basename(fc))
+                    if contained:
+                        written = copy_contained(fc, output_fc)
+                        print(f"Copiada completa (dentro del área de recorte): {fds}/{os.path.basename(fc)}")
                         continue
 
-                if not dataset_has_data:
-                    print(f"Dataset vacío, no incluido: {fds}")
-            except Exception as dataset_error:
-                print(f"\nError crítico en dataset {fds}: {str(dataset_error)}")
-                continue
+                    written = stream_clip(fc, clip_features, output_fc)
+                    if written:
+                        print(f"Recortada: {fds}/{os.path.basename(fc)}")
+                    else:
+                        print(f"Recorte vacío, sin salida: {fds}/{os.path.basename(fc)}")
+                except Exception as e:
+                    print(f"Error en capa {fds}/{fc}: {str(e)}")
+                    continue
+                finally:
+                    progress.layer_done(fc, written)
 
-        # Procesar tablas en la raíz
-        print("\nProcesando tablas en la raíz...")
-        for table in arcpy.ListTables():
-            if table.endswith("TB"):
-                if not is_empty(table):
-                    arcpy.Copy_management(table, os.path.join(gdb_output, os.path.basename(table)))
-                    print(f"Copiada: {table}")
-                else:
-                    print(f"Tabla vacía, no copiada: {table}")
-            else:
-                print(f"Tabla no procesada (no termina en TB): {table}")
+            if not dataset_has_data:
+                print(f"Dataset vacío, no incluido: {fds}")
+        except Exception as dataset_error:
+            print(f"\nError crítico en dataset {fds}: {str(dataset_error)}")
+            continue
+
+def clip_layers(gdb_input, clip_features, gdb_output):
+    """Procesa las capas y datasets recortando con un shapefile"""
+    try:
+        arcpy.env.workspace = gdb_input
+        root_fcs, datasets, tables = load_catalog(gdb_input)
+        clipped_keys.clear()
+
+        # arcpy no admite geoprocesos concurrentes desde hilos de un proceso: las tablas TB completas se copian
+        # en un proceso aparte a una GDB temporal mientras se recortan las capas y se pasan a la salida al final;
+        # las relacionales esperan al recorte, que es cuando se conocen las claves de las entidades recortadas
+        plain, relational = classify_tables(tables)
+        scratch_folder = tempfile.mkdtemp(prefix="tablas_tb_")
+        scratch_gdb = os.path.join(scratch_folder, "tablas.gdb")
+        table_stage = start_table_process(plain, scratch_gdb)
+        try:
+            clip_spatial_layers(root_fcs, datasets, clip_features, gdb_output)
+
+            print("\nProcesando tablas en la raíz...")
+            if table_stage:
+                merge_plain_tables(table_stage[1], plain, scratch_gdb, gdb_output)
+            for table in relational:
+                export_table(table, gdb_output, get_table_filters(table))
+        finally:
+            if table_stage:
+                table_stage[0].shutdown()
+            shutil.rmtree(scratch_folder, ignore_errors=True)
 
         print("\n¡Proceso finalizado! Verifique los mensajes de advertencia.")
 
@@ -187,21 +766,26 @@ def main():
     # Solicitar rutas al usuario
     gdb_input = input("Ingrese la ruta de la GDB de entrada: ").strip()
     clip_features = input("Ingrese la ruta del shapefile para el recorte: ").strip()
-    output_folder = os.path.dirname(gdb_input)
+    # Una GDB indicada sin carpeta está en la carpeta actual
+    output_folder = os.path.dirname(gdb_input) or "."
 
-    # Crear un nombre único para la GDB de salida
+    # Crear un nombre único para la GDB de salida; su reserva se libera aunque el recorte falle o se interrumpa
     gdb_output = get_unique_gdb_name(output_folder)
-
-    # Crear la GDB de salida
-    arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
-    print(f"\nNueva GDB creada: {gdb_output}")
-
-    # Validar rutas de entrada
-    if all([arcpy.Exists(gdb_input), arcpy.Exists(clip_features)]):
-        clip_layers(gdb_input, clip_features, gdb_output)
-        delete_unwanted_files(gdb_output)
-    else:
-        print("Error: Verifique que las rutas de la GDB de entrada y el shapefile sean correctas.")
+    try:
+        # Crear la GDB de salida
+        arcpy.CreateFileGDB_management(output_folder, os.path.basename(gdb_output))
+        print(f"\nNueva GDB creada: {gdb_output}")
+
+        # Validar rutas de entrada
+        if all([arcpy.Exists(gdb_input), arcpy.Exists(clip_features)]):
+            clip_layers(gdb_input, clip_features, gdb_output)
+            delete_unwanted_files(gdb_output)
+            if OPTIMIZE_OUTPUT:
+                optimize_output(gdb_output)
+        else:
+            print("Error: Verifique que las rutas de la GDB de entrada y el shapefile sean correctas.")
+    finally:
+        release_gdb_name(gdb_output)
 
     # Finalizar el cronómetro y calcular tiempo
     elapsed_time = time.time() - start_time
@@ -57,12 +57,16 @@ def generar_arbol_principal(carpeta_madre):
         lineas.extend(listar_contenido(sub_path, "    ", no_recursion=(item.upper() == "APRX")))
     return lineas
 
-def analizar_campos(feature_class):
-    """Devuelve dos listas: campos con datos y campos sin datos."""
+def analizar_campos(feature_class, fields=None):
+    """Devuelve dos listas: campos con datos y campos sin datos.
+
+    Si se pasan los campos ya descritos (p. ej. desde Describe) no se vuelven a listar.
+    """
     campos_con_datos = []
     campos_sin_datos = []
     try:
-        campos = [f.name for f in arcpy.ListFields(feature_class) if f.type not in ["Geometry", "OID"]]
+        fields = fields if fields is not None else arcpy.ListFields(feature_class)
+        campos = [f.name for f in fields if f.type not in ["Geometry", "OID"]]
         for campo in campos:
             valores = [row[0] for row in arcpy.da.SearchCursor(feature_class, campo)]
             if all(v is None for v in valores):
@@ -80,29 +84,25 @@ def listar_aclaraciones(carpeta_gdb):
         gdbs = [item for item in os.listdir(carpeta_gdb) if item.lower().endswith(".gdb")]
         for gdb in gdbs:
             gdb_path = os.path.join(carpeta_gdb, gdb)
-            arcpy.env.workspace = gdb_path
+            # Una sola descripción de la GDB trae sus datasets, capas, tablas y campos
+            hijos = arcpy.Describe(gdb_path).children
             
             # Revisar Feature Datasets y sus capas
-            datasets = arcpy.ListDatasets("", "Feature") or []
-            for fds in datasets:
-                arcpy.env.workspace = os.path.join(gdb_path, fds)
-                fcs = arcpy.ListFeatureClasses() or []
+            for fds in (h for h in hijos if h.dataType == "FeatureDataset"):
                 fc_info = []
-                for fc in fcs:
-                    campos_con_datos, campos_sin_datos = analizar_campos(fc)
+                for fc in (h for h in fds.children if h.dataType == "FeatureClass"):
+                    campos_con_datos, campos_sin_datos = analizar_campos(fc.catalogPath, fc.fields)
                     if campos_sin_datos:  # Solo incluir si hay campos sin datos
-                        fc_info.append((fc, campos_sin_datos))
+                        fc_info.append((fc.name, campos_sin_datos))
                 if fc_info:
-                    aclaraciones.append((gdb, fds, "FeatureClass", fc_info))
+                    aclaraciones.append((gdb, fds.name, "FeatureClass", fc_info))
             
             # Revisar tablas independientes
-            arcpy.env.workspace = gdb_path
-            tablas = arcpy.ListTables() or []
             tabla_info = []
-            for tabla in tablas:
-                campos_con_datos, campos_sin_datos = analizar_campos(tabla)
+            for tabla in (h for h in hijos if h.dataType == "Table"):
+                campos_con_datos, campos_sin_datos = analizar_campos(tabla.catalogPath, tabla.fields)
                 if campos_sin_datos:  # Solo incluir si hay campos sin datos
-                    tabla_info.append((tabla, campos_sin_datos))
+                    tabla_info.append((tabla.name, campos_sin_datos))
             if tabla_info:
                 aclaraciones.append((gdb, "Tablas", "Table", tabla_info))
     except Exception as e:
@@ -0,0 +1,112 @@
+import importlib.util
+import sys
+import types
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+SCRIPT = Path(__file__).resolve().parent.parent / "CortadorTB_2025.py"
+
+class CursorFalso:
+    """Cursor de lectura sobre una lista de filas en diccionarios, con solo los campos pedidos."""
+
+    def __init__(self, filas, campos):
+        self.filas = [tuple(fila[campo] for campo in campos) for fila in filas]
+
+    def __enter__(self):
+        return iter(self.filas)
+
+    def __exit__(self, *error):
+        return False
+
+def arcpy_falso(tablas, salidas):
+    """Módulo arcpy mínimo: lee de tablas y guarda en salidas las filas insertadas, por ruta."""
+    arcpy = types.ModuleType("arcpy")
+    arcpy.env = SimpleNamespace()
+
+    def describir(ruta):
+        raise OSError(f"No existe: {ruta}")
+
+    arcpy.Describe = describir
+    arcpy.CreateFileGDB_management = lambda carpeta, nombre: None
+    arcpy.Copy_management = lambda origen, destino: salidas.__setitem__(destino, list(salidas[origen]))
+    arcpy.CreateTable_management = lambda carpeta, nombre, plantilla: salidas.setdefault(f"{carpeta}/{nombre}", [])
+    arcpy.da = SimpleNamespace(
+        SearchCursor=lambda ruta, campos: CursorFalso(tablas[ruta], campos),
+        InsertCursor=lambda ruta, campos: SimpleNamespace(insertRow=salidas[ruta].append))
+    return arcpy
+
+def campo(nombre, editable=True):
+    return SimpleNamespace(name=nombre, editable=editable, type="Integer")
+
+class TestCortadorTB(unittest.TestCase):
+    def setUp(self):
+        self.tablas = {"entrada.gdb/PrediosTB": [
+            {"OBJECTID": 1, "ID_PREDIO": "A", "VALOR": 10},
+            {"OBJECTID": 2, "ID_PREDIO": "B", "VALOR": 20},
+            {"OBJECTID": 3, "ID_PREDIO": "C", "VALOR": 30},
+        ]}
+        self.salidas = {}
+        with patch.dict(sys.modules, {"arcpy": arcpy_falso(self.tablas, self.salidas)}):
+            spec = importlib.util.spec_from_file_location("CortadorTB_2025", SCRIPT)
+            self.cortador = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self.cortador)
+        self.cortador.catalog["PrediosTB"] = self.cortador.catalog["entrada.gdb/PrediosTB"] = SimpleNamespace(
+            dataType="Table", catalogPath="entrada.gdb/PrediosTB",
+            fields=[campo("OBJECTID", editable=False), campo("ID_PREDIO"), campo("VALOR")])
+
+    def test_relaciones_con_claves_de_tres_elementos(self):
+        self.cortador.catalog["Predios_PrediosTB"] = SimpleNamespace(
+            dataType="RelationshipClass",
+            originClassKeys=[("OBJECTID", "OriginPrimary", ""), ("PREDIO_OID", "OriginForeign", "")],
+            originClassNames=["Predios"], destinationClassNames=["PrediosTB"])
+
+        self.assertEqual(self.cortador.get_relationships(), [("Predios", "OBJECTID", "PrediosTB", "PREDIO_OID")])
+
+    def test_copiar_tabla_filtrada_por_clave_no_editable(self):
+        escritas = self.cortador.copy_table("PrediosTB", "salida.gdb/PrediosTB", [("OBJECTID", {1, 3})])
+
+        self.assertEqual(escritas, 2)
+        self.assertEqual(self.salidas["salida.gdb/PrediosTB"], [("A", 10), ("C", 30)])
+
+    def test_copiar_tabla_completa_si_falta_la_clave(self):
+        escritas = self.cortador.copy_table("PrediosTB", "salida.gdb/PrediosTB", [("PREDIO_OID", {1})])
+
+        self.assertEqual(escritas, 3)
+        self.assertEqual(self.salidas["salida.gdb/PrediosTB"], [("A", 10), ("B", 20), ("C", 30)])
+
+    def test_proceso_de_tablas_copia_a_la_gdb_temporal(self):
+        resultados = self.cortador.copy_plain_tables(["entrada.gdb/PrediosTB", "entrada.gdb/FaltaTB"],
+                                                     "temporal/tablas.gdb")
+
+        self.assertEqual(resultados, [("PrediosTB", 3, None), ("FaltaTB", 0, "No existe: entrada.gdb/FaltaTB")])
+        self.assertEqual(len(self.salidas["temporal/tablas.gdb/PrediosTB"]), 3)
+
+    def test_fusion_de_tablas_del_proceso(self):
+        self.salidas["temporal/tablas.gdb/PrediosTB"] = [("A", 10)]
+        pendiente = Future()
+        pendiente.set_result([("PrediosTB", 1, None), ("VaciaTB", 0, None)])
+
+        self.cortador.merge_plain_tables(pendiente, ["PrediosTB", "VaciaTB"], "temporal/tablas.gdb", "salida.gdb")
+
+        self.assertEqual(self.salidas["salida.gdb/PrediosTB"], [("A", 10)])
+        self.assertNotIn("salida.gdb/VaciaTB", self.salidas)
+
+    def test_fusion_copia_las_tablas_si_el_proceso_falla(self):
+        pendiente = Future()
+        pendiente.set_exception(RuntimeError("proceso terminado"))
+
+        self.cortador.merge_plain_tables(pendiente, ["PrediosTB"], "temporal/tablas.gdb", "salida.gdb")
+
+        self.assertEqual(len(self.salidas["salida.gdb/PrediosTB"]), 3)
+
+    def test_cursor_sin_filtro_espacial_en_versiones_anteriores(self):
+        # El SearchCursor falso, como el de ArcGIS Pro anterior a 3.2, no acepta spatial_filter
+        with self.cortador.search_features("entrada.gdb/PrediosTB", ["ID_PREDIO"], object()) as cursor:
+            self.assertEqual(list(cursor), [("A",), ("B",), ("C",)])
+        self.assertFalse(self.cortador.spatial_filter_supported)
+
+if __name__ == "__main__":
+    unittest.main()